@@ -0,0 +1,443 @@
+"""Benchmark the cover platform against simulated hardware.
+
+Builds N curtains on the ``FakeHass`` stand-in, drives scripted workloads
+through the public cover methods and prints one JSON document with state
+writes, IR sends, task counts, event loop lag, position error and the
+time to set up the curtains per workload, plus the time to import the
+integration in a fresh interpreter::
+
+    python benchmarks/bench_cover.py --curtains 200 --close-time 3
+    python benchmarks/bench_cover.py --workload slider_storm --output result.json
+    python benchmarks/bench_cover.py --baseline result.json
+
+With ``--baseline`` the run is compared to an earlier result and the exit
+status is 1 when a tracked metric got worse by more than ``--tolerance``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+from fake_hass import ROOT, FakeHass, async_create_curtains
+
+from custom_components.boardlink_curtain.choreography import async_get_choreographer
+from custom_components.boardlink_curtain.const import DOMAIN
+from custom_components.boardlink_curtain.cover import BoardlinkCurtain
+
+LAG_INTERVAL = 0.01
+TASK_SAMPLE_INTERVAL = 0.05
+SETTLE_TIMEOUT = 120.0
+
+# 在新的解释器中计时导入：先导入 Home Assistant 本身，只计集成的部分
+IMPORT_PROBE = """
+import time
+import homeassistant.components.cover, homeassistant.config_entries
+import homeassistant.helpers.config_validation
+started = time.perf_counter()
+import custom_components.boardlink_curtain
+loaded = time.perf_counter()
+import custom_components.boardlink_curtain.cover
+print((loaded - started) * 1000, (time.perf_counter() - loaded) * 1000)
+"""
+IMPORT_RUNS = 5
+
+# 回归检查的指标（越小越好）
+TRACKED_METRICS: tuple[tuple[str, ...], ...] = (
+    ("startup_ms",),
+    ("state_writes",),
+    ("ir_sends",),
+    ("tasks_max",),
+    ("cpu_s",),
+    ("loop_lag_ms", "p95"),
+    ("position_error", "mean_abs"),
+)
+
+def _rng(seed: int, curtain: BoardlinkCurtain) -> random.Random:
+    """Return a random source per curtain, so runs do not depend on task order."""
+    return random.Random(f"{seed}-{curtain.unique_id}")
+
+
+Workload = Callable[[list[BoardlinkCurtain], int, float], Awaitable[None]]
+
+
+async def workload_all_open(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """Morning scene: every closed curtain opens at once."""
+    await asyncio.gather(*(curtain.async_open_cover() for curtain in curtains))
+
+
+async def workload_all_position(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """Scene moving every curtain to the same partial position."""
+    await asyncio.gather(
+        *(curtain.async_set_cover_position(position=60) for curtain in curtains)
+    )
+
+
+async def workload_group_position(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """The ``group_move`` service moving every curtain to one position."""
+    await asyncio.gather(*(curtain.async_move_now(60) for curtain in curtains))
+
+
+async def workload_slider_storm(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """Ten slider drags per curtain within half a second."""
+
+    async def _drag(curtain: BoardlinkCurtain) -> None:
+        rng = _rng(seed, curtain)
+        for _ in range(10):
+            await curtain.async_set_cover_position(position=rng.randint(5, 95))
+            await asyncio.sleep(rng.uniform(0.02, 0.06))
+
+    await asyncio.gather(*(_drag(curtain) for curtain in curtains))
+
+
+async def workload_mixed_partial(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """Random partial moves, full moves and early stops."""
+
+    async def _run(curtain: BoardlinkCurtain) -> None:
+        rng = _rng(seed, curtain)
+        await asyncio.sleep(rng.uniform(0, close_time / 4))
+        choice = rng.random()
+        if choice < 0.6:
+            await curtain.async_set_cover_position(position=rng.randint(5, 95))
+        elif choice < 0.8:
+            await curtain.async_set_cover_position(position=rng.choice((0, 100)))
+            await asyncio.sleep(rng.uniform(0, close_time / 2))
+            await curtain.async_stop_cover()
+        elif choice < 0.9:
+            await curtain.async_close_cover()
+        else:
+            await curtain.async_open_cover()
+
+    await asyncio.gather(*(_run(curtain) for curtain in curtains))
+
+
+def _wave_steps(
+    curtains: list[BoardlinkCurtain], close_time: float
+) -> list[tuple[BoardlinkCurtain, int, float]]:
+    """Routine opening the curtains in four waves to one partial position each."""
+    return [
+        (curtain, 30 + 15 * (index % 4), close_time / 4 * (index % 4))
+        for index, curtain in enumerate(curtains)
+    ]
+
+
+async def workload_waves_automation(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """The wave routine as one delayed ``set_cover_position`` per curtain."""
+
+    async def _move(curtain: BoardlinkCurtain, position: int, offset: float) -> None:
+        await asyncio.sleep(offset)
+        await curtain.async_set_cover_position(position=position)
+
+    await asyncio.gather(
+        *(_move(*step) for step in _wave_steps(curtains, close_time))
+    )
+
+
+async def workload_waves_choreography(
+    curtains: list[BoardlinkCurtain], seed: int, close_time: float
+) -> None:
+    """The wave routine compiled and run by the ``choreography`` service."""
+    await async_get_choreographer(curtains[0].hass).async_run(
+        "bench", _wave_steps(curtains, close_time)
+    )
+
+
+WORKLOADS: dict[str, tuple[int, Workload]] = {
+    # 工作负载名称 -> (初始位置, 负载)
+    "all_open": (0, workload_all_open),
+    "all_position": (0, workload_all_position),
+    "group_position": (0, workload_group_position),
+    "slider_storm": (50, workload_slider_storm),
+    "mixed_partial": (50, workload_mixed_partial),
+    "waves_automation": (0, workload_waves_automation),
+    "waves_choreography": (0, workload_waves_choreography),
+}
+
+
+class LoopProbe:
+    """Sample event loop lag and live task count while a workload runs."""
+
+    def __init__(self) -> None:
+        """Initialize the probe."""
+        self.lags: list[float] = []
+        self.tasks: list[int] = []
+        self._running = False
+
+    async def _lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._running:
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lags.append(max(loop.time() - expected, 0.0))
+
+    async def _task_count(self) -> None:
+        while self._running:
+            self.tasks.append(len(asyncio.all_tasks()) - 2)
+            await asyncio.sleep(TASK_SAMPLE_INTERVAL)
+
+    def start(self) -> list[asyncio.Task[None]]:
+        """Start sampling."""
+        self._running = True
+        return [asyncio.create_task(self._lag()), asyncio.create_task(self._task_count())]
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._running = False
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Return a simple nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _settled(hass: FakeHass, curtains: list[BoardlinkCurtain]) -> bool:
+    """Return whether every move, timer and queued send has finished."""
+    transmitters = hass.data.get(DOMAIN, {}).get("transmitters", {})
+    return (
+        all(
+            not curtain._is_moving
+            and curtain._stop_timer is None
+            and (curtain._coalescer is None or curtain._coalescer.pending is None)
+            for curtain in curtains
+        )
+        and all(transmitter.queue_depth == 0 for transmitter in transmitters.values())
+        and not hass.tasks
+    )
+
+
+async def async_run_workload(
+    name: str,
+    curtains_count: int,
+    close_time: float,
+    transmitters: int,
+    ir_delay: float,
+    seed: int,
+    transport: str = "ir",
+    fail_rate: float = 0.0,
+) -> dict[str, Any]:
+    """Run one workload on fresh curtains and return its metrics."""
+    start_position, workload = WORKLOADS[name]
+    hass = FakeHass(ir_delay=ir_delay, mqtt_delay=ir_delay, fail_rate=fail_rate)
+    configs = [
+        {
+            "name": f"bench {index}",
+            "open_code": f"open_{index % 8}",
+            "close_code": f"close_{index % 8}",
+            "pause_code": f"stop_{index % 8}",
+            "close_time": close_time,
+            "transmitter": f"blaster_{index % transmitters}",
+        }
+        for index in range(curtains_count)
+    ]
+    if transport == "mqtt":
+        # 每个 MQTT 电机使用自己的命令主题和发射器队列
+        for index, config in enumerate(configs):
+            config.update(
+                transport="mqtt", mqtt_topic=f"bench/{index}/set", transmitter="default"
+            )
+    setup_started = time.perf_counter()
+    curtains = await async_create_curtains(hass, configs)
+    startup = time.perf_counter() - setup_started
+    for curtain in curtains:
+        curtain._attr_current_cover_position = start_position
+        curtain._attr_is_closed = start_position == 0
+
+    probe = LoopProbe()
+    probe_tasks = probe.start()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+
+    await workload(curtains, seed, close_time)
+    deadline = asyncio.get_running_loop().time() + SETTLE_TIMEOUT
+    while not _settled(hass, curtains):
+        if asyncio.get_running_loop().time() > deadline:
+            break
+        await asyncio.sleep(0.05)
+
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    probe.stop()
+    await asyncio.gather(*probe_tasks)
+
+    writes = sum(curtain.state_writes for curtain in curtains)
+    sent = hass.blaster.sent + hass.broker.sent
+    queues = hass.data[DOMAIN]["transmitters"].values()
+    errors = [
+        abs(error)
+        for curtain in curtains
+        for error in curtain._stop_errors._errors
+    ]
+    return {
+        "workload": name,
+        "curtains": curtains_count,
+        "transmitters": transmitters,
+        "transport": transport,
+        "close_time": close_time,
+        "startup_ms": round(startup * 1000, 3),
+        "duration_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 3),
+        "settled": _settled(hass, curtains),
+        "state_writes": writes,
+        "state_writes_per_s": round(writes / elapsed, 1) if elapsed else 0.0,
+        "ir_sends": len(sent),
+        "ir_send_failures": hass.blaster.failures + hass.broker.failures,
+        "ir_retries": sum(queue.retried for queue in queues),
+        "commands_lost": sum(queue.failed for queue in queues),
+        "ir_sends_by_kind": {
+            kind: sum(
+                count for code, count in Counter(code for _, code in sent).items()
+                if code.startswith(kind)
+            )
+            for kind in ("open", "close", "stop")
+        },
+        "tasks_max": max(probe.tasks, default=0),
+        "tasks_mean": round(statistics.fmean(probe.tasks), 1) if probe.tasks else 0.0,
+        "loop_lag_ms": {
+            "mean": round(statistics.fmean(probe.lags) * 1000, 3) if probe.lags else 0.0,
+            "p95": round(_percentile(probe.lags, 0.95) * 1000, 3),
+            "max": round(max(probe.lags, default=0.0) * 1000, 3),
+        },
+        "position_error": {
+            "stops": len(errors),
+            "mean_abs": round(statistics.fmean(errors), 3) if errors else None,
+            "max_abs": round(max(errors), 3) if errors else None,
+        },
+    }
+
+
+def measure_import() -> dict[str, float]:
+    """Return the fastest of a few cold imports of the package and the cover platform."""
+    runs = [
+        [
+            float(value)
+            for value in subprocess.run(
+                [sys.executable, "-c", IMPORT_PROBE],
+                capture_output=True,
+                check=True,
+                cwd=ROOT,
+                text=True,
+            ).stdout.split()
+        ]
+        for _ in range(IMPORT_RUNS)
+    ]
+    return {
+        "integration": round(min(run[0] for run in runs), 3),
+        "cover": round(min(run[1] for run in runs), 3),
+    }
+
+
+async def async_main(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the selected workloads one after another."""
+    results = []
+    for name in args.workload or list(WORKLOADS):
+        results.append(
+            await async_run_workload(
+                name,
+                args.curtains,
+                args.close_time,
+                args.transmitters,
+                args.ir_delay,
+                args.seed,
+                args.transport,
+                args.fail_rate,
+            )
+        )
+    return {"python": sys.version.split()[0], "import_ms": measure_import(), "results": results}
+
+
+def _metric(result: dict[str, Any], path: tuple[str, ...]) -> float | None:
+    """Return a nested metric of a workload result."""
+    value: Any = result
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(
+    report: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return the metrics that regressed against ``baseline``."""
+    previous = {result["workload"]: result for result in baseline["results"]}
+    regressions = []
+    for part, new_value in report.get("import_ms", {}).items():
+        if (old_value := baseline.get("import_ms", {}).get(part)) is None:
+            continue
+        if new_value > max(old_value * (1 + tolerance), old_value + 1):
+            regressions.append(f"import_ms.{part} {old_value} -> {new_value}")
+    for result in report["results"]:
+        if (old := previous.get(result["workload"])) is None:
+            continue
+        for path in TRACKED_METRICS:
+            new_value, old_value = _metric(result, path), _metric(old, path)
+            if new_value is None or old_value is None:
+                continue
+            # 很小的基线值只看绝对变化，避免噪声被放大
+            limit = max(old_value * (1 + tolerance), old_value + 1)
+            if new_value > limit:
+                regressions.append(
+                    f"{result['workload']}: {'.'.join(path)} "
+                    f"{old_value} -> {new_value}"
+                )
+    return regressions
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark and print JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--curtains", type=int, default=100)
+    parser.add_argument("--close-time", type=float, default=3.0)
+    parser.add_argument("--transmitters", type=int, default=4)
+    parser.add_argument("--ir-delay", type=float, default=0.0,
+                        help="simulated seconds the blaster needs per code")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--transport", choices=("ir", "mqtt"), default="ir",
+                        help="send through the IR script or the MQTT broker stand-in")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="share of simulated sends that fail")
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS))
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative regression (default 0.2)")
+    args = parser.parse_args()
+
+    report = asyncio.run(async_main(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Lightweight stand-in for Home Assistant used by the benchmarks.
+
+It provides just enough of ``HomeAssistant`` for ``BoardlinkCurtain`` and the
+shared helpers it uses (motion engine, transmitter queues, code store,
+coalescer) to run on a plain asyncio loop, with a fake IR blaster behind
+``script.mock_send_ir`` and a broker stand-in behind ``mqtt.publish`` that
+record every code they receive.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable, Coroutine
+import os
+import random
+import sys
+import tempfile
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from custom_components.boardlink_curtain.code_store import IRCodeStore  # noqa: E402
+from custom_components.boardlink_curtain.const import DOMAIN  # noqa: E402
+from custom_components.boardlink_curtain.cover import BoardlinkCurtain  # noqa: E402
+
+
+class FakeIRBlaster:
+    """Records the codes sent through ``script.mock_send_ir``."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        delay: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: int = 1,
+    ) -> None:
+        """Initialize the blaster."""
+        self.loop = loop
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self.sent: list[tuple[float, str]] = []
+        self.failures = 0
+
+    async def async_send(self, code: str) -> None:
+        """Pretend to emit a code; a ``fail_rate`` share of sends fail."""
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            self.failures += 1
+            raise RuntimeError("simulated send failure")
+        self.sent.append((self.loop.time(), code))
+
+    @property
+    def counts(self) -> Counter[str]:
+        """Return how often each code was sent."""
+        return Counter(code for _, code in self.sent)
+
+
+class FakeMQTTBroker(FakeIRBlaster):
+    """Records the payloads published through ``mqtt.publish``."""
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, delay: float = 0.0, fail_rate: float = 0.0
+    ) -> None:
+        """Initialize the broker."""
+        super().__init__(loop, delay, fail_rate)
+        self.topics: Counter[str] = Counter()
+
+    async def async_publish(self, topic: str, payload: str) -> None:
+        """Pretend to deliver a message."""
+        self.topics[topic] += 1
+        await self.async_send(payload)
+
+
+class FakeServices:
+    """Service registry that only knows the IR script and MQTT publishing."""
+
+    def __init__(self, blaster: FakeIRBlaster, broker: FakeMQTTBroker) -> None:
+        """Initialize the registry."""
+        self.blaster = blaster
+        self.broker = broker
+
+    async def async_call(
+        self,
+        domain: str,
+        service: str,
+        service_data: dict[str, Any] | None = None,
+        blocking: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """Route the IR script and MQTT publishing to the fakes."""
+        data = service_data or {}
+        if (domain, service) == ("script", "mock_send_ir"):
+            await self.blaster.async_send(data["code"])
+        elif (domain, service) == ("mqtt", "publish"):
+            await self.broker.async_publish(data["topic"], data["payload"])
+        else:
+            raise ValueError(f"Unknown service {domain}.{service}")
+
+
+class FakeBus:
+    """Event bus that accepts listeners and never fires them."""
+
+    def async_listen_once(self, event_type: str, listener: Callable[..., Any]) -> Callable[[], None]:
+        """Ignore the listener."""
+        return lambda: None
+
+    def async_listen(self, event_type: str, listener: Callable[..., Any]) -> Callable[[], None]:
+        """Ignore the listener."""
+        return lambda: None
+
+
+class FakeConfig:
+    """Configuration directory holder."""
+
+    def __init__(self, config_dir: str) -> None:
+        """Initialize the config."""
+        self.config_dir = config_dir
+
+    def path(self, *parts: str) -> str:
+        """Return a path inside the configuration directory."""
+        return os.path.join(self.config_dir, *parts)
+
+
+class FakeHass:
+    """The subset of ``HomeAssistant`` used by the cover platform."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop | None = None,
+        ir_delay: float = 0.0,
+        config_dir: str | None = None,
+        mqtt_delay: float = 0.0,
+        fail_rate: float = 0.0,
+    ) -> None:
+        """Initialize the stand-in."""
+        self.loop = loop or asyncio.get_running_loop()
+        self.data: dict[str, Any] = {}
+        self.blaster = FakeIRBlaster(self.loop, ir_delay, fail_rate)
+        self.broker = FakeMQTTBroker(self.loop, mqtt_delay, fail_rate)
+        self.services = FakeServices(self.blaster, self.broker)
+        self.bus = FakeBus()
+        self.config = FakeConfig(config_dir or tempfile.mkdtemp(prefix="boardlink_bench_"))
+        self.tasks: set[asyncio.Task[Any]] = set()
+
+    def async_create_task(
+        self, target: Coroutine[Any, Any, Any], name: str | None = None, **kwargs: Any
+    ) -> asyncio.Task[Any]:
+        """Schedule a coroutine and keep a reference to it."""
+        task = self.loop.create_task(target)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def async_add_executor_job(self, target: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking work inline; the benchmarks only touch small files."""
+        return target(*args)
+
+    def async_run_hass_job(self, job: Any, *args: Any) -> Any:
+        """Run a ``HassJob`` scheduled by the event helpers."""
+        result = job.target(*args)
+        if asyncio.iscoroutine(result):
+            return self.async_create_task(result)
+        return result
+
+    async def async_block_till_done(self) -> None:
+        """Wait for every task created through the stand-in."""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+
+class NullPositionStore:
+    """Position store that keeps nothing; the benchmarks measure live paths."""
+
+    def async_get(self, unique_id: str) -> None:
+        """Return no saved record."""
+        return None
+
+    def async_register(self, entity: BoardlinkCurtain) -> None:
+        """Do nothing."""
+
+    def async_unregister(self, entity: BoardlinkCurtain) -> None:
+        """Do nothing."""
+
+    def async_schedule_save(self) -> None:
+        """Do nothing."""
+
+
+async def async_create_curtains(
+    hass: FakeHass, configs: list[dict[str, Any]]
+) -> list[BoardlinkCurtain]:
+    """Build curtains the way the cover platform does, without a platform.
+
+    ``async_write_ha_state`` is replaced by a counter stored in
+    ``entity.state_writes``.
+    """
+    code_store = hass.data.setdefault(DOMAIN, {}).setdefault("code_store", IRCodeStore(hass))
+    position_store = NullPositionStore()
+    curtains = []
+    for index, config in enumerate(configs):
+        for key in ("open_code", "close_code", "pause_code"):
+            code_store.async_resolve(config[key])
+        curtain = BoardlinkCurtain(config, f"bench_{index}", code_store, position_store)
+        curtain.hass = hass  # type: ignore[assignment]
+        curtain.entity_id = f"cover.bench_{index}"
+        curtain.state_writes = 0  # type: ignore[attr-defined]
+
+        def _write(curtain: BoardlinkCurtain = curtain) -> None:
+            curtain.state_writes += 1  # type: ignore[attr-defined]
+
+        curtain.async_write_ha_state = _write  # type: ignore[method-assign]
+        curtains.append(curtain)
+    # 与实体平台一样，同一配置项的窗帘并发加入
+    await asyncio.gather(*(curtain.async_added_to_hass() for curtain in curtains))
+    return curtains
@@ -0,0 +1,294 @@
+"""Replay a recorded command trace on a virtual clock.
+
+The trace written by the ``boardlink_curtain.start_trace`` service is
+replayed through the real ``BoardlinkCurtain`` logic on an event loop whose
+clock jumps straight to the next timer instead of sleeping, so a day of
+traffic finishes in seconds. The report lists the final position of every
+curtain, the IR codes emitted, the stop timing error and the drift between
+the positions seen in the field and those reproduced by the replay::
+
+    python benchmarks/replay.py boardlink_curtain_trace.jsonl
+    python benchmarks/replay.py --synthesize 300 --hours 24 --save day.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+import random
+import selectors
+import statistics
+import time
+from typing import Any
+
+from fake_hass import FakeHass, async_create_curtains
+
+from custom_components.boardlink_curtain.const import (
+    COMMAND_CLOSE,
+    COMMAND_OPEN,
+    COMMAND_SET_POSITION,
+    COMMAND_STOP,
+)
+from custom_components.boardlink_curtain.cover import BoardlinkCurtain
+from custom_components.boardlink_curtain.trace import TRACE_VERSION
+
+# 所有指令执行完后，等待电机与停止定时器收尾的虚拟时间（秒）
+SETTLE_TIME = 3600.0
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the loop clock instead of blocking."""
+
+    loop: VirtualClockLoop | None = None
+
+    def select(self, timeout: float | None = None) -> list[Any]:
+        """Poll for I/O, then skip ahead to the next timer."""
+        events = super().select(0)
+        if events or self.loop is None:
+            return events
+        if timeout is None:
+            return super().select(None)
+        self.loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose ``time()`` only moves when nothing is runnable."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        """Initialize the loop."""
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self._now = start
+
+    def time(self) -> float:
+        """Return the virtual time."""
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        """Move the virtual clock forward."""
+        if seconds > 0:
+            self._now += seconds
+
+
+def load_trace(path: str) -> tuple[dict[str, dict[str, Any]], list[dict[str, Any]]]:
+    """Return the curtain settings and the commands of a trace file."""
+    curtains: dict[str, dict[str, Any]] = {}
+    commands: list[dict[str, Any]] = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "trace" in record:
+                if record["trace"] != TRACE_VERSION:
+                    raise ValueError(f"Unsupported trace version {record['trace']}")
+            elif "curtain" in record:
+                curtains[record["curtain"]] = record["config"]
+            else:
+                commands.append(record)
+    commands.sort(key=lambda command: command["t"])
+    return curtains, commands
+
+
+def synthesize_trace(
+    count: int, hours: float, per_hour: float, close_time: float, seed: int
+) -> tuple[dict[str, dict[str, Any]], list[dict[str, Any]]]:
+    """Generate plausible traffic for ``count`` curtains.
+
+    Each curtain receives about ``per_hour`` commands per hour: mostly
+    position changes, some of them slider drags, plus open, close and stop.
+    """
+    rng = random.Random(seed)
+    curtains = {}
+    commands: list[dict[str, Any]] = []
+    for index in range(count):
+        unique_id = f"synthetic_{index}"
+        curtains[unique_id] = {
+            "name": f"curtain {index}",
+            "open_code": f"open_{index % 16}",
+            "close_code": f"close_{index % 16}",
+            "pause_code": f"stop_{index % 16}",
+            "close_time": close_time,
+            "transmitter": f"blaster_{index % 8}",
+        }
+        t = rng.uniform(0, 3600 / per_hour)
+        while t < hours * 3600:
+            choice = rng.random()
+            if choice < 0.5:
+                commands.append(_command(t, unique_id, COMMAND_SET_POSITION, rng.randint(1, 99)))
+            elif choice < 0.65:
+                # 滑块拖动：几百毫秒内的一串位置
+                for step in range(rng.randint(3, 8)):
+                    commands.append(_command(
+                        t + step * 0.05, unique_id, COMMAND_SET_POSITION, rng.randint(1, 99)
+                    ))
+            elif choice < 0.8:
+                commands.append(_command(t, unique_id, COMMAND_OPEN))
+            elif choice < 0.95:
+                commands.append(_command(t, unique_id, COMMAND_CLOSE))
+            else:
+                commands.append(_command(t, unique_id, COMMAND_STOP))
+            t += rng.expovariate(per_hour / 3600)
+    commands.sort(key=lambda command: command["t"])
+    return curtains, commands
+
+
+def _command(t: float, unique_id: str, command: str, position: int | None = None) -> dict[str, Any]:
+    """Build one trace command."""
+    return {"t": t, "id": unique_id, "cmd": command, "position": position, "current": None}
+
+
+def save_trace(
+    path: str, curtains: dict[str, dict[str, Any]], commands: list[dict[str, Any]]
+) -> None:
+    """Write curtains and commands in the recorder's format."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(json.dumps({"trace": TRACE_VERSION, "started": 0}) + "\n")
+        for unique_id, config in curtains.items():
+            file.write(json.dumps({"curtain": unique_id, "config": config}) + "\n")
+        for command in commands:
+            file.write(json.dumps(command) + "\n")
+
+
+async def async_replay(
+    curtain_configs: dict[str, dict[str, Any]], commands: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Replay commands through real curtains and collect the results."""
+    loop = asyncio.get_running_loop()
+    hass = FakeHass()
+    unique_ids = list(curtain_configs)
+    curtains = await async_create_curtains(
+        hass, [curtain_configs[unique_id] for unique_id in unique_ids]
+    )
+    by_id = dict(zip(unique_ids, curtains))
+
+    # 初始位置取该窗帘第一条指令记录的当前位置
+    initialized: set[str] = set()
+    for command in commands:
+        curtain = by_id.get(command["id"])
+        if curtain is None or command["id"] in initialized:
+            continue
+        initialized.add(command["id"])
+        if command.get("current") is not None:
+            curtain._attr_current_cover_position = command["current"]
+            curtain._attr_is_closed = command["current"] == 0
+
+    kinds = {}
+    for config in curtain_configs.values():
+        kinds[config.get("open_code")] = COMMAND_OPEN
+        kinds[config.get("close_code")] = COMMAND_CLOSE
+        kinds[config.get("pause_code")] = COMMAND_STOP
+
+    drift: list[float] = []
+    origin = commands[0]["t"] if commands else 0.0
+    start = loop.time()
+
+    async def _dispatch(curtain: BoardlinkCurtain, command: dict[str, Any]) -> None:
+        if command.get("current") is not None and curtain.current_cover_position is not None:
+            drift.append(abs(curtain.current_cover_position - command["current"]))
+        if command["cmd"] == COMMAND_OPEN:
+            await curtain.async_open_cover()
+        elif command["cmd"] == COMMAND_CLOSE:
+            await curtain.async_close_cover()
+        elif command["cmd"] == COMMAND_STOP:
+            await curtain.async_stop_cover()
+        else:
+            await curtain.async_set_cover_position(position=command["position"])
+
+    for command in commands:
+        if (curtain := by_id.get(command["id"])) is None:
+            continue
+        loop.call_at(
+            start + command["t"] - origin,
+            hass.async_create_task,
+            _dispatch(curtain, command),
+        )
+
+    end = start + (commands[-1]["t"] - origin if commands else 0.0)
+    await asyncio.sleep(max(end - loop.time(), 0.0))
+    await hass.async_block_till_done()
+    settle_deadline = loop.time() + SETTLE_TIME
+    while loop.time() < settle_deadline and any(
+        curtain._is_moving or curtain._stop_timer is not None for curtain in curtains
+    ):
+        await asyncio.sleep(1)
+    await hass.async_block_till_done()
+
+    errors = [
+        abs(error) for curtain in curtains for error in curtain._stop_errors._errors
+    ]
+    sent = Counter(kinds.get(code, "other") for _, code in hass.blaster.sent)
+    return {
+        "virtual_duration_s": round(loop.time() - start, 1),
+        "curtains": len(curtains),
+        "commands": len(commands),
+        "ir_sends": len(hass.blaster.sent),
+        "ir_sends_by_kind": dict(sent),
+        "state_writes": sum(curtain.state_writes for curtain in curtains),
+        "stop_error": {
+            "stops": sum(curtain._stop_errors.count for curtain in curtains),
+            "mean_abs": round(statistics.fmean(errors), 3) if errors else None,
+            "max_abs": round(max(errors), 3) if errors else None,
+        },
+        "drift": {
+            "samples": len(drift),
+            "mean_abs": round(statistics.fmean(drift), 3) if drift else None,
+            "max_abs": max(drift, default=None),
+        },
+        "final_positions": {
+            unique_id: curtain.current_cover_position
+            for unique_id, curtain in by_id.items()
+        },
+    }
+
+
+def main() -> None:
+    """Parse arguments, replay the trace and print JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", nargs="?", help="trace file recorded by start_trace")
+    parser.add_argument("--synthesize", type=int, metavar="CURTAINS",
+                        help="replay generated traffic for this many curtains instead")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--per-hour", type=float, default=2.0,
+                        help="generated commands per curtain and hour")
+    parser.add_argument("--close-time", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the generated trace to this file")
+    parser.add_argument("--no-positions", action="store_true",
+                        help="omit the per-curtain final positions")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        curtains, commands = synthesize_trace(
+            args.synthesize, args.hours, args.per_hour, args.close_time, args.seed
+        )
+        if args.save:
+            save_trace(args.save, curtains, commands)
+    elif args.trace:
+        curtains, commands = load_trace(args.trace)
+    else:
+        parser.error("a trace file or --synthesize is required")
+
+    loop = VirtualClockLoop()
+    started = time.perf_counter()
+    try:
+        report = loop.run_until_complete(async_replay(curtains, commands))
+    finally:
+        loop.close()
+    report["wall_time_s"] = round(time.perf_counter() - started, 2)
+    if args.no_positions:
+        report.pop("final_positions")
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,342 @@
-"""The Boardlink Curtain integration."""
+"""The Boardlink Curtain integration.
+
+Only constants are imported here. The cover runtime and its helpers (code
+store, transports, metrics, event log) are imported in the executor when
+an entry is set up or a service first needs them, so loading the
+integration, or just its config flow, stays light and the event loop
+never blocks on an import.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
 import logging
-from typing import Any
+import os
+import time
+from typing import TYPE_CHECKING, Any
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+import voluptuous as vol
+
+from homeassistant.components.cover import ATTR_POSITION
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
+from homeassistant.const import ATTR_ENTITY_ID, Platform
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.service import async_register_admin_service
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import (
+    ATTR_SINCE,
+    CONF_BROADLINK_HOST,
+    CONF_CLOSE_CODE,
+    CONF_CURTAINS,
+    CONF_OPEN_CODE,
+    CONF_PAUSE_CODE,
+    DATA_ENTITIES,
+    DEFAULT_EVENTS_FILE,
+    DEFAULT_TRACE_FILE,
+    DOMAIN,
+    SIGNAL_OPTIONS_UPDATED,
+)
+from .startup import async_get_startup_report, async_import_modules
+
+if TYPE_CHECKING:
+    from .cover import BoardlinkCurtain
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.COVER]
+# 包被导入的时刻，作为启动计时的起点
+_LOADED = time.monotonic()
+
+PLATFORMS = [Platform.COVER, Platform.SENSOR]
+
+SERVICE_START_TRACE = "start_trace"
+SERVICE_STOP_TRACE = "stop_trace"
+SERVICE_DUMP_EVENTS = "dump_events"
+SERVICE_GROUP_MOVE = "group_move"
+SERVICE_POSITION_DELTA = "position_delta"
+SERVICE_CHOREOGRAPHY = "choreography"
+EVENT_POSITIONS = f"{DOMAIN}_positions"
+EVENT_CHOREOGRAPHY = f"{DOMAIN}_choreography_finished"
+ATTR_TARGETS = "targets"
+ATTR_STEPS = "steps"
+ATTR_OFFSET = "offset"
+ATTR_NAME = "name"
+DEFAULT_CHOREOGRAPHY = "default"
+ATTR_FILENAME = "filename"
+
+
+def _file_name(value: Any) -> str:
+    """Validate a bare file name, without any directory part."""
+    name = cv.string(value)
+    if name in ("", ".", "..") or os.path.basename(name) != name or "\\" in name:
+        raise vol.Invalid("expected a file name without a directory")
+    return name
+
+
+START_TRACE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_TRACE_FILE): _file_name,
+})
+
+POSITION = vol.All(vol.Coerce(int), vol.Range(min=0, max=100))
+
+GROUP_MOVE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Inclusive(ATTR_ENTITY_ID, "entities"): cv.entity_ids,
+        vol.Inclusive(ATTR_POSITION, "entities"): POSITION,
+        vol.Optional(ATTR_TARGETS): {cv.entity_id: POSITION},
+    }),
+    cv.has_at_least_one_key(ATTR_ENTITY_ID, ATTR_TARGETS),
+)
+
+CHOREOGRAPHY_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_NAME, default=DEFAULT_CHOREOGRAPHY): cv.string,
+    vol.Required(ATTR_STEPS): vol.All(cv.ensure_list, [vol.Schema({
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_POSITION): POSITION,
+        vol.Optional(ATTR_OFFSET, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    })]),
+})
+
+POSITION_DELTA_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_SINCE, default=0): cv.positive_int,
+})
+
+DUMP_EVENTS_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_EVENTS_FILE): _file_name,
+})
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Boardlink Curtain component from YAML configuration."""
     hass.data[DOMAIN] = {}
+    async_get_startup_report(hass, _LOADED).async_mark("setup")
+
+    # 服务处理函数在首次调用时才在执行器中导入各自的模块
+    async def async_start_trace(call: ServiceCall) -> None:
+        """Start recording the curtain command trace."""
+        await async_import_modules(hass, "trace")
+        from .trace import async_get_trace_recorder
+
+        recorder = async_get_trace_recorder(hass)
+        await recorder.async_start(await _async_output_path(hass, call.data[ATTR_FILENAME]))
+
+    async def async_stop_trace(call: ServiceCall) -> None:
+        """Stop recording the curtain command trace."""
+        await async_import_modules(hass, "trace")
+        from .trace import async_get_trace_recorder
+
+        await async_get_trace_recorder(hass).async_stop()
+
+    # 录制指令轨迹，用于离线重放；会写文件，只允许管理员调用
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_START_TRACE, async_start_trace, schema=START_TRACE_SCHEMA
+    )
+    async_register_admin_service(hass, DOMAIN, SERVICE_STOP_TRACE, async_stop_trace)
+
+    async def async_dump_events(call: ServiceCall) -> None:
+        """Write the buffered curtain events to a JSON file."""
+        await async_import_modules(hass, "events")
+        from .events import async_get_event_log
+
+        unique_ids = None
+        if ATTR_ENTITY_ID in call.data:
+            registry = er.async_get(hass)
+            unique_ids = [
+                entry.unique_id
+                for entity_id in call.data[ATTR_ENTITY_ID]
+                if (entry := registry.async_get(entity_id)) is not None
+            ]
+        path = await _async_output_path(hass, call.data[ATTR_FILENAME])
+        events = async_get_event_log(hass).as_list(unique_ids)
+        await hass.async_add_executor_job(_write_json, path, events)
+        _LOGGER.info("Wrote %d curtain events to %s", len(events), path)
+
+    # 导出事件缓冲区，便于排查问题；会写文件，只允许管理员调用
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_DUMP_EVENTS, async_dump_events, schema=DUMP_EVENTS_SCHEMA
+    )
+
+    def _get_curtain(entity_id: str) -> BoardlinkCurtain | None:
+        """Return the curtain entity of an entity ID, or ``None``."""
+        entry = er.async_get(hass).async_get(entity_id)
+        curtains = hass.data[DOMAIN].get(DATA_ENTITIES, {})
+        if entry is None or (curtain := curtains.get(entry.unique_id)) is None:
+            _LOGGER.warning("%s is not a Boardlink curtain", entity_id)
+            return None
+        return curtain
+
+    async def async_group_move(call: ServiceCall) -> None:
+        """Move a set of curtains together."""
+        targets = dict.fromkeys(call.data.get(ATTR_ENTITY_ID, []), call.data.get(ATTR_POSITION))
+        targets.update(call.data.get(ATTR_TARGETS, {}))
+        moves = [
+            curtain.async_move_now(position)
+            for entity_id, position in targets.items()
+            if (curtain := _get_curtain(entity_id)) is not None
+        ]
+        # 所有成员在同一轮事件循环中入队：同一发射器上相同的红外码只发一次，
+        # 不同的码由发射器队列错开发送
+        await asyncio.gather(*moves)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_GROUP_MOVE, async_group_move, schema=GROUP_MOVE_SCHEMA
+    )
+
+    async def async_choreography(call: ServiceCall) -> None:
+        """Compile a choreography and run it in the background."""
+        steps = [
+            (curtain, step[ATTR_POSITION], step[ATTR_OFFSET])
+            for step in call.data[ATTR_STEPS]
+            for entity_id in step[ATTR_ENTITY_ID]
+            if (curtain := _get_curtain(entity_id)) is not None
+        ]
+        name = call.data[ATTR_NAME]
+
+        async def _async_run() -> None:
+            await async_import_modules(hass, "choreography")
+            from .choreography import async_get_choreographer
+
+            stats = await async_get_choreographer(hass).async_run(name, steps)
+            hass.bus.async_fire(EVENT_CHOREOGRAPHY, stats)
+
+        hass.async_create_task(_async_run())
+
+    # 编排：整套场景预先编译成一张按时间排序的发码/停止表，由一个执行器运行；
+    # 服务立即返回，完成时触发事件
+    hass.services.async_register(
+        DOMAIN, SERVICE_CHOREOGRAPHY, async_choreography, schema=CHOREOGRAPHY_SCHEMA
+    )
+
+    async def async_position_delta(call: ServiceCall) -> None:
+        """Fire an event with the curtain rows changed since a version."""
+        await async_import_modules(hass, "position_table")
+        from .position_table import async_get_position_table
+
+        message = async_get_position_table(hass).as_message(call.data[ATTR_SINCE])
+        hass.bus.async_fire(EVENT_POSITIONS, message)
+
+    # 集中位置表：服务以事件返回变化的行，仪表板可通过 websocket 订阅
+    hass.services.async_register(
+        DOMAIN, SERVICE_POSITION_DELTA, async_position_delta, schema=POSITION_DELTA_SCHEMA
+    )
+    await async_import_modules(hass, "websocket")
+    from .websocket import async_setup_websocket
+
+    async_setup_websocket(hass)
     
     # Check if there is YAML configuration
     if DOMAIN in config:
         # Store YAML configuration for later use in config flow
         hass.data[DOMAIN]["yaml_config"] = config[DOMAIN]
+
+        # YAML 中的窗帘列表整体导入为一个集线器配置项
+        if isinstance(config[DOMAIN], list):
+            hass.async_create_task(
+                hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": SOURCE_IMPORT},
+                    data={"name": "YAML", CONF_CURTAINS: config[DOMAIN]},
+                )
+            )
     
     return True
 
 
+async def _async_output_path(hass: HomeAssistant, name: str) -> str:
+    """Return the path of a file written by a service in the config directory.
+
+    The configuration directory must be listed in ``allowlist_external_dirs``.
+    """
+    path = hass.config.path(name)
+    if not await hass.async_add_executor_job(hass.config.is_allowed_path, path):
+        raise HomeAssistantError(
+            f"Writing {name} is not allowed: add {hass.config.config_dir} to "
+            "allowlist_external_dirs"
+        )
+    return path
+
+
+def _write_json(path: str, data: object) -> None:
+    """Write data to a JSON file."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def entry_config(entry: ConfigEntry) -> dict[str, Any]:
+    """Return the configuration of an entry with its options applied.
+
+    Options of a hub are stored per curtain name under ``curtains``.
+    """
+    if CONF_CURTAINS not in entry.data:
+        return {**entry.data, **entry.options}
+    overrides = entry.options.get(CONF_CURTAINS, {})
+    return {
+        **entry.data,
+        CONF_CURTAINS: [
+            {**curtain, **overrides.get(curtain["name"], {})}
+            for curtain in entry.data[CONF_CURTAINS]
+        ],
+    }
+
+
+def _runtime_modules(config: dict[str, Any]) -> list[str]:
+    """Return the modules the curtains of an entry need at runtime."""
+    curtains = config[CONF_CURTAINS] if CONF_CURTAINS in config else [config]
+    modules = ["code_store", "cover", "sensor", "transport"]
+    if any(curtain.get(CONF_BROADLINK_HOST) for curtain in curtains):
+        # 只有直连博联设备时才需要 UDP 协议和加密模块
+        modules.append("broadlink_udp")
+    return modules
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Boardlink Curtain from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    
-    # 存储配置项数据
-    hass.data[DOMAIN][entry.entry_id] = dict(entry.data)
-    
+    async_get_startup_report(hass, _LOADED).async_entry_started(entry.entry_id)
+
+    # 存储配置项数据（已合并选项）
+    config = hass.data[DOMAIN][entry.entry_id] = entry_config(entry)
+
+    # 平台及其运行时模块在执行器中导入，不阻塞事件循环
+    await async_import_modules(hass, *_runtime_modules(config))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
 
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running curtains without a reload."""
+    config = entry_config(entry)
+    hass.data[DOMAIN][entry.entry_id] = config
+
+    # 新的红外码先加入共享码表，窗帘更新时直接查表；新选项可能用到新的传输模块
+    await async_import_modules(hass, *_runtime_modules(config))
+    from .code_store import async_get_code_store
+
+    code_store = await async_get_code_store(hass)
+    curtains = config[CONF_CURTAINS] if CONF_CURTAINS in config else [config]
+    for curtain in curtains:
+        try:
+            for key in (CONF_OPEN_CODE, CONF_CLOSE_CODE, CONF_PAUSE_CODE):
+                if curtain.get(key):
+                    code_store.async_resolve(curtain[key])
+        except ValueError as err:
+            _LOGGER.error("Invalid IR code for curtain %s: %s", curtain.get("name"), err)
+
+    async_dispatcher_send(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), config)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        async_get_startup_report(hass).async_entry_unloaded(entry.entry_id)
 
     return unload_ok
\ No newline at end of file
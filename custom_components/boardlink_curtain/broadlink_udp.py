@@ -0,0 +1,294 @@
+"""Minimal Broadlink LAN protocol over UDP.
+
+Only the parts needed to push learned codes are implemented: the
+authentication handshake and the ``send_data`` command. One authenticated
+``BroadlinkSession`` is kept per device in a ``BroadlinkPool`` so the
+encryption key and socket are reused for every send.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 80
+DEFAULT_TIMEOUT = 2.0
+
+# 协议默认密钥与向量（认证前使用）
+DEFAULT_KEY = bytes.fromhex("097628343fe99e23765c1513accf8b02")
+DEFAULT_IV = bytes.fromhex("562e17996d093d28ddb3ba695a2e6f58")
+
+MAGIC = bytes.fromhex("5aa5aa555aa5aa55")
+HEADER_SIZE = 0x38
+
+CMD_AUTH = 0x65
+CMD_COMMAND = 0x6A
+CMD_AUTH_RESPONSE = 0x3E9
+CMD_COMMAND_RESPONSE = 0x3EE
+
+RM_SEND_DATA = 0x02
+ERROR_AUTH = -7
+
+# 设备型号 -> (设备类型码, 是否使用 RM4 的长度前缀)
+DEVICE_TYPES: dict[str, tuple[int, bool]] = {
+    "RM2": (0x2712, False),
+    "RM3": (0x2787, False),
+    "RM_MINI3": (0x27C2, False),
+    "RM4": (0x51DA, True),
+    "RM4C": (0x5F36, True),
+    "RM4_MINI": (0x51DA, True),
+    "RM4_PRO": (0x6026, True),
+}
+DEFAULT_DEVICE_TYPE = "RM4"
+
+
+class BroadlinkError(Exception):
+    """Raised when a Broadlink device rejects or ignores a request."""
+
+
+def _checksum(data: bytes) -> int:
+    """Return the Broadlink 16-bit checksum of ``data``."""
+    return sum(data, 0xBEAF) & 0xFFFF
+
+
+def _aes(key: bytes) -> Cipher:
+    """Return the AES-CBC cipher used for payloads."""
+    return Cipher(algorithms.AES(key), modes.CBC(DEFAULT_IV))
+
+
+def encrypt(key: bytes, payload: bytes) -> bytes:
+    """Pad ``payload`` to the block size and encrypt it."""
+    payload += bytes((16 - len(payload)) % 16)
+    encryptor = _aes(key).encryptor()
+    return encryptor.update(payload) + encryptor.finalize()
+
+
+def decrypt(key: bytes, payload: bytes) -> bytes:
+    """Decrypt a payload."""
+    decryptor = _aes(key).decryptor()
+    return decryptor.update(payload) + decryptor.finalize()
+
+
+def build_packet(
+    key: bytes,
+    devtype: int,
+    command: int,
+    count: int,
+    mac: bytes,
+    device_id: int,
+    payload: bytes,
+    error: int = 0,
+) -> bytes:
+    """Build an encrypted Broadlink packet."""
+    packet = bytearray(HEADER_SIZE)
+    packet[0x00:0x08] = MAGIC
+    packet[0x22:0x24] = error.to_bytes(2, "little", signed=True)
+    packet[0x24:0x26] = devtype.to_bytes(2, "little")
+    packet[0x26:0x28] = command.to_bytes(2, "little")
+    packet[0x28:0x2A] = count.to_bytes(2, "little")
+    packet[0x2A:0x30] = mac[::-1]
+    packet[0x30:0x34] = device_id.to_bytes(4, "little")
+    packet[0x34:0x36] = _checksum(payload).to_bytes(2, "little")
+    packet.extend(encrypt(key, payload))
+    packet[0x20:0x22] = _checksum(packet).to_bytes(2, "little")
+    return bytes(packet)
+
+
+def parse_packet(key: bytes, packet: bytes) -> tuple[int, int, int, bytes]:
+    """Return ``(command, count, error, payload)`` of a received packet."""
+    if (
+        len(packet) < HEADER_SIZE
+        or packet[0x00:0x08] != MAGIC
+        or (len(packet) - HEADER_SIZE) % 16
+    ):
+        raise BroadlinkError("Malformed packet")
+    checksum = int.from_bytes(packet[0x20:0x22], "little")
+    if _checksum(packet[:0x20] + b"\x00\x00" + packet[0x22:]) != checksum:
+        raise BroadlinkError("Bad packet checksum")
+    command = int.from_bytes(packet[0x26:0x28], "little")
+    count = int.from_bytes(packet[0x28:0x2A], "little")
+    error = int.from_bytes(packet[0x22:0x24], "little", signed=True)
+    payload = decrypt(key, packet[HEADER_SIZE:]) if len(packet) > HEADER_SIZE else b""
+    return command, count, error, payload
+
+
+class BroadlinkSession(asyncio.DatagramProtocol):
+    """A persistent, authenticated connection to one Broadlink device."""
+
+    def __init__(
+        self,
+        host: str,
+        mac: bytes,
+        device_type: str = DEFAULT_DEVICE_TYPE,
+        port: int = DEFAULT_PORT,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        """Initialize the session."""
+        self.host = host
+        self.port = port
+        self.mac = mac
+        self.devtype, self._rm4 = DEVICE_TYPES.get(
+            device_type, DEVICE_TYPES[DEFAULT_DEVICE_TYPE]
+        )
+        self.timeout = timeout
+        self._key = DEFAULT_KEY
+        self._id = 0
+        self._count = int.from_bytes(os.urandom(2), "little")
+        self._transport: asyncio.DatagramTransport | None = None
+        self._pending: dict[int, asyncio.Future[tuple[int, bytes]]] = {}
+        self._lock = asyncio.Lock()
+        self._authenticated = False
+
+    def configure(self, mac: bytes, device_type: str = DEFAULT_DEVICE_TYPE) -> None:
+        """Set the MAC address and model of the device.
+
+        A changed device has to authenticate again before the next send.
+        """
+        devtype, rm4 = DEVICE_TYPES.get(device_type, DEVICE_TYPES[DEFAULT_DEVICE_TYPE])
+        if (mac, devtype, rm4) != (self.mac, self.devtype, self._rm4):
+            self.mac = mac
+            self.devtype, self._rm4 = devtype, rm4
+            self._authenticated = False
+
+    @property
+    def connected(self) -> bool:
+        """Return whether the socket is open."""
+        return self._transport is not None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Store the datagram transport."""
+        self._transport = transport  # type: ignore[assignment]
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Forget the socket and fail pending requests."""
+        self._transport = None
+        self._authenticated = False
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(BroadlinkError("Connection lost"))
+        self._pending.clear()
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Resolve the request matching a response."""
+        try:
+            _, count, error, payload = parse_packet(self._key, data)
+        except BroadlinkError as err:
+            _LOGGER.debug("Ignoring packet from %s: %s", addr, err)
+            return
+        if (future := self._pending.pop(count, None)) and not future.done():
+            future.set_result((error, payload))
+
+    async def async_connect(self) -> None:
+        """Open the socket and authenticate."""
+        if self._transport is None:
+            loop = asyncio.get_running_loop()
+            await loop.create_datagram_endpoint(
+                lambda: self, remote_addr=(self.host, self.port)
+            )
+        if not self._authenticated:
+            await self._async_auth()
+
+    async def _async_request(self, command: int, payload: bytes) -> bytes:
+        """Send one packet and wait for its response payload."""
+        assert self._transport is not None
+        self._count = ((self._count + 1) | 0x8000) & 0xFFFF
+        count = self._count
+        future: asyncio.Future[tuple[int, bytes]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[count] = future
+        self._transport.sendto(
+            build_packet(
+                self._key, self.devtype, command, count, self.mac, self._id, payload
+            )
+        )
+        try:
+            error, response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as err:
+            raise BroadlinkError(f"No response from {self.host}") from err
+        finally:
+            self._pending.pop(count, None)
+        if error == ERROR_AUTH:
+            self._authenticated = False
+        if error:
+            raise BroadlinkError(f"Device {self.host} returned error {error}")
+        return response
+
+    async def _async_auth(self) -> None:
+        """Run the authentication handshake and store the session key."""
+        self._key = DEFAULT_KEY
+        self._id = 0
+        payload = bytearray(0x50)
+        payload[0x04:0x14] = b"\x31" * 16
+        payload[0x1E] = 0x01
+        payload[0x2D] = 0x01
+        payload[0x30:0x36] = b"Test 1"
+        response = await self._async_request(CMD_AUTH, bytes(payload))
+        self._id = int.from_bytes(response[0x00:0x04], "little")
+        self._key = bytes(response[0x04:0x14])
+        self._authenticated = True
+        _LOGGER.debug("Authenticated with Broadlink device %s", self.host)
+
+    async def async_send_data(self, data: bytes) -> None:
+        """Transmit a learned IR/RF packet."""
+        if self._rm4:
+            payload = struct.pack("<HI", len(data) + 4, RM_SEND_DATA) + data
+        else:
+            payload = struct.pack("<I", RM_SEND_DATA) + data
+        async with self._lock:
+            await self.async_connect()
+            try:
+                await self._async_request(CMD_COMMAND, payload)
+            except BroadlinkError:
+                if self._authenticated:
+                    raise
+                # 会话失效时重新认证一次再发送
+                await self._async_auth()
+                await self._async_request(CMD_COMMAND, payload)
+
+    def close(self) -> None:
+        """Close the socket."""
+        if self._transport is not None:
+            self._transport.close()
+        self._transport = None
+        self._authenticated = False
+
+
+class BroadlinkPool:
+    """Keep one session per Broadlink device."""
+
+    def __init__(self) -> None:
+        """Initialize the pool."""
+        self._sessions: dict[tuple[str, int], BroadlinkSession] = {}
+
+    def get(
+        self,
+        host: str,
+        mac: bytes,
+        device_type: str = DEFAULT_DEVICE_TYPE,
+        port: int = DEFAULT_PORT,
+    ) -> BroadlinkSession:
+        """Return the session for a device, creating it on first use.
+
+        An existing session takes the given MAC address and model, so a
+        reconfigured device is used from the next send.
+        """
+        key = (host, port)
+        if (session := self._sessions.get(key)) is None:
+            session = self._sessions[key] = BroadlinkSession(
+                host, mac, device_type, port
+            )
+        else:
+            session.configure(mac, device_type)
+        return session
+
+    def close(self) -> None:
+        """Close every session."""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
@@ -0,0 +1,377 @@
+"""Choreographies: many curtain moves compiled into one schedule.
+
+A choreography is a list of steps ``(curtain, target, offset)``. Before
+anything is sent, the steps are compiled in offset order into one sorted
+list of cues, placing every direction code and every stop code on the
+timeline of the transmitter it goes out on:
+
+- a code occupies its transmitter for the measured airtime, so no two
+  codes on one transmitter are planned to overlap;
+- a direction or stop code shared with another move at the same time on
+  the same transmitter is sent once;
+- a move whose stop slot is taken starts later by the overlap, so its stop
+  still goes out exactly when the curtain's motion model says.
+
+A single executor task then runs the cues on the event loop. Stops are
+owned by the executor rather than by per-curtain timers and are timed from
+the moment the direction code actually went out.
+"""
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_right, insort
+from contextlib import suppress
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+import math
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_CHOREOGRAPHER, DOMAIN
+
+if TYPE_CHECKING:
+    from .cover import BoardlinkCurtain
+
+_LOGGER = logging.getLogger(__name__)
+
+CUE_START = "start"
+CUE_STOP = "stop"
+
+# 同一次唤醒中允许一起处理的截止时间误差（秒）
+TICK_SLACK = 0.005
+
+# 停止码时间槽被占用时，起步时间最多顺延的次数
+MAX_SHIFTS = 16
+
+# 诊断信息中保留的最近运行次数
+HISTORY_SIZE = 8
+
+
+class PlannedMove(NamedTuple):
+    """What a curtain needs for one move, as seen by the compiler."""
+
+    transmitter: str
+    code: bytes | str | None
+    stop_code: bytes | str | None
+    airtime: float
+    run_time: float
+    # 方向码发出后多久发送停止码；移动到端点时为 None
+    stop_offset: float | None
+
+
+@dataclass(order=True)
+class Cue:
+    """A code to send at a time relative to the start of the run."""
+
+    time: float
+    seq: int
+    kind: str = field(compare=False)
+    curtain: BoardlinkCurtain = field(compare=False)
+    target: int | None = field(compare=False)
+
+
+@dataclass
+class Schedule:
+    """The compiled cues of a choreography and what compiling them cost."""
+
+    cues: list[Cue]
+    moves: int = 0
+    skipped: int = 0
+    merged: int = 0
+    delayed: float = 0.0
+    airtime: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        """Return when the last cue is planned, relative to the start."""
+        return self.cues[-1].time if self.cues else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the compile statistics."""
+        return {
+            "moves": self.moves,
+            "skipped": self.skipped,
+            "cues": len(self.cues),
+            "merged": self.merged,
+            "delayed": round(self.delayed, 3),
+            "airtime": round(self.airtime, 3),
+            "duration": round(self.duration, 3),
+        }
+
+
+def _next_free(timeline: list[tuple[float, float]], at: float, airtime: float) -> float:
+    """Return the first time from ``at`` with ``airtime`` free on a timeline."""
+    index = max(bisect_right(timeline, (at, math.inf)) - 1, 0)
+    for start, end in timeline[index:]:
+        if start >= at + airtime:
+            break
+        if end > at:
+            at = end
+    return at
+
+
+def _stop_free(
+    timeline: list[tuple[float, float]],
+    stops: set[tuple[str, bytes | str | None, float]],
+    plan: PlannedMove,
+    at: float,
+) -> bool:
+    """Return whether the stop of a move started at ``at`` can go out on time."""
+    stop = at + plan.stop_offset
+    # 同一时刻的相同停止码可以共用一次发送
+    return (plan.transmitter, plan.stop_code, stop) in stops or _next_free(
+        timeline, stop, plan.airtime
+    ) == stop
+
+
+def _place(
+    timeline: list[tuple[float, float]],
+    stops: set[tuple[str, bytes | str | None, float]],
+    at: float,
+    plan: PlannedMove,
+) -> float:
+    """Return the earliest start from ``at`` whose start and stop slots are free."""
+    for _ in range(MAX_SHIFTS):
+        at = _next_free(timeline, at, plan.airtime)
+        if plan.stop_offset is None or _stop_free(timeline, stops, plan, at):
+            return at
+        # 停止码的时间槽被占用：整次移动顺延，停止时刻仍按运动模型
+        stop = at + plan.stop_offset
+        at += _next_free(timeline, stop, plan.airtime) - stop
+    return at
+
+
+def compile_schedule(steps: list[tuple[BoardlinkCurtain, int, float]]) -> Schedule:
+    """Compile choreography steps into one sorted list of cues.
+
+    Steps of the same curtain are chained, so a later step starts from the
+    target of the earlier one.
+    """
+    schedule = Schedule([])
+    timelines: dict[str, list[tuple[float, float]]] = {}
+    starts: dict[tuple[str, bytes | str | None, float], float] = {}
+    stops: set[tuple[str, bytes | str | None, float]] = set()
+    positions: dict[str, int] = {}
+    seq = itertools.count()
+
+    for curtain, target, offset in sorted(steps, key=lambda step: step[2]):
+        start = positions.get(curtain.unique_id, curtain.current_cover_position)
+        positions[curtain.unique_id] = target
+        if (plan := curtain.async_plan_move(start, target)) is None:
+            schedule.skipped += 1
+            continue
+        schedule.moves += 1
+        timeline = timelines.setdefault(plan.transmitter, [])
+        key = (plan.transmitter, plan.code, offset)
+        at = starts.get(key)
+        if at is not None and (plan.stop_offset is None or _stop_free(timeline, stops, plan, at)):
+            # 同一发射器、同一时刻的相同方向码只发一次
+            schedule.merged += 1
+        else:
+            at = _place(timeline, stops, offset, plan)
+            insort(timeline, (at, at + plan.airtime))
+            starts.setdefault(key, at)
+            schedule.delayed += at - offset
+            schedule.airtime += plan.airtime
+        schedule.cues.append(Cue(at, next(seq), CUE_START, curtain, target))
+        if plan.stop_offset is None:
+            continue
+        stop = at + plan.stop_offset
+        if (stop_key := (plan.transmitter, plan.stop_code, stop)) in stops:
+            schedule.merged += 1
+        else:
+            stops.add(stop_key)
+            insort(timeline, (stop, stop + plan.airtime))
+            schedule.airtime += plan.airtime
+        schedule.cues.append(Cue(stop, next(seq), CUE_STOP, curtain, None))
+
+    schedule.cues.sort()
+    return schedule
+
+
+class ChoreographyRun:
+    """Execute one compiled schedule on the event loop."""
+
+    def __init__(self, hass: HomeAssistant, name: str, schedule: Schedule) -> None:
+        """Initialize the run."""
+        self.hass = hass
+        self.name = name
+        self.schedule = schedule
+        self._heap: list[tuple[float, int, Cue, Any]] = []
+        self._counter = itertools.count()
+        self._wake = asyncio.Event()
+        self._starting = 0
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._cancelled = False
+
+        # 指标
+        self.started = 0
+        self.stopped = 0
+        self.superseded = 0
+        self.failed = 0
+        self.stop_slip_max = 0.0
+        self.elapsed = 0.0
+
+    def _push(self, at: float, cue: Cue, data: Any = None) -> None:
+        """Queue a cue at an absolute loop time."""
+        heapq.heappush(self._heap, (at, next(self._counter), cue, data))
+        self._wake.set()
+
+    async def async_run(self) -> None:
+        """Send every cue at its time, earlier by the transmitter latency."""
+        loop = self.hass.loop
+        base = loop.time()
+        # 停止码不预先入队：方向码送达后按实际发出时刻排入
+        for cue in self.schedule.cues:
+            if cue.kind == CUE_START:
+                self._push(base + cue.time, cue)
+        try:
+            while self._heap or self._starting:
+                if not self._heap:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                at, _, cue, _ = self._heap[0]
+                delay = at - cue.curtain.send_lead - loop.time()
+                if delay > TICK_SLACK:
+                    self._wake.clear()
+                    with suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wake.wait(), delay)
+                    continue
+                # 同一时刻到期的码一起交给发射器队列，相同的码在队列中合并
+                now = loop.time()
+                while self._heap and self._heap[0][0] - self._heap[0][2].curtain.send_lead <= now + TICK_SLACK:
+                    at, _, cue, data = heapq.heappop(self._heap)
+                    self._launch(at, cue, data)
+            if self._tasks:
+                await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            self._async_release()
+            raise
+        finally:
+            self.elapsed = loop.time() - base
+
+    def _launch(self, at: float, cue: Cue, data: Any) -> None:
+        """Start the task sending one cue."""
+        if cue.kind == CUE_START:
+            self._starting += 1
+            coro = self._async_start(cue)
+        else:
+            origin, stop_at = data
+            coro = self._async_stop(cue, origin, stop_at)
+        task = self.hass.async_create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_start(self, cue: Cue) -> None:
+        """Send a direction code and queue the stop it needs."""
+        try:
+            planned = await cue.curtain.async_choreography_move(cue.target)
+        finally:
+            self._starting -= 1
+            self._wake.set()
+        if planned is None:
+            return
+        self.started += 1
+        origin, stop_at = planned
+        if stop_at is None:
+            return
+        if self._cancelled:
+            # 运行已取消：停止码交还给窗帘自己的定时器
+            cue.curtain.async_choreography_release(origin, stop_at)
+            return
+        self._push(stop_at, Cue(stop_at, 0, CUE_STOP, cue.curtain, None), (origin, stop_at))
+
+    async def _async_stop(self, cue: Cue, origin: Any, stop_at: float) -> None:
+        """Send the stop code of a move."""
+        sent = await cue.curtain.async_choreography_stop(origin, stop_at)
+        if sent is None:
+            # 其他指令已接管了这个窗帘
+            self.superseded += 1
+        elif sent:
+            self.stopped += 1
+            self.stop_slip_max = max(self.stop_slip_max, self.hass.loop.time() - stop_at)
+        else:
+            self.failed += 1
+
+    @callback
+    def _async_release(self) -> None:
+        """Hand the stops still queued back to the curtains."""
+        self._cancelled = True
+        for _, _, cue, data in self._heap:
+            if cue.kind == CUE_STOP:
+                cue.curtain.async_choreography_release(*data)
+        self._heap.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the run statistics."""
+        return {
+            "name": self.name,
+            **self.schedule.as_dict(),
+            "started": self.started,
+            "stopped": self.stopped,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "stop_slip_max": round(self.stop_slip_max, 4),
+            "elapsed": round(self.elapsed, 3),
+            "cancelled": self._cancelled,
+        }
+
+
+class Choreographer:
+    """Run choreographies, at most one per name."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the choreographer."""
+        self.hass = hass
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self._history: list[dict[str, Any]] = []
+
+    @property
+    def running(self) -> list[str]:
+        """Return the names of the running choreographies."""
+        return list(self._running)
+
+    async def async_run(
+        self, name: str, steps: list[tuple[BoardlinkCurtain, int, float]]
+    ) -> dict[str, Any]:
+        """Compile and run a choreography, replacing a running one of the same name."""
+        if (previous := self._running.pop(name, None)) is not None:
+            previous.cancel()
+            await asyncio.wait((previous,))
+        run = ChoreographyRun(self.hass, name, compile_schedule(steps))
+        _LOGGER.debug("Choreography %s compiled: %s", name, run.schedule.as_dict())
+        task = self._running[name] = self.hass.async_create_task(run.async_run())
+        # 调用方被取消时运行继续，同名的新运行才会取消它
+        await asyncio.wait((task,))
+        if self._running.get(name) is task:
+            del self._running[name]
+        self._history = [*self._history[-(HISTORY_SIZE - 1):], run.as_dict()]
+        if task.cancelled():
+            _LOGGER.info("Choreography %s replaced by a new run", name)
+            return run.as_dict()
+        _LOGGER.info(
+            "Choreography %s finished: %d moves in %.1fs, %d stops, %d failed",
+            name,
+            run.schedule.moves,
+            run.elapsed,
+            run.stopped,
+            run.failed,
+        )
+        return run.as_dict()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the running choreographies and the last runs."""
+        return {"running": self.running, "history": self._history}
+
+
+@callback
+def async_get_choreographer(hass: HomeAssistant) -> Choreographer:
+    """Return the shared choreographer, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (choreographer := domain_data.get(DATA_CHOREOGRAPHER)) is None:
+        choreographer = domain_data[DATA_CHOREOGRAPHER] = Choreographer(hass)
+    return choreographer
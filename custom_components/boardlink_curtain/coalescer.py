@@ -0,0 +1,92 @@
+"""Collapse bursts of position commands into one net movement."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+from typing import TypeVar
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class CommandCoalescer:
+    """Keep only the last target submitted within a short window.
+
+    The first command of a burst opens the window; every command received
+    before it closes replaces the pending target, and only the final one is
+    executed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        window: float,
+        action: Callable[[int], Awaitable[None]],
+    ) -> None:
+        """Initialize the coalescer."""
+        self.hass = hass
+        self.window = window
+        self._action = action
+        self._pending: int | None = None
+        self._unsub: CALLBACK_TYPE | None = None
+        self._lock = asyncio.Lock()
+        self.submitted = 0
+        self.executed = 0
+
+    @property
+    def pending(self) -> int | None:
+        """Return the target waiting for the window to close."""
+        return self._pending
+
+    async def async_submit(self, target: int) -> None:
+        """Submit a target, executing it now if coalescing is disabled."""
+        self.submitted += 1
+        if self.window <= 0:
+            await self._async_execute(target)
+            return
+        self._pending = target
+        if self._unsub is None:
+            self._unsub = async_call_later(self.hass, self.window, self._async_flush)
+
+    async def async_execute(self, target: int) -> None:
+        """Drop any pending target and execute ``target`` right away."""
+        self.submitted += 1
+        self.async_cancel()
+        await self._async_execute(target)
+
+    async def async_run(self, action: Callable[[], Awaitable[_T]]) -> _T:
+        """Drop any pending target and run another movement under the lock."""
+        self.async_cancel()
+        self.executed += 1
+        return await self.async_run_locked(action)
+
+    async def async_run_locked(self, action: Callable[[], Awaitable[_T]]) -> _T:
+        """Run an action under the lock, keeping the pending target."""
+        async with self._lock:
+            return await action()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop the pending target."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._pending = None
+
+    async def _async_flush(self, _now: object) -> None:
+        """Execute the last target of the burst."""
+        self._unsub = None
+        target, self._pending = self._pending, None
+        if target is not None:
+            await self._async_execute(target)
+
+    async def _async_execute(self, target: int) -> None:
+        """Run the action, one movement at a time."""
+        async with self._lock:
+            self.executed += 1
+            await self._action(target)
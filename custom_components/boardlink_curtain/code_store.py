@@ -0,0 +1,249 @@
+"""Resolved IR code table for Boardlink curtains.
+
+Codes are parsed once, when an entry is set up or a code is entered, into
+ready-to-transmit Broadlink packets. Identical packets are shared by every
+curtain that uses them and the whole table is cached on disk in a small
+binary file so restarts skip the parsing step.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import logging
+import os
+import re
+import struct
+from typing import NamedTuple
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_CODE_STORE = "code_store"
+
+CACHE_FILE = f"{DOMAIN}.codes"
+CACHE_MAGIC = b"BLCC"
+CACHE_VERSION = 2
+SAVE_DELAY = 5
+
+# 博联数据包首字节：红外、RF433、RF315
+BROADLINK_PACKET_TYPES = (0x26, 0xB2, 0xD7)
+
+# 数据包至少包含 4 字节头和几个脉冲；更短的 base64 文本按码名处理。
+# 达到 TRUNCATED_SIZE 且头部像数据包、长度却对不上的才视为被截断的数据包
+MIN_PACKET_SIZE = 8
+TRUNCATED_SIZE = 16
+
+# Pronto 码：以 0000 开头、空格分隔的四位十六进制数
+PRONTO_RE = re.compile(r"^0000(\s+[0-9a-fA-F]{4})+$")
+
+# Pronto 载波周期单位（微秒）与博联脉冲单位（2^-15 秒）
+PRONTO_CLOCK = 0.241246
+BROADLINK_TICK = 269 / 8192
+
+
+class IRCode(NamedTuple):
+    """A resolved code.
+
+    ``packet`` holds the Broadlink bytes to transmit, or ``None`` for
+    code names that are only understood by the script service.
+    """
+
+    source: str
+    packet: bytes | None
+
+
+def pulses_to_broadlink(pulses: list[float]) -> bytes:
+    """Encode pulse lengths in microseconds as a Broadlink IR packet."""
+    body = bytearray()
+    for length in pulses:
+        ticks = round(length * BROADLINK_TICK)
+        if ticks < 256:
+            body.append(ticks)
+        else:
+            body += b"\x00" + ticks.to_bytes(2, "big")
+    body += b"\x0d\x05"
+    return bytes((0x26, 0x00)) + len(body).to_bytes(2, "little") + bytes(body)
+
+
+def pronto_to_broadlink(pronto: str) -> bytes:
+    """Convert a raw Pronto hex code to a Broadlink IR packet."""
+    words = [int(word, 16) for word in pronto.split()]
+    if len(words) < 4 or words[0] != 0 or words[1] == 0:
+        raise ValueError("Not a raw Pronto code")
+    count = 2 * (words[2] + words[3])
+    bursts = words[4:]
+    if count == 0 or len(bursts) != count:
+        raise ValueError("Pronto burst count does not match its header")
+    period = words[1] * PRONTO_CLOCK
+    return pulses_to_broadlink([burst * period for burst in bursts])
+
+
+def decode_code(code: str) -> IRCode:
+    """Parse a configured code.
+
+    Pronto hex and base64 Broadlink packets are turned into packet bytes;
+    anything else is kept as a code name for the script service. Short
+    names that happen to be valid base64 (``stop``, ``shut``) stay names:
+    only text whose decoded header and length describe a packet is one.
+    Raises ``ValueError`` for empty codes, malformed Pronto codes and long
+    base64 text that starts like a packet but is cut short.
+    """
+    text = code.strip()
+    if not text:
+        raise ValueError("Empty code")
+    if PRONTO_RE.match(text):
+        return IRCode(code, pronto_to_broadlink(text))
+    try:
+        data = base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError):
+        return IRCode(code, None)
+    if len(data) < MIN_PACKET_SIZE or data[0] not in BROADLINK_PACKET_TYPES:
+        return IRCode(code, None)
+    if 0 < int.from_bytes(data[2:4], "little") <= len(data) - 4:
+        return IRCode(code, data)
+    if len(data) >= TRUNCATED_SIZE:
+        raise ValueError("Truncated Broadlink packet")
+    return IRCode(code, None)
+
+
+class IRCodeStore:
+    """Deduplicated table of resolved codes shared by all curtains."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._path = hass.config.path(STORAGE_DIR, CACHE_FILE)
+        self._codes: dict[str, IRCode] = {}
+        self._packets: dict[bytes, bytes] = {}
+        self._dirty = False
+        self._unsub_save: CALLBACK_TYPE | None = None
+        self._load_task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        """Return the number of known codes."""
+        return len(self._codes)
+
+    @property
+    def packet_count(self) -> int:
+        """Return the number of distinct packets."""
+        return len(self._packets)
+
+    def get(self, code: str) -> IRCode | None:
+        """Return a resolved code."""
+        return self._codes.get(code)
+
+    @callback
+    def async_resolve(self, code: str) -> IRCode:
+        """Return a resolved code, parsing it the first time it is seen."""
+        if (resolved := self._codes.get(code)) is not None:
+            return resolved
+        resolved = self._add(decode_code(code))
+        self._codes[code] = resolved
+        self._async_schedule_save()
+        return resolved
+
+    def _add(self, resolved: IRCode) -> IRCode:
+        """Share identical packets between codes."""
+        if resolved.packet is None:
+            return resolved
+        packet = self._packets.setdefault(resolved.packet, resolved.packet)
+        return IRCode(resolved.source, packet)
+
+    async def async_load(self) -> None:
+        """Load the cache, once, however many entries ask."""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+        await self._load_task
+
+    async def _async_load(self) -> None:
+        """Load the binary cache written by a previous run."""
+        try:
+            entries = await self.hass.async_add_executor_job(self._read_cache)
+        except (OSError, ValueError, struct.error) as err:
+            _LOGGER.warning("Ignoring unreadable IR code cache %s: %s", self._path, err)
+            return
+        for source, packet in entries:
+            self._codes[source] = self._add(IRCode(source, packet))
+
+    def _read_cache(self) -> list[tuple[str, bytes | None]]:
+        """Read the cache file."""
+        if not os.path.exists(self._path):
+            return []
+        with open(self._path, "rb") as cache:
+            data = cache.read()
+        if data[:4] != CACHE_MAGIC:
+            raise ValueError("Bad cache header")
+        version, count = struct.unpack_from("<HI", data, 4)
+        if version != CACHE_VERSION:
+            return []
+        offset = 10
+        entries: list[tuple[str, bytes | None]] = []
+        for _ in range(count):
+            source_len, packet_len = struct.unpack_from("<HI", data, offset)
+            offset += 6
+            source = data[offset : offset + source_len].decode()
+            offset += source_len
+            # 长度 0xFFFFFFFF 表示仅有码名、没有数据包
+            packet = None
+            if packet_len != 0xFFFFFFFF:
+                packet = data[offset : offset + packet_len]
+                offset += packet_len
+            entries.append((source, packet))
+        return entries
+
+    def _write_cache(self, entries: list[IRCode]) -> None:
+        """Write the cache file atomically."""
+        chunks = [CACHE_MAGIC, struct.pack("<HI", CACHE_VERSION, len(entries))]
+        for source, packet in entries:
+            encoded = source.encode()
+            if packet is None:
+                chunks.append(struct.pack("<HI", len(encoded), 0xFFFFFFFF))
+                chunks.append(encoded)
+            else:
+                chunks.append(struct.pack("<HI", len(encoded), len(packet)))
+                chunks.append(encoded)
+                chunks.append(packet)
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "wb") as cache:
+            cache.write(b"".join(chunks))
+        os.replace(tmp_path, self._path)
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Write the cache shortly after the last change."""
+        self._dirty = True
+        if self._unsub_save is None:
+            self._unsub_save = async_call_later(self.hass, SAVE_DELAY, self.async_save)
+
+    async def async_save(self, _now: object = None) -> None:
+        """Persist the table if it changed."""
+        if self._unsub_save is not None:
+            self._unsub_save()
+            self._unsub_save = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await self.hass.async_add_executor_job(
+                self._write_cache, list(self._codes.values())
+            )
+        except OSError as err:
+            _LOGGER.error("Failed to write IR code cache %s: %s", self._path, err)
+
+
+async def async_get_code_store(hass: HomeAssistant) -> IRCodeStore:
+    """Return the shared code store, loading the cache on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (store := domain_data.get(DATA_CODE_STORE)) is None:
+        store = domain_data[DATA_CODE_STORE] = IRCodeStore(hass)
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_FINAL_WRITE, store.async_save)
+    await store.async_load()
+    return store
@@ -1,24 +1,196 @@
 """Config flow for Boardlink Curtain integration."""
+import asyncio
+import json
 import logging
 from typing import Any
 import voluptuous as vol
+import yaml
 
 from homeassistant import config_entries
-from homeassistant.core import callback
+from homeassistant.core import callback, valid_entity_id
 from homeassistant.data_entry_flow import FlowResult
 
 from .const import (
+    BROADLINK_TYPES,
+    COMMAND_CLOSE,
+    COMMAND_OPEN,
+    COMMAND_STOP,
+    CONF_BROADLINK_HOST,
+    CONF_BROADLINK_MAC,
+    CONF_BROADLINK_TYPE,
     CONF_CLOSE_CODE,
     CONF_CLOSE_TIME,
+    CONF_CLOSED_SENSOR,
+    CONF_COALESCE_WINDOW,
+    CONF_CURRENT_SENSOR,
+    CONF_CURRENT_THRESHOLD,
+    CONF_CURTAINS,
+    CONF_MAX_UPDATE_RATE,
+    CONF_MQTT_TOPIC,
     CONF_OPEN_CODE,
+    CONF_OPEN_SENSOR,
+    CONF_OPEN_TIME,
     CONF_PAUSE_CODE,
+    CONF_START_LATENCY,
+    CONF_STOP_LATENCY,
+    CONF_TRANSMITTER,
+    CONF_TRANSPORT,
+    CONF_TRAVEL_PROFILE,
+    CURTAIN_CLOSE,
+    CURTAIN_OPEN,
+    DATA_ENTITIES,
+    DEFAULT_BROADLINK_TYPE,
     DEFAULT_CLOSE_TIME,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_CURRENT_THRESHOLD,
+    DEFAULT_IMPORT_FILE,
+    DEFAULT_MAX_UPDATE_RATE,
+    DEFAULT_TRANSMITTER,
+    DEFAULT_TRANSPORT,
     DOMAIN,
+    TRANSPORT_MQTT,
+    TRANSPORTS,
 )
+from .startup import async_import_modules
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# 校验用到的码表解析和行程曲线模块，在校验前由执行器导入
+VALIDATION_MODULES = ("code_store", "motion_model", "transport")
+
+
+def _validate_codes(user_input: dict[str, Any]) -> dict[str, str]:
+    """Parse every configured code once and report the malformed ones."""
+    from .code_store import decode_code
+    from .motion_model import parse_profile
+    from .transport import parse_host, parse_mac
+
+    errors = {}
+    for key in (CONF_OPEN_CODE, CONF_CLOSE_CODE, CONF_PAUSE_CODE):
+        try:
+            decode_code(user_input[key])
+        except ValueError:
+            errors[key] = "红外码格式无效"
+    if user_input.get(CONF_TRANSPORT) == TRANSPORT_MQTT and not user_input.get(CONF_MQTT_TOPIC):
+        errors[CONF_MQTT_TOPIC] = "MQTT 电机需要填写命令主题"
+    if user_input.get(CONF_BROADLINK_HOST):
+        try:
+            parse_host(user_input[CONF_BROADLINK_HOST])
+        except ValueError:
+            errors[CONF_BROADLINK_HOST] = "博联设备地址格式无效，应为 主机 或 主机:端口"
+    try:
+        parse_mac(user_input.get(CONF_BROADLINK_MAC))
+    except ValueError:
+        errors[CONF_BROADLINK_MAC] = "MAC 地址格式无效，应为 6 字节十六进制"
+    try:
+        parse_profile(user_input.get(CONF_TRAVEL_PROFILE))
+    except (TypeError, ValueError):
+        errors[CONF_TRAVEL_PROFILE] = "行程曲线格式无效"
+    for key in (CONF_OPEN_SENSOR, CONF_CLOSED_SENSOR, CONF_CURRENT_SENSOR):
+        if user_input.get(key) and not valid_entity_id(user_input[key]):
+            errors[key] = "实体 ID 格式无效"
+    return errors
+
+
+def _travel_profile(value: Any) -> str:
+    """Validate a travel profile given as text or a list of points."""
+    from .motion_model import format_profile, parse_profile
+
+    try:
+        return format_profile(parse_profile(value))
+    except (TypeError, ValueError) as err:
+        raise vol.Invalid("行程曲线格式无效") from err
+
+
+CONF_PATH = "path"
+CONF_CURTAIN = "curtain"
+CONF_POSITION = "position"
+
+# 校准时把开帘行程分成的段数：前几段定时停止，最后一段开到底
+CALIBRATION_STEPS = 4
+
+# 批量导入时单个窗帘的配置格式
+CURTAIN_SCHEMA = vol.Schema({
+    vol.Required("name"): vol.All(str, vol.Length(min=1)),
+    vol.Required(CONF_OPEN_CODE): vol.All(str, vol.Length(min=1)),
+    vol.Required(CONF_CLOSE_CODE): vol.All(str, vol.Length(min=1)),
+    vol.Required(CONF_PAUSE_CODE): vol.All(str, vol.Length(min=1)),
+    vol.Optional(CONF_CLOSE_TIME, default=DEFAULT_CLOSE_TIME): vol.All(
+        vol.Coerce(float), vol.Range(min=1)
+    ),
+    vol.Optional(CONF_OPEN_TIME): vol.All(vol.Coerce(float), vol.Range(min=1)),
+    vol.Optional(CONF_START_LATENCY, default=0.0): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=5)
+    ),
+    vol.Optional(CONF_STOP_LATENCY, default=0.0): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=5)
+    ),
+    vol.Optional(CONF_TRAVEL_PROFILE, default=""): _travel_profile,
+    vol.Optional(CONF_MAX_UPDATE_RATE, default=DEFAULT_MAX_UPDATE_RATE): vol.All(
+        vol.Coerce(float), vol.Range(min=0.1, max=20)
+    ),
+    vol.Optional(CONF_COALESCE_WINDOW, default=DEFAULT_COALESCE_WINDOW): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=5)
+    ),
+    vol.Optional(CONF_TRANSPORT, default=DEFAULT_TRANSPORT): vol.In(TRANSPORTS),
+    vol.Optional(CONF_TRANSMITTER, default=DEFAULT_TRANSMITTER): str,
+    vol.Optional(CONF_BROADLINK_HOST, default=""): str,
+    vol.Optional(CONF_BROADLINK_MAC, default=""): str,
+    vol.Optional(CONF_BROADLINK_TYPE, default=DEFAULT_BROADLINK_TYPE): vol.In(BROADLINK_TYPES),
+    vol.Optional(CONF_MQTT_TOPIC, default=""): str,
+    vol.Optional(CONF_OPEN_SENSOR, default=""): str,
+    vol.Optional(CONF_CLOSED_SENSOR, default=""): str,
+    vol.Optional(CONF_CURRENT_SENSOR, default=""): str,
+    vol.Optional(CONF_CURRENT_THRESHOLD, default=DEFAULT_CURRENT_THRESHOLD): vol.All(
+        vol.Coerce(float), vol.Range(min=0)
+    ),
+})
+
+
+def validate_curtains(curtains: Any) -> tuple[list[dict[str, Any]], list[str]]:
+    """Validate a list of curtain definitions in one pass.
+
+    Returns the normalised curtains and a message for every invalid one.
+    """
+    if not isinstance(curtains, list) or not curtains:
+        return [], ["窗帘列表为空或格式错误"]
+    valid: list[dict[str, Any]] = []
+    problems: list[str] = []
+    names: set[str] = set()
+    for index, raw in enumerate(curtains, start=1):
+        try:
+            curtain = CURTAIN_SCHEMA(raw)
+        except vol.Invalid as err:
+            problems.append(f"第{index}个窗帘: {err}")
+            continue
+        if curtain["name"] in names:
+            problems.append(f"第{index}个窗帘: 名称 {curtain['name']} 重复")
+            continue
+        if code_errors := _validate_codes(curtain):
+            problems.append(
+                f"第{index}个窗帘: "
+                + ", ".join(f"{key} {message}" for key, message in code_errors.items())
+            )
+            continue
+        names.add(curtain["name"])
+        valid.append(curtain)
+    return valid, problems
+
+
+def load_curtain_file(path: str) -> Any:
+    """Read curtain definitions from a JSON or YAML file."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            data = yaml.safe_load(file)
+        else:
+            data = json.load(file)
+    # 也接受 {"curtains": [...]} 的写法
+    if isinstance(data, dict) and CONF_CURTAINS in data:
+        return data[CONF_CURTAINS]
+    return data
+
+
 class BoardlinkCurtainConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Boardlink Curtain."""
 
@@ -28,9 +200,22 @@ class BoardlinkCurtainConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
+        if user_input is not None:
+            return await self.async_step_curtain(user_input)
+
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=["curtain", "import_file"],
+        )
+
+    async def async_step_curtain(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Add a single curtain."""
         errors = {}
 
         if user_input is not None:
+            await async_import_modules(self.hass, *VALIDATION_MODULES)
             # 验证输入
             if not user_input.get("name"):
                 errors["name"] = "名称不能为空"
@@ -40,6 +225,8 @@ class BoardlinkCurtainConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["close_code"] = "关帘红外码不能为空"
             elif not user_input.get(CONF_PAUSE_CODE):
                 errors["pause_code"] = "暂停红外码不能为空"
+            else:
+                errors.update(_validate_codes(user_input))
             
             if not errors:
                 # 检查设备名称是否已存在
@@ -60,17 +247,83 @@ class BoardlinkCurtainConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Required(CONF_CLOSE_CODE, default="send_close"): str,
             vol.Required(CONF_PAUSE_CODE, default="send_stop"): str,
             vol.Required(CONF_CLOSE_TIME, default=DEFAULT_CLOSE_TIME): int,
+            vol.Optional(CONF_MAX_UPDATE_RATE, default=DEFAULT_MAX_UPDATE_RATE): vol.All(
+                vol.Coerce(float), vol.Range(min=0.1, max=20)
+            ),
+            vol.Optional(CONF_COALESCE_WINDOW, default=DEFAULT_COALESCE_WINDOW): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=5)
+            ),
+            vol.Optional(CONF_TRANSPORT, default=DEFAULT_TRANSPORT): vol.In(TRANSPORTS),
+            vol.Optional(CONF_TRANSMITTER, default=DEFAULT_TRANSMITTER): str,
+            vol.Optional(CONF_BROADLINK_HOST, default=""): str,
+            vol.Optional(CONF_BROADLINK_MAC, default=""): str,
+            vol.Optional(CONF_BROADLINK_TYPE, default=DEFAULT_BROADLINK_TYPE): vol.In(BROADLINK_TYPES),
+            vol.Optional(CONF_MQTT_TOPIC, default=""): str,
         })
 
         return self.async_show_form(
-            step_id="user",
+            step_id="curtain",
+            data_schema=data_schema,
+            errors=errors,
+        )
+
+    async def async_step_import_file(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Create a hub holding every curtain defined in a JSON/YAML file."""
+        errors = {}
+
+        if user_input is not None:
+            path = self.hass.config.path(user_input[CONF_PATH])
+            existing_entries = self.hass.config_entries.async_entries(DOMAIN)
+            if any(entry.title == user_input["name"] for entry in existing_entries):
+                errors["name"] = "该设备名称已存在"
+            else:
+                try:
+                    raw = await self.hass.async_add_executor_job(load_curtain_file, path)
+                except (OSError, ValueError, yaml.YAMLError) as err:
+                    _LOGGER.error("Failed to read curtain file %s: %s", path, err)
+                    errors[CONF_PATH] = "无法读取窗帘配置文件"
+                else:
+                    await async_import_modules(self.hass, *VALIDATION_MODULES)
+                    curtains, problems = validate_curtains(raw)
+                    if problems:
+                        _LOGGER.error("Invalid curtains in %s: %s", path, "; ".join(problems))
+                        errors[CONF_PATH] = problems[0]
+                    else:
+                        return self.async_create_entry(
+                            title=user_input["name"],
+                            data={"name": user_input["name"], CONF_CURTAINS: curtains},
+                        )
+
+        data_schema = vol.Schema({
+            vol.Required("name", default="窗帘集线器"): str,
+            vol.Required(CONF_PATH, default=DEFAULT_IMPORT_FILE): str,
+        })
+
+        return self.async_show_form(
+            step_id="import_file",
             data_schema=data_schema,
             errors=errors,
         )
 
     async def async_step_import(self, import_data: dict[str, Any]) -> FlowResult:
         """Handle import from YAML configuration."""
-        return await self.async_step_user(import_data)
+        if CONF_CURTAINS not in import_data:
+            return await self.async_step_curtain(import_data)
+
+        await async_import_modules(self.hass, *VALIDATION_MODULES)
+        curtains, problems = validate_curtains(import_data[CONF_CURTAINS])
+        if problems:
+            _LOGGER.error("Invalid curtains in YAML configuration: %s", "; ".join(problems))
+            return self.async_abort(reason="invalid_curtains")
+        name = import_data.get("name", "YAML")
+        if any(entry.title == name for entry in self.hass.config_entries.async_entries(DOMAIN)):
+            return self.async_abort(reason="already_configured")
+        return self.async_create_entry(
+            title=name,
+            data={"name": name, CONF_CURTAINS: curtains},
+        )
 
     @staticmethod
     @callback
@@ -87,43 +340,367 @@ class BoardlinkCurtainOptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialize options flow."""
         self.config_entry = config_entry
+        self._curtain: str | None = None
+        # 校准过程中的测量值与定时停止任务
+        self._calibration: dict[str, Any] = {}
+        self._leg: asyncio.Task[float | None] | None = None
 
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Manage the options."""
+        if CONF_CURTAINS in self.config_entry.data:
+            # 集线器先选择要修改的窗帘
+            return await self.async_step_select_curtain()
+
+        return self.async_show_menu(step_id="init", menu_options=["settings", "calibrate"])
+
+    async def async_step_settings(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Modify the settings of a single curtain."""
         errors = {}
 
         if user_input is not None:
-            # 验证输入
-            if not user_input.get(CONF_OPEN_CODE):
-                errors["open_code"] = "开帘红外码不能为空"
-            elif not user_input.get(CONF_CLOSE_CODE):
-                errors["close_code"] = "关帘红外码不能为空"
-            elif not user_input.get(CONF_PAUSE_CODE):
-                errors["pause_code"] = "暂停红外码不能为空"
-            
+            await async_import_modules(self.hass, *VALIDATION_MODULES)
+            errors = _validate_options(user_input)
             if not errors:
-                # 更新配置项
+                # 更新配置项，运行中的窗帘会立即应用新选项
                 return self.async_create_entry(
                     title="",
-                    data=user_input,
+                    data=_clear_open_time(user_input, self.config_entry.data),
                 )
 
-        # 获取当前配置
-        current_data = self.config_entry.data
+        # 获取当前配置（已保存的选项优先）
+        current_data = {**self.config_entry.data, **self.config_entry.options}
 
         # 默认值
         data_schema = vol.Schema({
             vol.Required("name", default=current_data.get("name", "窗帘")): str,
-            vol.Required(CONF_OPEN_CODE, default=current_data.get(CONF_OPEN_CODE, "send_open")): str,
-            vol.Required(CONF_CLOSE_CODE, default=current_data.get(CONF_CLOSE_CODE, "send_close")): str,
-            vol.Required(CONF_PAUSE_CODE, default=current_data.get(CONF_PAUSE_CODE, "send_stop")): str,
-            vol.Required(CONF_CLOSE_TIME, default=current_data.get(CONF_CLOSE_TIME, DEFAULT_CLOSE_TIME)): int,
+            **_options_schema(current_data),
         })
 
         return self.async_show_form(
-            step_id="init",
+            step_id="settings",
             data_schema=data_schema,
             errors=errors,
-        )
\ No newline at end of file
+        )
+
+    async def async_step_select_curtain(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Pick the hub curtain to modify."""
+        if user_input is not None:
+            self._curtain = user_input[CONF_CURTAIN]
+            return await self.async_step_curtain_menu()
+
+        names = [curtain["name"] for curtain in self.config_entry.data[CONF_CURTAINS]]
+        return self.async_show_form(
+            step_id="select_curtain",
+            data_schema=vol.Schema({vol.Required(CONF_CURTAIN): vol.In(names)}),
+        )
+
+    async def async_step_curtain_menu(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Choose between the settings and the calibration of a hub curtain."""
+        return self.async_show_menu(
+            step_id="curtain_menu",
+            menu_options=["curtain", "calibrate"],
+            description_placeholders={"name": self._curtain},
+        )
+
+    async def async_step_curtain(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Modify one curtain of a hub."""
+        errors = {}
+        overrides = dict(self.config_entry.options.get(CONF_CURTAINS, {}))
+        curtain = next(
+            curtain
+            for curtain in self.config_entry.data[CONF_CURTAINS]
+            if curtain["name"] == self._curtain
+        )
+
+        if user_input is not None:
+            await async_import_modules(self.hass, *VALIDATION_MODULES)
+            errors = _validate_options(user_input)
+            if not errors:
+                # 集线器的选项按窗帘名称保存，其他窗帘保持不变
+                overrides[self._curtain] = _clear_open_time(user_input, curtain)
+                return self.async_create_entry(
+                    title="",
+                    data={**self.config_entry.options, CONF_CURTAINS: overrides},
+                )
+
+        current_data = {**curtain, **overrides.get(self._curtain, {})}
+
+        return self.async_show_form(
+            step_id="curtain",
+            data_schema=vol.Schema(_options_schema(current_data)),
+            description_placeholders={"name": self._curtain},
+            errors=errors,
+        )
+
+    def _calibration_entity(self) -> Any:
+        """Return the running curtain being calibrated, or ``None``."""
+        unique_id = self.config_entry.entry_id
+        if self._curtain is not None:
+            unique_id = f"{unique_id}_{self._curtain}"
+        return self.hass.data.get(DOMAIN, {}).get(DATA_ENTITIES, {}).get(unique_id)
+
+    async def _async_calibration_send(self, command: str) -> float | None:
+        """Send a code to the curtain being calibrated and return when it went out."""
+        if (entity := self._calibration_entity()) is None:
+            return None
+        return await entity.async_calibration_send(command)
+
+    async def _async_calibration_leg(self, sent: float, stop_at: float) -> float | None:
+        """Stop the curtain at ``stop_at`` and return how long it was opening."""
+        await asyncio.sleep(max(stop_at - self.hass.loop.time(), 0.0))
+        if (stopped := await self._async_calibration_send(COMMAND_STOP)) is None:
+            return None
+        return stopped - sent
+
+    async def _async_start_leg(self) -> bool:
+        """Open the curtain for one step of the travel time, then stop it."""
+        if (sent := await self._async_calibration_send(COMMAND_OPEN)) is None:
+            return False
+        step = self._calibration["open_total"] / CALIBRATION_STEPS
+        self._leg = self.hass.async_create_task(self._async_calibration_leg(sent, sent + step))
+        return True
+
+    async def async_step_calibrate(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Explain the calibration and close the curtain to start from."""
+        errors = {}
+        if user_input is not None:
+            if await self._async_calibration_send(COMMAND_CLOSE) is None:
+                errors["base"] = "校准指令发送失败，请确认窗帘已加载"
+            else:
+                self._calibration = {}
+                return self.async_show_form(step_id="calibrate_closed")
+        return self.async_show_form(
+            step_id="calibrate",
+            description_placeholders={"steps": str(CALIBRATION_STEPS - 1)},
+            errors=errors,
+        )
+
+    async def async_step_calibrate_closed(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Open the fully closed curtain and start timing."""
+        if (sent := await self._async_calibration_send(COMMAND_OPEN)) is None:
+            return self.async_show_form(
+                step_id="calibrate_closed", errors={"base": "校准指令发送失败，请确认窗帘已加载"}
+            )
+        self._calibration["open_sent"] = sent
+        return self.async_show_form(step_id="calibrate_open")
+
+    async def async_step_calibrate_open(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Record the full opening time and close the curtain again."""
+        now = self.hass.loop.time()
+        if (sent := await self._async_calibration_send(COMMAND_CLOSE)) is None:
+            return self.async_show_form(
+                step_id="calibrate_open", errors={"base": "校准指令发送失败，请确认窗帘已加载"}
+            )
+        self._calibration["open_total"] = now - self._calibration["open_sent"]
+        self._calibration["close_sent"] = sent
+        return self.async_show_form(step_id="calibrate_close")
+
+    async def async_step_calibrate_close(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Record the full closing time and open the curtain by one step."""
+        now = self.hass.loop.time()
+        if not await self._async_start_leg():
+            return self.async_show_form(
+                step_id="calibrate_close", errors={"base": "校准指令发送失败，请确认窗帘已加载"}
+            )
+        self._calibration["close_total"] = now - self._calibration["close_sent"]
+        self._calibration["legs"] = []
+        return self._show_calibrate_point()
+
+    def _show_calibrate_point(self, errors: dict[str, str] | None = None) -> FlowResult:
+        """Ask where the curtain stopped after the current step."""
+        return self.async_show_form(
+            step_id="calibrate_point",
+            data_schema=vol.Schema({
+                vol.Required(CONF_POSITION): vol.All(vol.Coerce(int), vol.Range(min=1, max=99)),
+            }),
+            description_placeholders={
+                "step": str(len(self._calibration["legs"]) + 1),
+                "steps": str(CALIBRATION_STEPS - 1),
+            },
+            errors=errors or {},
+        )
+
+    async def async_step_calibrate_point(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Record where a step stopped and start the next one."""
+        if user_input is None:
+            return self._show_calibrate_point()
+        legs: list[tuple[float, int]] = self._calibration["legs"]
+        position = user_input[CONF_POSITION]
+        if legs and position <= legs[-1][1]:
+            return self._show_calibrate_point({CONF_POSITION: "位置应大于上一次停下的位置"})
+        if (elapsed := await self._leg) is None:
+            return self.async_abort(reason="calibration_failed")
+        legs.append((elapsed, position))
+        if len(legs) < CALIBRATION_STEPS - 1:
+            if not await self._async_start_leg():
+                return self.async_abort(reason="calibration_failed")
+            return self._show_calibrate_point()
+        # 最后一段开到底，由用户计时
+        if (sent := await self._async_calibration_send(COMMAND_OPEN)) is None:
+            return self.async_abort(reason="calibration_failed")
+        self._calibration["final_sent"] = sent
+        return self.async_show_form(step_id="calibrate_finish")
+
+    async def async_step_calibrate_finish(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Work out the motion model from the measurements."""
+        calibration = self._calibration
+        final = self.hass.loop.time() - calibration["final_sent"]
+        await async_import_modules(self.hass, *VALIDATION_MODULES)
+        values = calibrate_motion(
+            calibration["open_total"], calibration["close_total"], calibration["legs"], final
+        )
+        if values is None:
+            return self.async_abort(reason="calibration_failed")
+        if (entity := self._calibration_entity()) is not None:
+            entity.async_calibration_done(CURTAIN_OPEN)
+        calibration["values"] = values
+        return self.async_show_form(
+            step_id="calibrate_result",
+            description_placeholders={
+                key: str(value) if value != "" else "-" for key, value in values.items()
+            },
+        )
+
+    async def async_step_calibrate_result(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Save the calibrated motion model."""
+        values = self._calibration["values"]
+        if self._curtain is None:
+            return self.async_create_entry(
+                title="", data={**self.config_entry.options, **values}
+            )
+        overrides = dict(self.config_entry.options.get(CONF_CURTAINS, {}))
+        overrides[self._curtain] = {**overrides.get(self._curtain, {}), **values}
+        return self.async_create_entry(
+            title="",
+            data={**self.config_entry.options, CONF_CURTAINS: overrides},
+        )
+
+
+def calibrate_motion(
+    open_total: float,
+    close_total: float,
+    legs: list[tuple[float, int]],
+    final: float,
+) -> dict[str, Any] | None:
+    """Derive a motion model from the calibration measurements.
+
+    ``open_total`` and ``close_total`` are the full travel times timed by
+    the user from the direction code, ``legs`` holds the time between the
+    open and stop codes of each partial step with the position it reached,
+    and ``final`` is the time of the last step up to fully open. Returns the
+    option values, or ``None`` when the measurements do not add up.
+    """
+    from .motion_model import format_profile, parse_profile
+
+    # 每段的运行时间 = 定时 - 起步延迟 + 停止滑行；各段运行时间之和等于全程开帘时间
+    latency = (sum(elapsed for elapsed, _ in legs) + final - open_total) / len(legs)
+    start_latency = max(latency, 0.0)
+    stop_latency = max(-latency, 0.0)
+    open_time = open_total - start_latency
+    close_time = close_total - start_latency
+    if open_time < 1 or close_time < 1:
+        return None
+
+    # 各段停下的位置与累计运行时间占比组成行程曲线；接近匀速时不保存
+    points = []
+    moved = 0.0
+    for elapsed, position in legs:
+        moved += elapsed - latency
+        points.append([float(position), round(moved / open_time * 100.0, 1)])
+    try:
+        profile = parse_profile(points)
+    except ValueError:
+        profile = None
+    if profile is not None and all(abs(position - share) < 2 for position, share in profile):
+        profile = None
+    return {
+        CONF_OPEN_TIME: round(open_time, 2),
+        CONF_CLOSE_TIME: round(close_time, 2),
+        CONF_START_LATENCY: round(start_latency, 3),
+        CONF_STOP_LATENCY: round(stop_latency, 3),
+        CONF_TRAVEL_PROFILE: format_profile(profile),
+    }
+
+
+def _validate_options(user_input: dict[str, Any]) -> dict[str, str]:
+    """Check the codes entered in an options form."""
+    if not user_input.get(CONF_OPEN_CODE):
+        return {"open_code": "开帘红外码不能为空"}
+    if not user_input.get(CONF_CLOSE_CODE):
+        return {"close_code": "关帘红外码不能为空"}
+    if not user_input.get(CONF_PAUSE_CODE):
+        return {"pause_code": "暂停红外码不能为空"}
+    return _validate_codes(user_input)
+
+
+def _clear_open_time(user_input: dict[str, Any], data: dict[str, Any]) -> dict[str, Any]:
+    """Mark an emptied opening time so it no longer falls back to ``data``."""
+    if CONF_OPEN_TIME not in user_input and data.get(CONF_OPEN_TIME):
+        # 选项覆盖在配置数据之上，留空必须显式清除原来的开帘时间
+        return {**user_input, CONF_OPEN_TIME: None}
+    return user_input
+
+
+def _options_schema(current_data: dict[str, Any]) -> dict[Any, Any]:
+    """Return the option fields of a curtain, defaulting to its current values."""
+    return {
+        vol.Required(CONF_OPEN_CODE, default=current_data.get(CONF_OPEN_CODE, "send_open")): str,
+        vol.Required(CONF_CLOSE_CODE, default=current_data.get(CONF_CLOSE_CODE, "send_close")): str,
+        vol.Required(CONF_PAUSE_CODE, default=current_data.get(CONF_PAUSE_CODE, "send_stop")): str,
+        vol.Required(CONF_CLOSE_TIME, default=current_data.get(CONF_CLOSE_TIME, DEFAULT_CLOSE_TIME)): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+        # 开帘时间只作建议值：留空时不保存，运行时沿用关闭时间
+        vol.Optional(CONF_OPEN_TIME, description={"suggested_value": current_data.get(CONF_OPEN_TIME)}): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+        vol.Optional(CONF_START_LATENCY, default=current_data.get(CONF_START_LATENCY, 0.0)): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=5)
+        ),
+        vol.Optional(CONF_STOP_LATENCY, default=current_data.get(CONF_STOP_LATENCY, 0.0)): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=5)
+        ),
+        vol.Optional(CONF_TRAVEL_PROFILE, default=current_data.get(CONF_TRAVEL_PROFILE, "")): str,
+        vol.Optional(CONF_MAX_UPDATE_RATE, default=current_data.get(CONF_MAX_UPDATE_RATE, DEFAULT_MAX_UPDATE_RATE)): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=20)
+        ),
+        vol.Optional(CONF_COALESCE_WINDOW, default=current_data.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW)): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=5)
+        ),
+        vol.Optional(CONF_TRANSPORT, default=current_data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)): vol.In(TRANSPORTS),
+        vol.Optional(CONF_TRANSMITTER, default=current_data.get(CONF_TRANSMITTER, DEFAULT_TRANSMITTER)): str,
+        vol.Optional(CONF_BROADLINK_HOST, default=current_data.get(CONF_BROADLINK_HOST, "")): str,
+        vol.Optional(CONF_BROADLINK_MAC, default=current_data.get(CONF_BROADLINK_MAC, "")): str,
+        vol.Optional(CONF_BROADLINK_TYPE, default=current_data.get(CONF_BROADLINK_TYPE, DEFAULT_BROADLINK_TYPE)): vol.In(BROADLINK_TYPES),
+        vol.Optional(CONF_MQTT_TOPIC, default=current_data.get(CONF_MQTT_TOPIC, "")): str,
+        vol.Optional(CONF_OPEN_SENSOR, default=current_data.get(CONF_OPEN_SENSOR, "")): str,
+        vol.Optional(CONF_CLOSED_SENSOR, default=current_data.get(CONF_CLOSED_SENSOR, "")): str,
+        vol.Optional(CONF_CURRENT_SENSOR, default=current_data.get(CONF_CURRENT_SENSOR, "")): str,
+        vol.Optional(CONF_CURRENT_THRESHOLD, default=current_data.get(CONF_CURRENT_THRESHOLD, DEFAULT_CURRENT_THRESHOLD)): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+    }
@@ -8,6 +8,75 @@ CONF_OPEN_CODE: Final = "open_code"
 CONF_CLOSE_CODE: Final = "close_code"
 CONF_PAUSE_CODE: Final = "pause_code"
 CONF_CLOSE_TIME: Final = "close_time"
+CONF_OPEN_TIME: Final = "open_time"
+CONF_START_LATENCY: Final = "start_latency"
+CONF_STOP_LATENCY: Final = "stop_latency"
+CONF_TRAVEL_PROFILE: Final = "travel_profile"
+CONF_MAX_UPDATE_RATE: Final = "max_update_rate"
+CONF_TRANSMITTER: Final = "transmitter"
+CONF_COALESCE_WINDOW: Final = "coalesce_window"
+CONF_CURTAINS: Final = "curtains"
+CONF_BROADLINK_HOST: Final = "broadlink_host"
+CONF_BROADLINK_MAC: Final = "broadlink_mac"
+CONF_BROADLINK_TYPE: Final = "broadlink_type"
+CONF_TRANSPORT: Final = "transport"
+CONF_MQTT_TOPIC: Final = "mqtt_topic"
+CONF_OPEN_SENSOR: Final = "open_sensor"
+CONF_CLOSED_SENSOR: Final = "closed_sensor"
+CONF_CURRENT_SENSOR: Final = "current_sensor"
+CONF_CURRENT_THRESHOLD: Final = "current_threshold"
+
+# 传输方式：红外（脚本或博联直连）、博联 RF433、MQTT 电机
+TRANSPORT_IR: Final = "ir"
+TRANSPORT_RF: Final = "rf"
+TRANSPORT_MQTT: Final = "mqtt"
+TRANSPORTS: Final = [TRANSPORT_IR, TRANSPORT_RF, TRANSPORT_MQTT]
 
 # Default values
-DEFAULT_CLOSE_TIME: Final = 30
\ No newline at end of file
+DEFAULT_CLOSE_TIME: Final = 30
+# 每个实体每秒最多写入状态的次数
+DEFAULT_MAX_UPDATE_RATE: Final = 2.0
+DEFAULT_TRANSMITTER: Final = "default"
+# 批量导入的默认文件（相对于配置目录）
+DEFAULT_IMPORT_FILE: Final = "curtain_configs.json"
+# 连续位置指令的合并窗口（秒），0 表示不合并
+DEFAULT_COALESCE_WINDOW: Final = 0.3
+# 单条红外码占用发射器的最短时间（秒）
+DEFAULT_AIRTIME: Final = 0.2
+# RF 遥控会重复发送同一帧，单条码占用时间更长
+RF_AIRTIME: Final = 0.5
+DEFAULT_TRANSPORT: Final = TRANSPORT_IR
+# 单条码的发送超时（秒），超时视为发送失败并重试
+SEND_TIMEOUT: Final = 5.0
+# 电机电流（或功率）不高于该值即视为已停转，单位与传感器相同
+DEFAULT_CURRENT_THRESHOLD: Final = 0.1
+
+# 窗帘状态常量
+CURTAIN_OPEN: Final = 100  # 完全开启 100%
+CURTAIN_CLOSE: Final = 0  # 完全关闭 0%
+
+# hass.data[DOMAIN] 中按 unique_id 保存运行中窗帘实体的键
+DATA_ENTITIES: Final = "entities"
+
+# 编排器只在第一次调用编排服务时创建，诊断信息按此键读取而不导入编排模块
+DATA_CHOREOGRAPHER: Final = "choreographer"
+
+# 服务导出文件的默认名称（相对于配置目录）
+DEFAULT_TRACE_FILE: Final = f"{DOMAIN}_trace.jsonl"
+DEFAULT_EVENTS_FILE: Final = f"{DOMAIN}_events.json"
+
+# 指令名称（轨迹与校准共用）
+COMMAND_OPEN: Final = "open"
+COMMAND_CLOSE: Final = "close"
+COMMAND_STOP: Final = "stop"
+COMMAND_SET_POSITION: Final = "set_position"
+
+# 位置表版本参数（服务与 websocket 共用）
+ATTR_SINCE: Final = "since"
+
+# 选项更新后通知窗帘的信号，参数为配置项 ID
+SIGNAL_OPTIONS_UPDATED: Final = f"{DOMAIN}_options_updated_{{}}"
+
+# 支持直连的博联设备型号
+BROADLINK_TYPES: Final = ["RM2", "RM3", "RM_MINI3", "RM4", "RM4C", "RM4_MINI", "RM4_PRO"]
+DEFAULT_BROADLINK_TYPE: Final = "RM4"
@@ -1,8 +1,10 @@
 """Support for Boardlink curtain."""
+from __future__ import annotations
+
 import asyncio
 import logging
 import time
-from typing import Any, Final
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.components.cover import (
     ATTR_POSITION,
@@ -10,39 +12,145 @@ from homeassistant.components.cover import (
     CoverEntityFeature,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
+    COMMAND_CLOSE,
+    COMMAND_OPEN,
+    COMMAND_SET_POSITION,
+    COMMAND_STOP,
+    CONF_BROADLINK_HOST,
+    CONF_BROADLINK_MAC,
+    CONF_BROADLINK_TYPE,
     CONF_CLOSE_CODE,
-    CONF_CLOSE_TIME,
+    CONF_COALESCE_WINDOW,
+    CONF_CURTAINS,
+    CONF_MAX_UPDATE_RATE,
+    CONF_MQTT_TOPIC,
     CONF_OPEN_CODE,
     CONF_PAUSE_CODE,
-    DEFAULT_CLOSE_TIME,
+    CONF_TRANSMITTER,
+    CONF_TRANSPORT,
+    CURTAIN_CLOSE,
+    CURTAIN_OPEN,
+    DATA_ENTITIES,
+    DEFAULT_BROADLINK_TYPE,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_MAX_UPDATE_RATE,
+    DEFAULT_TRANSMITTER,
+    DEFAULT_TRANSPORT,
     DOMAIN,
+    SIGNAL_OPTIONS_UPDATED,
+    TRANSPORT_MQTT,
+    TRANSPORT_RF,
+)
+from .coalescer import CommandCoalescer
+from .code_store import IRCode, IRCodeStore, async_get_code_store
+from .events import (
+    EVENT_COMMAND,
+    EVENT_CORRECTED,
+    EVENT_FINISHED,
+    EVENT_MOVE,
+    EVENT_RESTORED,
+    EVENT_SEND,
+    EVENT_SEND_FAILED,
+    EVENT_SENT,
+    EVENT_STOPPED,
+    EventLog,
+    async_get_event_log,
 )
+from .feedback import SOURCE_CURRENT, PositionFeedback
+from .metrics import CurtainMetrics, async_get_metrics
+from .motion import async_get_motion_engine
+from .motion_model import MotionModel
+from .position_store import PositionStore, async_get_position_store
+from .position_table import PositionTable, async_get_position_table
+from .startup import async_get_startup_report
+from .timing import StopErrorLog
+from .trace import async_record_command
+from .transmitter import Transmitter, async_get_transmitter
+
+if TYPE_CHECKING:
+    from .choreography import PlannedMove
 
 _LOGGER = logging.getLogger(__name__)
 
-# 窗帘状态常量
-CURTAIN_OPEN: Final = 100  # 完全开启 100%
-CURTAIN_CLOSE: Final = 0  # 完全关闭 0%
+# 决定发射器传输方式的设置
+TRANSPORT_SETTINGS = (
+    CONF_TRANSPORT,
+    CONF_MQTT_TOPIC,
+    CONF_BROADLINK_HOST,
+    CONF_BROADLINK_MAC,
+    CONF_BROADLINK_TYPE,
+)
 
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
-    """Set up Boardlink curtain from a config entry."""
+    """Set up Boardlink curtains from a config entry."""
     # 从配置项获取配置数据
     config = hass.data[DOMAIN][entry.entry_id]
-    
-    # 创建窗帘实体
-    curtain = BoardlinkCurtain(
-        config,
-        entry.entry_id,
+
+    # 集线器配置项包含多个窗帘，普通配置项只有一个
+    is_hub = CONF_CURTAINS in config
+    curtains = config[CONF_CURTAINS] if is_hub else [config]
+
+    # 码表缓存和保存的位置同时读取；多个配置项同时启动时共用一次读取
+    code_store, position_store = await asyncio.gather(
+        async_get_code_store(hass), async_get_position_store(hass)
     )
-    
-    async_add_entities([curtain])
+
+    # 预先解析红外码，发送时只需查表
+    entities: dict[str, BoardlinkCurtain] = {}
+    for curtain_config in curtains:
+        try:
+            for key in (CONF_OPEN_CODE, CONF_CLOSE_CODE, CONF_PAUSE_CODE):
+                if curtain_config.get(key):
+                    code_store.async_resolve(curtain_config[key])
+        except ValueError as err:
+            _LOGGER.error("Invalid IR code for curtain %s: %s", curtain_config.get("name"), err)
+            continue
+
+        # 创建窗帘实体
+        unique_id = f"{entry.entry_id}_{curtain_config['name']}" if is_hub else entry.entry_id
+        entities[curtain_config["name"]] = BoardlinkCurtain(
+            curtain_config,
+            unique_id,
+            code_store,
+            position_store,
+        )
+
+    @callback
+    def async_options_updated(config: dict[str, Any]) -> None:
+        """Push changed options into the running curtains."""
+        if not is_hub:
+            for entity in entities.values():
+                entity.async_apply_config(config)
+            return
+        # 集线器按名称匹配窗帘，只更新配置有变化的窗帘
+        for curtain_config in config[CONF_CURTAINS]:
+            if (entity := entities.get(curtain_config["name"])) is not None:
+                entity.async_apply_config(curtain_config)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), async_options_updated
+        )
+    )
+
+    # 所有窗帘一次性加入
+    async_get_startup_report(hass).async_entry_curtains(entry.entry_id, len(entities))
+    async_add_entities(entities.values())
+
+
+def _code_key(code: IRCode | None) -> bytes | str | None:
+    """Return what identifies a code in the transmitter queue."""
+    if code is None:
+        return None
+    return code.packet if code.packet is not None else code.source
 
 
 class BoardlinkCurtain(CoverEntity):
@@ -60,19 +168,17 @@ class BoardlinkCurtain(CoverEntity):
         self,
         config: dict[str, Any],
         entry_id: str,
+        code_store: IRCodeStore,
+        position_store: PositionStore,
     ) -> None:
         """Initialize the curtain."""
-        self._config = config
         self._entry_id = entry_id
+        self._code_store = code_store
         
         # 从配置中获取参数
-        self._open_code = config.get(CONF_OPEN_CODE)
-        self._close_code = config.get(CONF_CLOSE_CODE)
-        self._pause_code = config.get(CONF_PAUSE_CODE)
-        self._close_time = config.get(CONF_CLOSE_TIME, DEFAULT_CLOSE_TIME)
+        self._load_config(config)
         
         # 实体属性
-        self._attr_name = config.get("name", "Boardlink Curtain")
         self._attr_unique_id = entry_id
         
         # 状态属性
@@ -83,276 +189,802 @@ class BoardlinkCurtain(CoverEntity):
         self._target_position = None
         
         # 逐步更新位置的属性
-        self._update_position_task = None
         self._is_moving = False
+        self._move_direction = 0
+
+        # 指令合并与停止定时器
+        self._coalescer: CommandCoalescer | None = None
+        self._stop_timer: asyncio.TimerHandle | None = None
+        # 正在发送中的停止码数
+        self._stops_in_flight = 0
+        # 当前运动的起点：(发码时间, 起始位置, 方向, 运动模型)
+        self._move_origin: tuple[float, int, int, MotionModel] | None = None
+        self._stop_errors = StopErrorLog()
+        self._position_store = position_store
+        self._events: EventLog | None = None
+        self._metrics: CurtainMetrics | None = None
+        self._feedback: PositionFeedback | None = None
+        self._table: PositionTable | None = None
+        self._table_row: int | None = None
+
+    def _load_config(self, config: dict[str, Any]) -> None:
+        """Read the settings of this curtain from its configuration."""
+        self._config = config
+        self._open_code = config.get(CONF_OPEN_CODE)
+        self._close_code = config.get(CONF_CLOSE_CODE)
+        self._pause_code = config.get(CONF_PAUSE_CODE)
+        code_store = self._code_store
+        self._open_ir_code = code_store.get(self._open_code) if self._open_code else None
+        self._close_ir_code = code_store.get(self._close_code) if self._close_code else None
+        self._pause_ir_code = code_store.get(self._pause_code) if self._pause_code else None
+        self._model = MotionModel.from_config(config)
+        self._broadlink_host = config.get(CONF_BROADLINK_HOST) or None
+        self._broadlink_mac = config.get(CONF_BROADLINK_MAC) or None
+        self._broadlink_type = config.get(CONF_BROADLINK_TYPE, DEFAULT_BROADLINK_TYPE)
+        self._transport = config.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        self._mqtt_topic = config.get(CONF_MQTT_TOPIC) or None
+        self._transmitter = self._transmitter_key(
+            config.get(CONF_TRANSMITTER) or DEFAULT_TRANSMITTER
+        )
+        self._attr_name = config.get("name", "Boardlink Curtain")
+        self._max_update_rate = config.get(CONF_MAX_UPDATE_RATE, DEFAULT_MAX_UPDATE_RATE)
+        self._coalesce_window = config.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW)
+
+    def _transmitter_key(self, name: str) -> str:
+        """Return the key of the transmitter queue this curtain sends through.
+
+        The transport is created by the first curtain that uses a key, so
+        the key includes the transport settings: curtains naming the same
+        transmitter only share its queue when they also send the same way.
+        """
+        if self._transport == TRANSPORT_MQTT:
+            # 每个 MQTT 电机有自己的命令主题，互不排队
+            device = f"mqtt:{self._mqtt_topic}"
+        else:
+            # 直连博联设备时，以设备地址区分发射器
+            device = self._broadlink_host
+        if not device:
+            key = name
+        elif name == DEFAULT_TRANSMITTER:
+            key = device
+        else:
+            key = f"{name}@{device}"
+        if self._transport == TRANSPORT_RF:
+            # RF 码发送较慢，单独排队，不拖慢同一设备上的红外码
+            key = f"{key}:rf"
+        return key
+
+    @callback
+    def async_apply_config(self, config: dict[str, Any]) -> None:
+        """Apply changed options to the running curtain.
+
+        A move in progress keeps its timing and its stop timer; new travel
+        times, codes and transports take effect from the next command.
+        """
+        if config == self._config:
+            return
+        rebuild = any(config.get(key) != self._config.get(key) for key in TRANSPORT_SETTINGS)
+        self._load_config(config)
+        if rebuild and self.hass is not None:
+            # 传输设置变了：按新设置重建发射器，而不是沿用第一次创建时的传输
+            self._get_transmitter(rebuild=True)
+        if self._coalescer is not None:
+            self._coalescer.window = self._coalesce_window
+        if self._feedback is not None:
+            self._feedback.async_bind(config)
+        _LOGGER.info("Curtain %s options updated", self._attr_name)
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    def _get_transmitter(self, rebuild: bool = False) -> Transmitter:
+        """Return the shared transmitter this curtain sends through."""
+        return async_get_transmitter(
+            self.hass,
+            self._transmitter,
+            self._broadlink_host,
+            self._broadlink_mac,
+            self._broadlink_type,
+            self._transport,
+            self._mqtt_topic,
+            rebuild,
+        )
+
+    async def _send_ir_code(self, code: IRCode | None, deadline: float | None = None) -> bool:
+        """Send IR code to the curtain through its transmitter queue.
 
-    async def _send_ir_code(self, code: str) -> None:
-        """Send IR code to the curtain."""
+        Returns whether the code was delivered; the transmitter has already
+        retried it by the time ``False`` is returned.
+        """
         if code:
-            _LOGGER.info("Sending IR code for curtain %s: %s", self._attr_name, code)
-            # 使用模拟脚本服务发送红外指令
+            self._events.record(self._attr_unique_id, EVENT_SEND, code.source)
+            queued = self.hass.loop.time()
             try:
-                # 调用script.mock_send_ir服务发送红外指令
-                await self.hass.services.async_call(
-                    "script",
-                    "mock_send_ir",
-                    {
-                        "code": code
-                    },
-                    blocking=False
-                )
-                _LOGGER.info("Successfully sent IR code: %s", code)
+                # 通过共享的发射器队列发送，避免同一发射器上的红外码互相冲突
+                await self._get_transmitter().async_send(code, deadline, self._attr_unique_id)
+                latency = self.hass.loop.time() - queued
+                self._metrics.sends += 1
+                self._metrics.send_latency.observe(latency)
+                self._events.record(self._attr_unique_id, EVENT_SENT, code.source, latency)
+                return True
             except Exception as e:
-                _LOGGER.error("Failed to send IR code %s: %s", code, str(e))
+                self._metrics.send_failures += 1
+                self._events.record(self._attr_unique_id, EVENT_SEND_FAILED, code.source, str(e))
+                _LOGGER.error("Failed to send IR code %s: %s", code.source, str(e))
         else:
             _LOGGER.warning("No IR code configured for curtain %s", self._attr_name)
+        return False
 
     async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the curtain."""
-        _LOGGER.info("Opening curtain %s with code: %s", self._attr_name, self._open_code)
-        
-        # 发送开启指令
-        await self._send_ir_code(self._open_code)
+        self._record_command(COMMAND_OPEN, CURTAIN_OPEN)
+
+        # 与设置位置、计划停止共用一把锁，移动逐个执行
+        await self._coalescer.async_run(self._async_open)
+
+    async def _async_open(self) -> None:
+        """Send the open code and track the move to fully open."""
+        # 取消尚未执行的移动与停止定时器
+        self._supersede_pending()
+
+        # 发送开启指令，送达后才更新位置
+        if not await self._send_ir_code(self._open_ir_code):
+            self._keep_current_move()
+            return
+        self._cancel_motion()
         
         # 记录开始时间和目标时间
-        self._last_operation_start_time = time.time()
+        self._last_operation_start_time = self.hass.loop.time()
         self._target_position = CURTAIN_OPEN
         
         # 计算运行时间
         current_position = self._attr_current_cover_position
         if current_position != CURTAIN_OPEN:
             # 计算需要运行的时间（秒）
-            position_diff = abs(CURTAIN_OPEN - current_position)
-            run_time = (position_diff / 100.0) * self._close_time
+            run_time = self._model.run_time(current_position, CURTAIN_OPEN)
             self._expected_end_time = self._last_operation_start_time + run_time
-            _LOGGER.info("Curtain %s will run for %.1f seconds to reach fully open position", self._attr_name, run_time)
+            self._events.record(
+                self._attr_unique_id, EVENT_MOVE, current_position, CURTAIN_OPEN, run_time
+            )
         
         # 更新状态
         self._attr_current_cover_position = CURTAIN_OPEN
         self._attr_is_closed = False
         self.async_write_ha_state()
+        self._position_store.async_schedule_save()
         
-        _LOGGER.info("Curtain %s is now fully open (position: %d%%)", self._attr_name, CURTAIN_OPEN)
+        _LOGGER.info("Curtain %s is now fully open", self._attr_name)
 
     async def async_close_cover(self, **kwargs: Any) -> None:
         """Close the curtain."""
-        _LOGGER.info("Closing curtain %s with code: %s", self._attr_name, self._close_code)
-        
-        # 发送关闭指令
-        await self._send_ir_code(self._close_code)
+        self._record_command(COMMAND_CLOSE, CURTAIN_CLOSE)
+
+        # 与设置位置、计划停止共用一把锁，移动逐个执行
+        await self._coalescer.async_run(self._async_close)
+
+    async def _async_close(self) -> None:
+        """Send the close code and track the move to fully closed."""
+        # 取消尚未执行的移动与停止定时器
+        self._supersede_pending()
+
+        # 发送关闭指令，送达后才更新位置
+        if not await self._send_ir_code(self._close_ir_code):
+            self._keep_current_move()
+            return
+        self._cancel_motion()
         
         # 记录开始时间和目标时间
-        self._last_operation_start_time = time.time()
+        self._last_operation_start_time = self.hass.loop.time()
         self._target_position = CURTAIN_CLOSE
         
         # 计算运行时间
         current_position = self._attr_current_cover_position
         if current_position != CURTAIN_CLOSE:
             # 计算需要运行的时间（秒）
-            position_diff = abs(CURTAIN_CLOSE - current_position)
-            run_time = (position_diff / 100.0) * self._close_time
+            run_time = self._model.run_time(current_position, CURTAIN_CLOSE)
             self._expected_end_time = self._last_operation_start_time + run_time
-            _LOGGER.info("Curtain %s will run for %.1f seconds to reach fully closed position", self._attr_name, run_time)
+            self._events.record(
+                self._attr_unique_id, EVENT_MOVE, current_position, CURTAIN_CLOSE, run_time
+            )
         
         # 更新状态
         self._attr_current_cover_position = CURTAIN_CLOSE
         self._attr_is_closed = True
         self.async_write_ha_state()
+        self._position_store.async_schedule_save()
         
-        _LOGGER.info("Curtain %s is now fully closed (position: %d%%)", self._attr_name, CURTAIN_CLOSE)
+        _LOGGER.info("Curtain %s is now fully closed", self._attr_name)
 
-    async def _update_position_during_movement(self, start_position: int, target_position: int, run_time: float) -> None:
-        """在窗帘移动过程中逐步更新位置值。"""
-        try:
-            _LOGGER.info("Starting position update from %d%% to %d%% over %.1f seconds", 
-                        start_position, target_position, run_time)
-            
-            # 计算每秒位置变化
-            position_diff = target_position - start_position
-            start_time = time.time()
-            
-            # 每0.5秒更新一次位置
-            update_interval = 0.5
-            steps = int(run_time / update_interval)
-            
-            if steps <= 0:
-                steps = 1
-                
-            position_step = position_diff / steps
-            
-            for i in range(steps):
-                # 检查是否被取消
-                if not self._is_moving:
-                    break
-                    
-                # 等待更新间隔
-                await asyncio.sleep(update_interval)
-                
-                # 计算新位置
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= run_time:
-                    new_position = target_position
-                else:
-                    # 根据时间计算位置
-                    progress = elapsed_time / run_time
-                    new_position = int(start_position + position_diff * progress)
-                
-                # 确保位置在有效范围内
-                new_position = max(0, min(100, new_position))
-                
-                # 更新位置
-                self._attr_current_cover_position = new_position
-                self._attr_is_closed = new_position == CURTAIN_CLOSE
-                self.async_write_ha_state()
-                
-                _LOGGER.info("Curtain %s position updated to: %d%% (step %d/%d)", 
-                            self._attr_name, new_position, i+1, steps)
-                
-                # 如果已达到目标位置，退出循环
-                if new_position == target_position:
-                    break
-                    
-            # 确保最终位置正确
-            self._attr_current_cover_position = target_position
-            self._attr_is_closed = target_position == CURTAIN_CLOSE
-            self.async_write_ha_state()
-            
+    def _record_command(self, command: str, position: int | None) -> None:
+        """Count, buffer and trace a command received by this curtain."""
+        self._metrics.commands[command] += 1
+        self._events.record(self._attr_unique_id, EVENT_COMMAND, command, position)
+        async_record_command(self.hass, self, command, position)
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state, counting every write."""
+        if self._metrics is not None:
+            self._metrics.state_writes += 1
+        super().async_write_ha_state()
+        if self._table_row is not None:
+            # 同步写入集中位置表，目标和预计到达时间只在运动中有意义
+            moving = self._is_moving
+            eta = None
+            if moving and self._expected_end_time is not None:
+                eta = self._expected_end_time + time.time() - self.hass.loop.time()
+            self._table.async_update(
+                self._table_row,
+                self._attr_current_cover_position,
+                self._target_position if moving else None,
+                eta,
+                moving,
+            )
+
+    @callback
+    def trace_config(self) -> dict[str, Any]:
+        """Return the settings needed to rebuild this curtain in a replay."""
+        return {
+            "name": self._attr_name,
+            CONF_OPEN_CODE: self._open_code,
+            CONF_CLOSE_CODE: self._close_code,
+            CONF_PAUSE_CODE: self._pause_code,
+            **self._model.as_config(),
+            CONF_TRANSMITTER: self._transmitter,
+            CONF_TRANSPORT: self._transport,
+            CONF_MQTT_TOPIC: self._mqtt_topic,
+            CONF_MAX_UPDATE_RATE: self._max_update_rate,
+            CONF_COALESCE_WINDOW: self._coalesce_window,
+        }
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the position error of the last intermediate stop."""
+        return {"position_error": self._stop_errors.as_dict()["last"]}
+
+    @callback
+    def async_apply_motion(self, position: int, finished: bool) -> None:
+        """Apply a position computed by the shared motion engine."""
+        self._attr_current_cover_position = position
+        self._attr_is_closed = position == CURTAIN_CLOSE
+        if finished:
             # 清理状态
             self._is_moving = False
-            self._update_position_task = None
-            
-            _LOGGER.info("Curtain %s finished moving to target position: %d%%", 
-                        self._attr_name, target_position)
-                        
-        except asyncio.CancelledError:
-            _LOGGER.info("Position update task for curtain %s was cancelled", self._attr_name)
-            self._is_moving = False
-            self._update_position_task = None
-        except Exception as e:
-            _LOGGER.error("Error updating position for curtain %s: %s", self._attr_name, str(e))
-            self._is_moving = False
-            self._update_position_task = None
+            self._move_direction = 0
+            self._events.record(self._attr_unique_id, EVENT_FINISHED, position)
+            _LOGGER.info("Curtain %s reached %d%%", self._attr_name, position)
+            self._position_store.async_schedule_save()
+        self.async_write_ha_state()
+
+    def _start_motion(self, target_position: int) -> None:
+        """Hand the current movement over to the shared motion engine.
+
+        The movement is tracked from its origin, so a move that is resumed
+        part-way through shows the same positions as one tracked from the
+        start.
+        """
+        start_time, start_position, _, model = self._move_origin
+        async_get_motion_engine(self.hass).async_start(
+            self,
+            start_position,
+            target_position,
+            self._expected_end_time - start_time,
+            self._max_update_rate,
+            start_time,
+            model.step_offsets(start_position, target_position),
+        )
+        self._is_moving = True
+
+    def _stop_deadline(self) -> float:
+        """Return when the stop code of the current move should go out."""
+        # 电机收到停止码后还会滑行一段，停止码要提前发出
+        return self._expected_end_time - self._move_origin[3].stop_latency
+
+    def _cancel_motion(self) -> None:
+        """Stop tracking the current movement, keeping the position reached."""
+        position = async_get_motion_engine(self.hass).async_cancel(self)
+        if position is not None:
+            self._attr_current_cover_position = position
+            self._attr_is_closed = position == CURTAIN_CLOSE
+        self._is_moving = False
+        self._move_direction = 0
+        self._move_origin = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Save the position and drop any movement still tracked."""
+        self.hass.data[DOMAIN].get(DATA_ENTITIES, {}).pop(self.unique_id, None)
+        self._position_store.async_unregister(self)
+        self._feedback.async_unbind()
+        self._table.async_unregister(self.unique_id)
+        self._table_row = None
+        self._supersede_pending()
+        self._cancel_motion()
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the saved position and set up the command coalescer."""
+        self._events = async_get_event_log(self.hass)
+        self._metrics = async_get_metrics(self.hass).curtain(self._attr_unique_id)
+        self._coalescer = CommandCoalescer(
+            self.hass, self._coalesce_window, self._async_move_to
+        )
+        if (record := self._position_store.async_get(self.unique_id)) is not None:
+            self._async_restore(record)
+        self._position_store.async_register(self)
+        self.hass.data[DOMAIN].setdefault(DATA_ENTITIES, {})[self.unique_id] = self
+        # 绑定限位开关、电机电流等外部实体，用于校正推算的位置
+        self._feedback = PositionFeedback(self.hass, self)
+        self._feedback.async_bind(self._config)
+        self._table = async_get_position_table(self.hass)
+        self._table_row = self._table.async_register(self.unique_id, self.entity_id)
+        async_get_startup_report(self.hass).async_curtain_added(self.unique_id)
+
+    @callback
+    def async_snapshot(self, wall_offset: float) -> list[Any]:
+        """Return the compact record saved by the position store.
+
+        ``wall_offset`` converts loop times to wall clock times so an
+        in-flight move can be resumed after a restart.
+        """
+        if self._is_moving and self._move_origin is not None and self._expected_end_time is not None:
+            start_time, start_position, _, _ = self._move_origin
+            return [
+                self._attr_current_cover_position,
+                self._target_position,
+                start_time + wall_offset,
+                start_position,
+                self._expected_end_time - start_time,
+            ]
+        return [self._attr_current_cover_position, None, None, None, None]
+
+    @callback
+    def _async_restore(self, record: list[Any]) -> None:
+        """Restore the position, finishing or resuming an interrupted move."""
+        position, target, started, start_position, run_time = record
+        self._attr_current_cover_position = position
+        self._attr_is_closed = position == CURTAIN_CLOSE
+        if target is None or started is None or target == start_position:
+            return
+
+        model = self._model
+        elapsed = max(time.time() - started, 0.0)
+        direction = 1 if target > start_position else -1
+        if (
+            target not in (CURTAIN_OPEN, CURTAIN_CLOSE)
+            and elapsed >= run_time - model.stop_latency
+        ):
+            # 停止码没来得及发出，电机会一直运行到尽头
+            target = CURTAIN_OPEN if direction > 0 else CURTAIN_CLOSE
+            run_time = model.run_time(start_position, target)
+        if elapsed >= run_time:
+            # 停机期间运动已经完成
+            self._attr_current_cover_position = target
+            self._attr_is_closed = target == CURTAIN_CLOSE
+            self._events.record(self._attr_unique_id, EVENT_RESTORED, target, None)
+            _LOGGER.info("Curtain %s finished its interrupted move at %d%%", self._attr_name, target)
+            return
+
+        # 运动仍在进行：按剩余时间继续跟踪，无需发送任何红外码
+        now = self.hass.loop.time()
+        moved = abs(model.position_after(start_position, direction, elapsed) - start_position)
+        current = start_position + direction * int(moved)
+        self._attr_current_cover_position = current
+        self._attr_is_closed = current == CURTAIN_CLOSE
+        self._target_position = target
+        self._last_operation_start_time = now - elapsed
+        self._expected_end_time = now + run_time - elapsed
+        self._move_origin = (self._last_operation_start_time, start_position, direction, model)
+        self._start_motion(target)
+        self._move_direction = direction
+        if target not in (CURTAIN_OPEN, CURTAIN_CLOSE):
+            self._schedule_stop(self._stop_deadline())
+        self._events.record(self._attr_unique_id, EVENT_RESTORED, current, target)
+        _LOGGER.info("Curtain %s resumed its interrupted move to %d%%", self._attr_name, target)
+
+    def _keep_current_move(self) -> None:
+        """Re-arm the stop timer after a command failed to reach the motor.
+
+        The motor carries on with the move it was making, so the model does
+        too; only the stop timer cancelled for the new command is restored.
+        """
+        target = self._target_position
+        if (
+            self._is_moving
+            and self._expected_end_time is not None
+            and self._move_origin is not None
+            and target is not None
+            and target not in (CURTAIN_OPEN, CURTAIN_CLOSE)
+        ):
+            self._schedule_stop(self._stop_deadline())
+        _LOGGER.warning(
+            "Curtain %s did not receive the command, keeping %d%%",
+            self._attr_name,
+            self._attr_current_cover_position,
+        )
+
+    def _run_to_end(self, origin: tuple[float, int, int, MotionModel]) -> None:
+        """Track a move that carries on to the end stop after a failed stop."""
+        start_time, start_position, direction, model = origin
+        end = CURTAIN_OPEN if direction > 0 else CURTAIN_CLOSE
+        # 电机自运动开始一直没有停下
+        now = self.hass.loop.time()
+        current = round(model.position_after(start_position, direction, now - start_time))
+        # 电机已在运行：把发码时刻前推一个起步延迟，按静止起步的模型继续推算
+        self._target_position = end
+        self._last_operation_start_time = now - model.start_latency
+        self._expected_end_time = self._last_operation_start_time + model.run_time(current, end)
+        self._move_origin = (self._last_operation_start_time, current, direction, model)
+        run_time = max(self._expected_end_time - now, 0.0)
+        self._start_motion(end)
+        self._move_direction = direction
+        self._events.record(self._attr_unique_id, EVENT_MOVE, current, end, run_time)
+        _LOGGER.warning(
+            "Curtain %s did not receive the stop code, moving on to %d%%",
+            self._attr_name,
+            end,
+        )
+        self._position_store.async_schedule_save()
+
+    def _heading(self) -> int:
+        """Return the direction the motor is believed to be running in, or 0."""
+        target = self._target_position
+        if (
+            target is None
+            or self._expected_end_time is None
+            or self.hass.loop.time() >= self._expected_end_time
+        ):
+            return 0
+        if self._move_origin is not None:
+            return self._move_origin[2]
+        # 完全开启/关闭不经过运动引擎，方向由目标决定
+        return 1 if target == CURTAIN_OPEN else -1
+
+    @callback
+    def async_end_stop(self, opened: bool, source: str) -> None:
+        """Snap to the end stop reported by a contact sensor.
+
+        No code is sent: the motor stops at its end stop by itself, so a
+        pending stop for an intermediate target is dropped as well.
+        """
+        end = CURTAIN_OPEN if opened else CURTAIN_CLOSE
+        if self._heading() == (-1 if opened else 1):
+            # 刚离开该端点时触点可能还没断开
+            return
+        self._correct(end, source)
+
+    @callback
+    def async_motor_idle(self) -> None:
+        """Freeze the position when the motor current drops during a move.
+
+        A move to an end stop has reached it. A move to an intermediate
+        target was stopped short, by an obstacle or an end stop, and keeps
+        the position reached so far without sending the stop code.
+        """
+        if not (heading := self._heading()):
+            return
+        target = self._target_position
+        if target in (CURTAIN_OPEN, CURTAIN_CLOSE):
+            self._correct(target, SOURCE_CURRENT)
+            return
+        if self._stop_timer is None:
+            # 停止码已经在发送，由停止流程推算位置
+            return
+        position = async_get_motion_engine(self.hass).position(self)
+        self._correct(
+            self._attr_current_cover_position if position is None else position,
+            SOURCE_CURRENT,
+        )
+        _LOGGER.warning(
+            "Curtain %s stopped short of %d%% while moving %s",
+            self._attr_name,
+            target,
+            "up" if heading > 0 else "down",
+        )
+
+    def _correct(self, position: int, source: str) -> None:
+        """Replace the estimated position with one observed by a sensor."""
+        self._cancel_stop_timer()
+        estimate = async_get_motion_engine(self.hass).position(self)
+        if estimate is None:
+            estimate = self._attr_current_cover_position
+        self._cancel_motion()
+        self._last_operation_start_time = None
+        self._expected_end_time = None
+        self._target_position = None
+        self._attr_current_cover_position = position
+        self._attr_is_closed = position == CURTAIN_CLOSE
+        self._metrics.corrections[source] += 1
+        self._events.record(self._attr_unique_id, EVENT_CORRECTED, position, source, position - estimate)
+        if position != estimate:
+            _LOGGER.info(
+                "Curtain %s corrected from %d%% to %d%% by %s",
+                self._attr_name,
+                estimate,
+                position,
+                source,
+            )
+        self.async_write_ha_state()
+        self._position_store.async_schedule_save()
+
+    def _supersede_pending(self) -> None:
+        """Cancel a coalesced target and the stop timer of the previous move."""
+        if self._coalescer is not None:
+            self._coalescer.async_cancel()
+        self._cancel_stop_timer()
+
+    def _schedule_stop(self, stop_at: float) -> None:
+        """Track the single stop timer of an intermediate move.
+
+        ``stop_at`` is the loop time at which the stop code should go out; the
+        timer fires earlier by the transmitter's measured send latency.
+        """
+        self._cancel_stop_timer()
+        lead = self._get_transmitter().latency.value
+        self._stop_timer = self.hass.loop.call_at(
+            stop_at - lead, self._async_fire_stop, stop_at
+        )
+
+    def _cancel_stop_timer(self) -> None:
+        """Cancel the stop timer of the previous move."""
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+
+    @callback
+    def _async_fire_stop(self, stop_at: float) -> None:
+        """Send the stop code once an intermediate position is reached."""
+        self._stop_timer = None
+        self.hass.async_create_task(self._async_planned_stop(self._move_origin, stop_at))
+
+    async def _async_planned_stop(
+        self, origin: tuple[float, int, int, MotionModel] | None, stop_at: float
+    ) -> bool | None:
+        """Send the planned stop of a move, one movement at a time.
+
+        Returns whether the stop code was delivered, or ``None`` if another
+        command took over the curtain before the stop got its turn.
+        """
+
+        async def _async_stop() -> bool | None:
+            if origin is None or origin is not self._move_origin:
+                return None
+            return await self._async_stop(stop_at)
+
+        # 与移动指令共用一把锁：停止码发送期间到达的新位置排在停止之后执行
+        return await self._coalescer.async_run_locked(_async_stop)
 
     async def async_stop_cover(self, **kwargs: Any) -> None:
         """Stop the curtain."""
-        _LOGGER.info("Stopping curtain %s with code: %s", self._attr_name, self._pause_code)
-        
-        # 发送暂停指令
-        await self._send_ir_code(self._pause_code)
-        
-        # 停止位置更新任务
-        if self._update_position_task:
-            self._update_position_task.cancel()
-            try:
-                await self._update_position_task
-            except asyncio.CancelledError:
-                pass
-            self._update_position_task = None
-            
+        self._record_command(COMMAND_STOP, None)
+        self._supersede_pending()
+        # 排在正在发送的移动之后，停止码不会抢在本窗帘的移动指令之前
+        await self._coalescer.async_run(self._async_stop)
+
+    async def _async_stop(self, stop_at: float | None = None) -> bool:
+        """Send the pause code and freeze the position.
+
+        ``stop_at`` is set for the planned stop of an intermediate move; the
+        position is then derived from the actual emission time of the code.
+        Returns whether the pause code was delivered.
+        """
+        self._cancel_stop_timer()
+        target = self._target_position
+        origin = self._move_origin
+
+        # 发送暂停指令（停止码按截止时间优先发送）
+        self._stops_in_flight += 1
+        try:
+            sent = await self._send_ir_code(
+                self._pause_ir_code,
+                self.hass.loop.time() if stop_at is None else stop_at,
+            )
+        finally:
+            self._stops_in_flight -= 1
+        emitted = self.hass.loop.time()
+
+        if self._move_origin is not origin:
+            # 发送期间新的移动已经接管，停止码只结束了之前的运动
+            return sent
+
+        # 停止位置更新
+        self._cancel_motion()
+
+        if not sent and origin is not None:
+            # 停止码未送达：电机继续按原方向运动到尽头
+            self._run_to_end(origin)
+            return False
+
+        error = None
+        if stop_at is not None and sent and origin is not None and target is not None:
+            # 按停止码实际发出的时间推算到达的位置（含停止后的滑行），并记录误差
+            # 运动中修改了选项时，仍按运动开始时的运动模型推算
+            start_time, start_position, direction, model = origin
+            achieved = model.stopped_position(start_position, direction, emitted - start_time)
+            error = self._stop_errors.record(target, achieved)
+            self._metrics.stop_error.observe(abs(error))
+            self._attr_current_cover_position = round(achieved)
+            self._attr_is_closed = self._attr_current_cover_position == CURTAIN_CLOSE
+
         # 记录停止时的位置
         current_position = self._attr_current_cover_position
-        _LOGGER.info("Curtain %s stopped at position: %d%%", self._attr_name, current_position)
+        self._events.record(self._attr_unique_id, EVENT_STOPPED, current_position, error)
+        _LOGGER.info("Curtain %s stopped at %d%%", self._attr_name, current_position)
         
         # 清除操作计时器
         self._last_operation_start_time = None
         self._expected_end_time = None
         self._target_position = None
         self._is_moving = False
+        self._move_origin = None
         
         # 状态保持不变，仅停止动作
         self.async_write_ha_state()
+        self._position_store.async_schedule_save()
+        return sent
 
     async def async_set_cover_position(self, **kwargs: Any) -> None:
         """Move the curtain to a specific position."""
         position = kwargs[ATTR_POSITION]
-        _LOGGER.info("Setting curtain %s position to: %d%%", self._attr_name, position)
-        
-        # 如果正在移动，先取消之前的任务
-        if self._update_position_task:
-            self._update_position_task.cancel()
-            try:
-                await self._update_position_task
-            except asyncio.CancelledError:
-                pass
-            self._update_position_task = None
-            
-        # 记录目标位置
-        self._target_position = position
-        self._is_moving = True
-        
-        # 根据位置发送相应的指令
-        if position == CURTAIN_OPEN:
-            # 发送开启指令
-            await self._send_ir_code(self._open_code)
-            # 记录开始时间和目标时间
-            self._last_operation_start_time = time.time()
-            # 计算运行时间
-            current_position = self._attr_current_cover_position
-            if current_position != position:
-                # 计算需要运行的时间（秒）
-                position_diff = abs(position - current_position)
-                run_time = (position_diff / 100.0) * self._close_time
-                self._expected_end_time = self._last_operation_start_time + run_time
-                _LOGGER.info("Curtain %s will run for %.1f seconds to reach position %d%%", self._attr_name, run_time, position)
-                # 启动位置更新任务
-                self._update_position_task = self.hass.async_create_task(self._update_position_during_movement(current_position, position, run_time))
-        elif position == CURTAIN_CLOSE:
-            # 发送关闭指令
-            await self._send_ir_code(self._close_code)
-            # 记录开始时间和目标时间
-            self._last_operation_start_time = time.time()
-            # 计算运行时间
-            current_position = self._attr_current_cover_position
-            if current_position != position:
-                # 计算需要运行的时间（秒）
-                position_diff = abs(position - current_position)
-                run_time = (position_diff / 100.0) * self._close_time
-                self._expected_end_time = self._last_operation_start_time + run_time
-                _LOGGER.info("Curtain %s will run for %.1f seconds to reach position %d%%", self._attr_name, run_time, position)
-                # 启动位置更新任务
-                self._update_position_task = self.hass.async_create_task(self._update_position_during_movement(current_position, position, run_time))
+        self._record_command(COMMAND_SET_POSITION, position)
+
+        # 短时间内的连续调用（滑块拖动、自动化）合并为一次净移动
+        await self._coalescer.async_submit(position)
+
+    async def async_move_now(self, position: int) -> None:
+        """Move to ``position`` right away, skipping the coalescing window.
+
+        The group move service starts all members in the same loop
+        iteration, so codes they share reach the transmitter queue together
+        and go out once.
+        """
+        self._record_command(COMMAND_SET_POSITION, position)
+        await self._coalescer.async_execute(position)
+
+    async def async_calibration_send(self, command: str) -> float | None:
+        """Send a bare open, close or stop code for the calibration flow.
+
+        The position model is bypassed until ``async_calibration_done``.
+        Returns the loop time at which the code went out, or ``None`` if it
+        was not delivered.
+        """
+        self._supersede_pending()
+        self._cancel_motion()
+        if command == COMMAND_STOP:
+            sent = await self._send_ir_code(self._pause_ir_code, self.hass.loop.time())
         else:
-            # 对于中间位置，需要特殊的处理方式
-            _LOGGER.info("Setting curtain %s to intermediate position: %d%%", self._attr_name, position)
-            # 计算需要运行的时间（秒）
+            code = self._open_ir_code if command == COMMAND_OPEN else self._close_ir_code
+            sent = await self._send_ir_code(code)
+        return self.hass.loop.time() if sent else None
+
+    @callback
+    def async_calibration_done(self, position: int) -> None:
+        """Take over the position the curtain was left at by the calibration."""
+        self._last_operation_start_time = None
+        self._expected_end_time = None
+        self._target_position = None
+        self._attr_current_cover_position = position
+        self._attr_is_closed = position == CURTAIN_CLOSE
+        self.async_write_ha_state()
+        self._position_store.async_schedule_save()
+
+    @property
+    def send_lead(self) -> float:
+        """Return how long before its deadline a code should be queued."""
+        return self._get_transmitter().latency.value
+
+    @callback
+    def async_plan_move(self, start: int, target: int) -> PlannedMove | None:
+        """Describe a move from ``start`` to ``target`` for a choreography."""
+        # 只有编排器会调用，此时编排模块已导入
+        from .choreography import PlannedMove
+
+        if start == target:
+            return None
+        code = self._open_ir_code if target > start else self._close_ir_code
+        transmitter = self._get_transmitter()
+        run_time = self._model.run_time(start, target)
+        return PlannedMove(
+            transmitter.key,
+            _code_key(code),
+            _code_key(self._pause_ir_code),
+            transmitter.airtime,
+            run_time,
+            None if target in (CURTAIN_OPEN, CURTAIN_CLOSE) else run_time - self._model.stop_latency,
+        )
+
+    async def async_choreography_move(
+        self, position: int
+    ) -> tuple[tuple[float, int, int, MotionModel], float | None] | None:
+        """Start a choreography move whose stop is sent by the executor.
+
+        Returns the move origin and the loop time the stop code is due
+        (``None`` for an end position), or ``None`` if no move started.
+        """
+        self._record_command(COMMAND_SET_POSITION, position)
+
+        async def _async_move() -> tuple[tuple[float, int, int, MotionModel], float | None] | None:
+            await self._async_move_to(position, schedule_stop=False)
+            origin = self._move_origin
+            if origin is None or self._target_position != position:
+                return None
+            if position in (CURTAIN_OPEN, CURTAIN_CLOSE):
+                return origin, None
+            return origin, self._stop_deadline()
+
+        return await self._coalescer.async_run(_async_move)
+
+    async def async_choreography_stop(
+        self, origin: tuple[float, int, int, MotionModel], stop_at: float
+    ) -> bool | None:
+        """Send the stop of a choreography move.
+
+        Returns whether the stop code was delivered, or ``None`` if another
+        command took over the curtain since the move started.
+        """
+        return await self._async_planned_stop(origin, stop_at)
+
+    @callback
+    def async_choreography_release(
+        self, origin: tuple[float, int, int, MotionModel], stop_at: float
+    ) -> None:
+        """Take back the stop of a move left by a cancelled choreography."""
+        if origin is self._move_origin:
+            self._schedule_stop(stop_at)
+
+    async def _async_move_to(self, position: int, schedule_stop: bool = True) -> None:
+        """Move to ``position`` with one direction code and one stop timer.
+
+        With ``schedule_stop`` unset the stop is left to the caller, as the
+        choreography executor sends it from its own schedule.
+        """
+        # 停止码正在发送的窗帘即将停下：按静止处理，重新发送方向码
+        was_moving = self._is_moving and not self._stops_in_flight
+        direction = self._move_direction
+
+        # 取消之前的停止定时器；运动继续跟踪到新指令送达为止
+        self._cancel_stop_timer()
+        current_position = async_get_motion_engine(self.hass).position(self)
+        if current_position is None:
             current_position = self._attr_current_cover_position
-            position_diff = abs(position - current_position)
-            run_time = (position_diff / 100.0) * self._close_time
-            
-            # 确定运行方向
-            if position > current_position:
-                # 需要开启窗帘
-                await self._send_ir_code(self._open_code)
-                _LOGGER.info("Opening curtain %s to reach position %d%%", self._attr_name, position)
+
+        if position == current_position:
+            # 已在目标位置：若仍在运动则直接停止
+            if was_moving:
+                await self._async_stop()
             else:
-                # 需要关闭窗帘
-                await self._send_ir_code(self._close_code)
-                _LOGGER.info("Closing curtain %s to reach position %d%%", self._attr_name, position)
-                
-            # 记录开始时间和目标时间
-            self._last_operation_start_time = time.time()
-            self._expected_end_time = self._last_operation_start_time + run_time
-            
-            _LOGGER.info("Curtain %s will run for %.1f seconds to reach intermediate position %d%%", self._attr_name, run_time, position)
-            
-            # 启动位置更新任务
-            self._update_position_task = self.hass.async_create_task(self._update_position_during_movement(current_position, position, run_time))
-            
-            # 调度停止操作
-            if run_time > 0:
-                # 使用异步延迟来调度停止操作
-                async def _scheduled_stop():
-                    await asyncio.sleep(run_time)
-                    await self.async_stop_cover()
-                    _LOGGER.info("Curtain %s reached target position: %d%%", self._attr_name, position)
-                
-                # 启动异步任务
-                self.hass.async_create_task(_scheduled_stop())
-                
-        # 更新状态（对于完全开启和完全关闭的情况，或者作为中间位置的初始状态）
-        # 注意：在逐步更新模式下，位置会在_update_position_during_movement中更新
-        if not self._update_position_task:
-            self._attr_current_cover_position = position
-            self._attr_is_closed = position == CURTAIN_CLOSE
-            self.async_write_ha_state()
-            _LOGGER.info("Curtain %s target position set to: %d%%", self._attr_name, position)
\ No newline at end of file
+                self.async_write_ha_state()
+            return
+
+        new_direction = 1 if position > current_position else -1
+        moving_on = was_moving and direction == new_direction
+
+        # 方向未变时沿用正在执行的指令，不再重复发送
+        if not moving_on:
+            code = self._open_ir_code if new_direction > 0 else self._close_ir_code
+            if not await self._send_ir_code(code):
+                self._keep_current_move()
+                return
+
+        # 指令已送达：以送达时刻的位置为起点
+        self._cancel_motion()
+        current_position = self._attr_current_cover_position
+        self._target_position = position
+
+        # 计算需要运行的时间（秒），以指令实际发出的时刻为起点；
+        # 沿用原指令时电机已在运行，把发码时刻前推一个起步延迟
+        model = self._model
+        now = self.hass.loop.time()
+        start_time = now - model.start_latency if moving_on else now
+        self._last_operation_start_time = start_time
+        self._expected_end_time = start_time + model.run_time(current_position, position)
+        self._move_origin = (start_time, current_position, new_direction, model)
+        run_time = self._expected_end_time - now
+        self._events.record(self._attr_unique_id, EVENT_MOVE, current_position, position, run_time)
+        _LOGGER.info("Curtain %s moving from %d%% to %d%%", self._attr_name, current_position, position)
+
+        # 启动位置更新
+        self._start_motion(position)
+        self._move_direction = new_direction
+
+        # 中间位置需要在到达时发送停止指令；完全开启/关闭由电机自行停止
+        if schedule_stop and position not in (CURTAIN_OPEN, CURTAIN_CLOSE):
+            self._schedule_stop(self._stop_deadline())
+        self._position_store.async_schedule_save()
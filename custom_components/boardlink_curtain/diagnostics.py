@@ -0,0 +1,123 @@
+"""Diagnostics support for Boardlink Curtain.
+
+Broadlink addresses are redacted from the whole dump: besides the entry
+settings they show up in transmitter keys, transport names, send errors
+and per-transmitter metrics. Each address is replaced by a numbered
+placeholder so different devices stay apart.
+
+Like ``__init__``, this module imports only constants; the runtime modules
+it reads from are imported with the cover platform.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+import re
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_BROADLINK_HOST, CONF_BROADLINK_MAC, DATA_CHOREOGRAPHER, DOMAIN
+from .startup import async_get_startup_report, async_import_modules
+
+if TYPE_CHECKING:
+    from .transmitter import Transmitter
+
+TO_REDACT = {CONF_BROADLINK_HOST, CONF_BROADLINK_MAC}
+
+# 诊断信息读取的运行时模块，配置项设置后已加载
+RUNTIME_MODULES = ("events", "metrics", "motion", "transmitter")
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    # 配置项未能设置时这些模块可能尚未导入，同样放到执行器中
+    await async_import_modules(hass, *RUNTIME_MODULES)
+    from .events import async_get_event_log
+    from .metrics import async_get_metrics
+    from .motion import async_get_motion_engine
+    from .transmitter import DATA_TRANSMITTERS
+
+    domain_data = hass.data.get(DOMAIN, {})
+    event_log = async_get_event_log(hass)
+    metrics = async_get_metrics(hass)
+    transmitters = domain_data.get(DATA_TRANSMITTERS, {})
+    # 没有运行过编排时不创建编排器，也不导入编排模块
+    choreographer = domain_data.get(DATA_CHOREOGRAPHER)
+
+    # 集线器中窗帘的 unique_id 以配置项 ID 开头，普通配置项即为配置项 ID
+    unique_ids = [
+        unique_id for unique_id in metrics.curtains if unique_id.startswith(entry.entry_id)
+    ]
+    events = [
+        event
+        for event in event_log.as_list()
+        if event["curtain"].startswith(entry.entry_id)
+    ]
+
+    data = {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": async_redact_data(dict(entry.options), TO_REDACT),
+        "transmitters": {
+            key: transmitter.as_dict() for key, transmitter in transmitters.items()
+        },
+        "motion": async_get_motion_engine(hass).as_dict(),
+        "choreography": None if choreographer is None else choreographer.as_dict(),
+        "startup": async_get_startup_report(hass).as_dict(),
+        "metrics": metrics.as_dict(unique_ids),
+        "event_log": event_log.as_dict(),
+        "events": events,
+    }
+    return _redact_hosts(data, _broadlink_hosts(hass, transmitters.values()))
+
+
+def _broadlink_hosts(hass: HomeAssistant, transmitters: Iterable[Transmitter]) -> list[str]:
+    """Return the Broadlink addresses known to the integration, longest first."""
+    hosts: set[str] = set()
+    for transmitter in transmitters:
+        if (session := getattr(transmitter.transport, "session", None)) is not None:
+            hosts.add(session.host)
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        for config in (entry.data, entry.options):
+            for host in _find_values(config, CONF_BROADLINK_HOST):
+                # 配置中的地址可能带端口，端口本身不需要隐藏
+                hosts.add(host.partition(":")[0])
+    hosts.discard("")
+    return sorted(hosts, key=lambda host: (-len(host), host))
+
+
+def _find_values(data: Any, key: str) -> Iterable[str]:
+    """Yield every string stored under ``key`` in nested settings."""
+    if isinstance(data, Mapping):
+        for name, value in data.items():
+            if name == key and isinstance(value, str):
+                yield value
+            else:
+                yield from _find_values(value, key)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _find_values(value, key)
+
+
+def _redact_hosts(data: Any, hosts: list[str]) -> Any:
+    """Replace the ``hosts`` in every key and string of ``data``."""
+    if not hosts:
+        return data
+    placeholders = {host: f"**REDACTED_{index}**" for index, host in enumerate(hosts, 1)}
+    pattern = re.compile(
+        r"(?<![\w.-])(" + "|".join(map(re.escape, hosts)) + r")(?![\w-]|\.\w)"
+    )
+
+    def _redact(value: Any) -> Any:
+        if isinstance(value, str):
+            return pattern.sub(lambda match: placeholders[match[1]], value)
+        if isinstance(value, dict):
+            return {_redact(key): _redact(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_redact(item) for item in value]
+        return value
+
+    return _redact(data)
@@ -0,0 +1,88 @@
+"""In-memory ring buffer of curtain events.
+
+Commands, IR sends and movements of every curtain are recorded as small
+tuples in one shared, fixed-size buffer. Nothing is formatted until the
+buffer is read, by the diagnostics download or the ``dump_events``
+service, so recording costs about as much as a list append and the log
+only has to carry state transitions and errors.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_EVENT_LOG = "event_log"
+
+EVENT_LOG_SIZE = 4096
+
+# 事件类型，附加数据见各注释
+EVENT_COMMAND = "command"  # 指令名称, 目标位置
+EVENT_SEND = "send"  # 红外码
+EVENT_SENT = "sent"  # 红外码, 发送耗时
+EVENT_SEND_FAILED = "send_failed"  # 红外码, 错误
+EVENT_MOVE = "move"  # 起始位置, 目标位置, 运行时长
+EVENT_FINISHED = "finished"  # 位置
+EVENT_STOPPED = "stopped"  # 位置, 误差
+EVENT_RESTORED = "restored"  # 位置, 目标位置
+EVENT_CORRECTED = "corrected"  # 位置, 来源, 校正量
+
+# (事件循环时间, 窗帘 unique_id, 事件类型, 附加数据)
+Event = tuple[float, str, str, tuple[Any, ...]]
+
+
+class EventLog:
+    """Fixed-size buffer of the most recent curtain events."""
+
+    def __init__(self, hass: HomeAssistant, size: int = EVENT_LOG_SIZE) -> None:
+        """Initialize the buffer."""
+        self.hass = hass
+        self._events: deque[Event] = deque(maxlen=size)
+        self.recorded = 0
+
+    @callback
+    def record(self, unique_id: str, kind: str, *data: Any) -> None:
+        """Append an event; the oldest one drops out when the buffer is full."""
+        self._events.append((self.hass.loop.time(), unique_id, kind, data))
+        self.recorded += 1
+
+    @callback
+    def as_list(self, unique_ids: Iterable[str] | None = None) -> list[dict[str, Any]]:
+        """Return the buffered events as dictionaries, oldest first.
+
+        ``unique_ids`` limits the result to the given curtains.
+        """
+        wanted = None if unique_ids is None else set(unique_ids)
+        offset = time.time() - self.hass.loop.time()
+        return [
+            {
+                "time": round(loop_time + offset, 3),
+                "curtain": unique_id,
+                "event": kind,
+                "data": list(data),
+            }
+            for loop_time, unique_id, kind, data in self._events
+            if wanted is None or unique_id in wanted
+        ]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the buffer statistics."""
+        return {
+            "size": self._events.maxlen,
+            "buffered": len(self._events),
+            "recorded": self.recorded,
+        }
+
+
+@callback
+def async_get_event_log(hass: HomeAssistant) -> EventLog:
+    """Return the shared event buffer, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (log := domain_data.get(DATA_EVENT_LOG)) is None:
+        log = domain_data[DATA_EVENT_LOG] = EventLog(hass)
+    return log
@@ -0,0 +1,124 @@
+"""Position feedback from other Home Assistant entities.
+
+A curtain can be bound to entities that observe its motor:
+
+- end stop contacts for fully open and fully closed; turning ``on`` means
+  the curtain reached that end;
+- a motor current (or power) sensor; falling to the idle threshold means
+  the motor stopped.
+
+State changes arrive through ``async_track_state_change_event``, so the
+bound entities are never polled and a correction never sends a code.
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import STATE_ON
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import (
+    CONF_CLOSED_SENSOR,
+    CONF_CURRENT_SENSOR,
+    CONF_CURRENT_THRESHOLD,
+    CONF_OPEN_SENSOR,
+    DEFAULT_CURRENT_THRESHOLD,
+)
+
+if TYPE_CHECKING:
+    from .cover import BoardlinkCurtain
+
+_LOGGER = logging.getLogger(__name__)
+
+# 校正来源
+SOURCE_OPEN_SENSOR = "open_sensor"
+SOURCE_CLOSED_SENSOR = "closed_sensor"
+SOURCE_CURRENT = "current"
+
+
+def _as_float(state: State | None) -> float | None:
+    """Return the numeric value of a state, or ``None``."""
+    if state is None:
+        return None
+    try:
+        return float(state.state)
+    except ValueError:
+        return None
+
+
+def _source(key: str) -> str:
+    """Return the correction source recorded for an end stop key."""
+    return SOURCE_OPEN_SENSOR if key == CONF_OPEN_SENSOR else SOURCE_CLOSED_SENSOR
+
+
+class PositionFeedback:
+    """State listeners that correct the position of one curtain."""
+
+    def __init__(self, hass: HomeAssistant, curtain: BoardlinkCurtain) -> None:
+        """Initialize the feedback."""
+        self.hass = hass
+        self._curtain = curtain
+        self._sensors: dict[str, str] = {}
+        self._threshold = DEFAULT_CURRENT_THRESHOLD
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @property
+    def entity_ids(self) -> list[str]:
+        """Return the bound entities."""
+        return list(self._sensors)
+
+    @callback
+    def async_bind(self, config: dict[str, Any]) -> None:
+        """Listen to the entities configured for the curtain.
+
+        Called again whenever the options change; an end stop that is
+        already active is applied right away.
+        """
+        sensors = {
+            config[key]: key
+            for key in (CONF_OPEN_SENSOR, CONF_CLOSED_SENSOR, CONF_CURRENT_SENSOR)
+            if config.get(key)
+        }
+        self._threshold = config.get(CONF_CURRENT_THRESHOLD, DEFAULT_CURRENT_THRESHOLD)
+        if sensors == self._sensors and self._unsub is not None:
+            return
+        self.async_unbind()
+        self._sensors = sensors
+        if not sensors:
+            return
+        _LOGGER.debug("Curtain %s follows %s", self._curtain.name, ", ".join(sensors))
+        self._unsub = async_track_state_change_event(
+            self.hass, list(sensors), self._async_state_changed
+        )
+        for entity_id, key in sensors.items():
+            state = self.hass.states.get(entity_id)
+            if key != CONF_CURRENT_SENSOR and state is not None and state.state == STATE_ON:
+                self._curtain.async_end_stop(key == CONF_OPEN_SENSOR, _source(key))
+
+    @callback
+    def async_unbind(self) -> None:
+        """Stop listening."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._sensors = {}
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Correct the position after a bound entity changed."""
+        key = self._sensors.get(event.data["entity_id"])
+        new_state: State | None = event.data["new_state"]
+        old_state: State | None = event.data["old_state"]
+        if key is None or new_state is None:
+            return
+        if key == CONF_CURRENT_SENSOR:
+            value = _as_float(new_state)
+            previous = _as_float(old_state)
+            # 只在电流从运行降到空闲的那一刻处理
+            if value is not None and previous is not None and value <= self._threshold < previous:
+                self._curtain.async_motor_idle()
+            return
+        if new_state.state == STATE_ON and (old_state is None or old_state.state != STATE_ON):
+            self._curtain.async_end_stop(key == CONF_OPEN_SENSOR, _source(key))
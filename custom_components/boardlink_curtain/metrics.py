@@ -0,0 +1,218 @@
+"""Counters and latency histograms for Boardlink curtains.
+
+Recording a sample is a bisect over a handful of bucket bounds and a few
+integer increments, so the metrics stay on in production. They are read
+by the diagnostics download and by the optional hub sensors.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable
+from functools import lru_cache
+import hashlib
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_METRICS = "metrics"
+
+# 直方图桶上限：发送延迟（秒）与停止误差（百分比）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ERROR_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# 按码统计时保留原样的码名最大长度；更长的红外包和 Pronto 码用短哈希代替
+CODE_KEY_LENGTH = 32
+# 按码统计的最多条目数，之后重新学习的码归入 OTHER_CODES
+MAX_CODE_KEYS = 128
+OTHER_CODES = "other"
+
+
+@lru_cache(maxsize=MAX_CODE_KEYS)
+def code_key(code: str) -> str:
+    """Return the short key under which the send times of ``code`` are kept."""
+    if len(code) <= CODE_KEY_LENGTH and " " not in code:
+        return code
+    return "#" + hashlib.blake2s(code.encode(), digest_size=4).hexdigest()
+
+
+def _round(value: float | None) -> float | None:
+    """Round an optional value for display."""
+    return None if value is None else round(value, 4)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and maximum."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        """Initialize the histogram."""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a sample."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: Histogram) -> None:
+        """Add the samples of a histogram with the same buckets."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean sample."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction: float) -> float | None:
+        """Return the upper bound of the bucket holding the quantile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a dictionary."""
+        mean = self.mean
+        return {
+            "count": self.count,
+            "mean": None if mean is None else round(mean, 4),
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "max": round(self.max, 4),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class CurtainMetrics:
+    """Counters of one curtain."""
+
+    __slots__ = (
+        "commands",
+        "state_writes",
+        "sends",
+        "send_failures",
+        "send_latency",
+        "stop_error",
+        "corrections",
+    )
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.commands: Counter[str] = Counter()
+        self.state_writes = 0
+        self.sends = 0
+        self.send_failures = 0
+        self.send_latency = Histogram(LATENCY_BUCKETS)
+        self.stop_error = Histogram(ERROR_BUCKETS)
+        # 按来源统计的位置校正次数
+        self.corrections: Counter[str] = Counter()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a dictionary."""
+        return {
+            "commands": dict(self.commands),
+            "state_writes": self.state_writes,
+            "sends": self.sends,
+            "send_failures": self.send_failures,
+            "send_latency": self.send_latency.as_dict(),
+            "stop_error": self.stop_error.as_dict(),
+            "corrections": dict(self.corrections),
+        }
+
+
+class Metrics:
+    """Integration-wide metrics, grouped by curtain, transmitter and code."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.curtains: dict[str, CurtainMetrics] = {}
+        self.transmitters: dict[str, Histogram] = {}
+        self.codes: dict[str, Histogram] = {}
+
+    def curtain(self, unique_id: str) -> CurtainMetrics:
+        """Return the counters of a curtain, creating them on first use."""
+        if (metrics := self.curtains.get(unique_id)) is None:
+            metrics = self.curtains[unique_id] = CurtainMetrics()
+        return metrics
+
+    def record_send(self, transmitter: str, code: str, duration: float) -> None:
+        """Record how long a code took on a transmitter."""
+        if (histogram := self.transmitters.get(transmitter)) is None:
+            histogram = self.transmitters[transmitter] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(duration)
+        key = code_key(code)
+        if key not in self.codes and len(self.codes) >= MAX_CODE_KEYS:
+            key = OTHER_CODES
+        if (histogram := self.codes.get(key)) is None:
+            histogram = self.codes[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(duration)
+
+    def summary(self, unique_ids: Iterable[str]) -> dict[str, Any]:
+        """Return totals over a group of curtains."""
+        commands = 0
+        state_writes = sends = send_failures = 0
+        send_latency = Histogram(LATENCY_BUCKETS)
+        stop_error = Histogram(ERROR_BUCKETS)
+        for unique_id in unique_ids:
+            if (metrics := self.curtains.get(unique_id)) is None:
+                continue
+            commands += sum(metrics.commands.values())
+            state_writes += metrics.state_writes
+            sends += metrics.sends
+            send_failures += metrics.send_failures
+            send_latency.merge(metrics.send_latency)
+            stop_error.merge(metrics.stop_error)
+        return {
+            "commands": commands,
+            "state_writes": state_writes,
+            "sends": sends,
+            "send_failures": send_failures,
+            "send_latency": send_latency,
+            "stop_error": stop_error,
+        }
+
+    def as_dict(self, unique_ids: Iterable[str] | None = None) -> dict[str, Any]:
+        """Return the metrics, limited to ``unique_ids`` when given."""
+        wanted = self.curtains if unique_ids is None else set(unique_ids)
+        return {
+            "curtains": {
+                unique_id: metrics.as_dict()
+                for unique_id, metrics in self.curtains.items()
+                if unique_id in wanted
+            },
+            "transmitters": {
+                key: histogram.as_dict() for key, histogram in self.transmitters.items()
+            },
+            "codes": {code: histogram.as_dict() for code, histogram in self.codes.items()},
+        }
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant) -> Metrics:
+    """Return the shared metrics, creating them on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (metrics := domain_data.get(DATA_METRICS)) is None:
+        metrics = domain_data[DATA_METRICS] = Metrics()
+    return metrics
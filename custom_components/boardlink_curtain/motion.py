@@ -0,0 +1,263 @@
+"""Shared motion engine for Boardlink curtains.
+
+All moving curtains are tracked in a single heap of deadlines. The engine
+only wakes up when the displayed (integer) position of some curtain is due
+to change, and state writes for everything that changed in one tick are
+flushed together.
+
+Movements run at a constant speed unless they carry ``offsets``: the time
+after ``start_time`` at which each whole percent step is reached, as
+precomputed by the curtain's ``MotionModel``.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEFAULT_MAX_UPDATE_RATE, DOMAIN
+
+if TYPE_CHECKING:
+    from asyncio import TimerHandle
+
+    from .cover import BoardlinkCurtain
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_MOTION_ENGINE = "motion_engine"
+
+# 同一次唤醒中允许一起处理的截止时间误差（秒）
+TICK_SLACK = 0.005
+
+
+@dataclass(eq=False)
+class Motion:
+    """A single curtain movement tracked by the engine."""
+
+    entity: BoardlinkCurtain
+    start_position: int
+    target_position: int
+    start_time: float
+    run_time: float
+    min_interval: float
+    offsets: list[float] | None = None
+    position: int = field(init=False)
+    last_write: float = field(init=False)
+    active: bool = field(default=True, init=False)
+
+    def __post_init__(self) -> None:
+        """Initialise the derived fields."""
+        self.position = self.start_position
+        # 第一步变化不受限速影响
+        self.last_write = self.start_time - self.min_interval
+
+    @property
+    def distance(self) -> int:
+        """Return the number of whole percent steps to travel."""
+        return abs(self.target_position - self.start_position)
+
+    @property
+    def end_time(self) -> float:
+        """Return the loop time at which the movement completes."""
+        return self.start_time + self.run_time
+
+    def position_at(self, now: float) -> int:
+        """Return the displayed position at loop time ``now``."""
+        if self.run_time <= 0 or now >= self.end_time:
+            return self.target_position
+        # 容差避免浮点误差让恰好到期的一步被算成上一步
+        if self.offsets is not None:
+            steps = bisect_right(self.offsets, now - self.start_time + 1e-9)
+        else:
+            steps = int(self.distance * (now - self.start_time) / self.run_time + 1e-9)
+        if self.target_position < self.start_position:
+            return self.start_position - steps
+        return self.start_position + steps
+
+    def next_deadline(self) -> float:
+        """Return when the displayed position next needs to be written."""
+        done = abs(self.position - self.start_position)
+        if done >= self.distance or self.run_time <= 0:
+            return self.end_time
+        if self.offsets is not None:
+            change_at = self.start_time + self.offsets[done]
+        else:
+            change_at = self.start_time + self.run_time * (done + 1) / self.distance
+        return max(change_at, self.last_write + self.min_interval)
+
+
+class MotionEngine:
+    """Integration-wide scheduler for curtain position updates."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self._heap: list[tuple[float, int, Motion]] = []
+        self._motions: dict[str, Motion] = {}
+        self._counter = itertools.count()
+        self._timer: TimerHandle | None = None
+        self._timer_deadline: float | None = None
+
+        # 指标
+        self.started = 0
+        self.cancelled = 0
+        self.finished = 0
+        self.ticks = 0
+
+    @property
+    def active_count(self) -> int:
+        """Return the number of curtains currently moving."""
+        return len(self._motions)
+
+    @property
+    def active_unique_ids(self) -> list[str]:
+        """Return the unique IDs of the curtains currently moving."""
+        return list(self._motions)
+
+    @callback
+    def position(self, entity: BoardlinkCurtain) -> int | None:
+        """Return the current position of a moving curtain, or ``None``."""
+        if (motion := self._motions.get(entity.unique_id)) is None:
+            return None
+        return motion.position_at(self.hass.loop.time())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the engine metrics."""
+        return {
+            "active": self.active_count,
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "finished": self.finished,
+            "ticks": self.ticks,
+        }
+
+    @callback
+    def async_start(
+        self,
+        entity: BoardlinkCurtain,
+        start_position: int,
+        target_position: int,
+        run_time: float,
+        max_update_rate: float = DEFAULT_MAX_UPDATE_RATE,
+        start_time: float | None = None,
+        offsets: list[float] | None = None,
+    ) -> Motion:
+        """Start tracking a movement, replacing any previous one.
+
+        ``start_time`` may lie in the past for a movement that started
+        earlier; ``offsets`` gives the time of each step for motors that do
+        not run at a constant speed.
+        """
+        self.async_cancel(entity)
+        min_interval = 1.0 / max_update_rate if max_update_rate > 0 else 0.0
+        motion = Motion(
+            entity,
+            start_position,
+            target_position,
+            self.hass.loop.time() if start_time is None else start_time,
+            max(run_time, 0.0),
+            min_interval,
+            offsets,
+        )
+        self._motions[entity.unique_id] = motion
+        self.started += 1
+        self._push(motion)
+        return motion
+
+    @callback
+    def async_cancel(self, entity: BoardlinkCurtain) -> int | None:
+        """Stop tracking a movement and return the position reached."""
+        motion = self._motions.pop(entity.unique_id, None)
+        if motion is None:
+            return None
+        motion.active = False
+        motion.position = motion.position_at(self.hass.loop.time())
+        if motion.position != motion.target_position:
+            self.cancelled += 1
+        else:
+            self.finished += 1
+        return motion.position
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Drop all movements and the pending timer."""
+        for motion in self._motions.values():
+            motion.active = False
+        self._motions.clear()
+        self._heap.clear()
+        self._cancel_timer()
+
+    def _push(self, motion: Motion) -> None:
+        """Queue the next deadline of a movement."""
+        deadline = motion.next_deadline()
+        heapq.heappush(self._heap, (deadline, next(self._counter), motion))
+        if self._timer_deadline is None or deadline < self._timer_deadline:
+            self._schedule(deadline)
+
+    def _schedule(self, deadline: float) -> None:
+        """Arm the single wake-up timer for ``deadline``."""
+        self._cancel_timer()
+        self._timer_deadline = deadline
+        self._timer = self.hass.loop.call_at(deadline, self._tick)
+
+    def _cancel_timer(self) -> None:
+        """Cancel the pending wake-up timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._timer_deadline = None
+
+    @callback
+    def _tick(self) -> None:
+        """Advance every movement whose deadline has passed."""
+        self._timer = None
+        self._timer_deadline = None
+        self.ticks += 1
+        now = self.hass.loop.time()
+        # 同一运动在一次唤醒中可能推进多步，只写一次状态
+        changed: dict[Motion, None] = {}
+
+        while self._heap and self._heap[0][0] <= now + TICK_SLACK:
+            deadline, _, motion = heapq.heappop(self._heap)
+            if not motion.active:
+                continue
+            # 按截止时间求位置，提前唤醒的运动也一定有进展，不会原地重排
+            position = motion.position_at(max(now, deadline))
+            finished = position == motion.target_position
+            if position != motion.position or finished:
+                motion.position = position
+                motion.last_write = now
+                changed[motion] = None
+            if finished:
+                motion.active = False
+                self.finished += 1
+                self._motions.pop(motion.entity.unique_id, None)
+            else:
+                heapq.heappush(
+                    self._heap, (motion.next_deadline(), next(self._counter), motion)
+                )
+
+        # 每个 tick 只批量写一次状态
+        for motion in changed:
+            motion.entity.async_apply_motion(
+                motion.position, not motion.active
+            )
+
+        while self._heap and not self._heap[0][2].active:
+            heapq.heappop(self._heap)
+        if self._heap:
+            self._schedule(self._heap[0][0])
+
+
+@callback
+def async_get_motion_engine(hass: HomeAssistant) -> MotionEngine:
+    """Return the shared motion engine, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (engine := domain_data.get(DATA_MOTION_ENGINE)) is None:
+        engine = domain_data[DATA_MOTION_ENGINE] = MotionEngine(hass)
+    return engine
@@ -0,0 +1,208 @@
+"""Travel model of a curtain motor.
+
+Dead reckoning needs to know where a curtain is some time after a code
+went out. A ``MotionModel`` describes that with:
+
+- ``open_time`` / ``close_time``: full travel in each direction while the
+  motor runs, in seconds;
+- ``start_latency``: delay between the code leaving the blaster and the
+  motor moving;
+- ``stop_latency``: how long the motor keeps running after the stop code;
+- ``profile``: an optional piecewise-linear table of ``(position, share of
+  the full travel time needed to get there from fully closed)`` in percent,
+  for motors that do not run at a constant speed.
+
+The profile is expanded into a 101-entry table of travel-time shares when
+the model is built, so every lookup is a table read plus an interpolation,
+or a bisect for the inverse. Every time below is measured from the moment
+the direction code went out, with the motor at rest.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from .const import (
+    CONF_CLOSE_TIME,
+    CONF_OPEN_TIME,
+    CONF_START_LATENCY,
+    CONF_STOP_LATENCY,
+    CONF_TRAVEL_PROFILE,
+    DEFAULT_CLOSE_TIME,
+)
+
+Profile = list[list[float]]
+
+
+def parse_profile(value: str | Iterable[Iterable[float]] | None) -> Profile | None:
+    """Parse a travel profile such as ``"0:0, 50:60, 100:100"``.
+
+    Each point is ``position:share`` in percent. The end points are added
+    when missing and both columns must strictly increase. Returns ``None``
+    for an empty profile; raises ``ValueError`` for an invalid one.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        points = []
+        for item in value.replace(";", ",").split(","):
+            if not item.strip():
+                continue
+            position, _, share = item.partition(":")
+            points.append([float(position), float(share)])
+    else:
+        points = [[float(position), float(share)] for position, share in value]
+    if not points:
+        return None
+    if points[0] != [0.0, 0.0]:
+        points.insert(0, [0.0, 0.0])
+    if points[-1] != [100.0, 100.0]:
+        points.append([100.0, 100.0])
+    for (position, share), (next_position, next_share) in zip(points, points[1:]):
+        if not (0 <= position < next_position <= 100 and 0 <= share < next_share <= 100):
+            raise ValueError("Travel profile must increase from 0:0 to 100:100")
+    return points
+
+
+def format_profile(profile: Profile | None) -> str:
+    """Return a profile in the text form accepted by ``parse_profile``."""
+    if not profile:
+        return ""
+    return ", ".join(f"{position:g}:{share:g}" for position, share in profile)
+
+
+def _share_table(profile: Profile | None) -> tuple[float, ...]:
+    """Return the travel-time share needed to open to each whole percent."""
+    if not profile:
+        return tuple(position / 100.0 for position in range(101))
+    positions = [position for position, _ in profile]
+    table = []
+    for position in range(101):
+        index = min(bisect_right(positions, position), len(profile) - 1) - 1
+        (low_position, low_share), (high_position, high_share) = profile[index], profile[index + 1]
+        fraction = (position - low_position) / (high_position - low_position)
+        table.append((low_share + (high_share - low_share) * fraction) / 100.0)
+    return tuple(table)
+
+
+class MotionModel:
+    """Position of a curtain over time, per direction."""
+
+    __slots__ = (
+        "open_time",
+        "close_time",
+        "start_latency",
+        "stop_latency",
+        "profile",
+        "linear",
+        "_shares",
+    )
+
+    def __init__(
+        self,
+        open_time: float,
+        close_time: float,
+        start_latency: float = 0.0,
+        stop_latency: float = 0.0,
+        profile: Profile | None = None,
+    ) -> None:
+        """Initialize the model and build its lookup table."""
+        self.open_time = float(open_time)
+        self.close_time = float(close_time)
+        self.start_latency = float(start_latency)
+        self.stop_latency = float(stop_latency)
+        self.profile = profile
+        self._shares = _share_table(profile)
+        # 线性模型沿用运动引擎的等速插值，无需逐步时间表
+        self.linear = (
+            profile is None
+            and self.open_time == self.close_time
+            and not self.start_latency
+            and not self.stop_latency
+        )
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> MotionModel:
+        """Build the model of a curtain from its configuration."""
+        close_time = config.get(CONF_CLOSE_TIME, DEFAULT_CLOSE_TIME)
+        return cls(
+            config.get(CONF_OPEN_TIME) or close_time,
+            close_time,
+            config.get(CONF_START_LATENCY) or 0.0,
+            config.get(CONF_STOP_LATENCY) or 0.0,
+            parse_profile(config.get(CONF_TRAVEL_PROFILE)),
+        )
+
+    def travel_time(self, direction: int) -> float:
+        """Return the full travel time in a direction."""
+        return self.open_time if direction > 0 else self.close_time
+
+    def share(self, position: float) -> float:
+        """Return the share of the travel time needed to open to ``position``."""
+        if position <= 0:
+            return 0.0
+        if position >= 100:
+            return 1.0
+        index = int(position)
+        low = self._shares[index]
+        return low + (self._shares[index + 1] - low) * (position - index)
+
+    def position_at_share(self, share: float) -> float:
+        """Return the position reached after ``share`` of the travel time."""
+        if share <= 0:
+            return 0.0
+        if share >= 1:
+            return 100.0
+        index = bisect_right(self._shares, share) - 1
+        low, high = self._shares[index], self._shares[index + 1]
+        return index + (share - low) / (high - low)
+
+    def run_time(self, start: float, target: float) -> float:
+        """Return the seconds from the direction code until ``target`` is reached."""
+        if target == start:
+            return 0.0
+        direction = 1 if target > start else -1
+        travel = self.travel_time(direction) * abs(self.share(target) - self.share(start))
+        return self.start_latency + travel
+
+    def position_after(self, start: float, direction: int, elapsed: float) -> float:
+        """Return the position ``elapsed`` seconds after the direction code."""
+        moving = elapsed - self.start_latency
+        if moving <= 0:
+            return float(start)
+        travel = self.travel_time(direction)
+        if travel <= 0:
+            return 100.0 if direction > 0 else 0.0
+        return self.position_at_share(self.share(start) + direction * moving / travel)
+
+    def stopped_position(self, start: float, direction: int, elapsed: float) -> float:
+        """Return where the motor rests when the stop code goes out after ``elapsed``."""
+        return self.position_after(start, direction, elapsed + self.stop_latency)
+
+    def step_offsets(self, start: int, target: int) -> list[float] | None:
+        """Return when each whole percent on the way to ``target`` is reached.
+
+        Offsets are seconds after the direction code. Linear models return
+        ``None``; the motion engine interpolates those itself.
+        """
+        if self.linear or target == start:
+            return None
+        direction = 1 if target > start else -1
+        base = self.share(start)
+        travel = self.travel_time(direction)
+        shares = self._shares
+        return [
+            self.start_latency + travel * abs(shares[position] - base)
+            for position in range(start + direction, target + direction, direction)
+        ]
+
+    def as_config(self) -> dict[str, Any]:
+        """Return the model as configuration values."""
+        return {
+            CONF_OPEN_TIME: self.open_time,
+            CONF_CLOSE_TIME: self.close_time,
+            CONF_START_LATENCY: self.start_latency,
+            CONF_STOP_LATENCY: self.stop_latency,
+            CONF_TRAVEL_PROFILE: self.profile,
+        }
@@ -0,0 +1,95 @@
+"""Persistent curtain positions, including moves in progress.
+
+All curtains share one storage file. Writes are debounced, so a burst of
+moves results in a single compact write, and the file is read once at
+startup to restore every curtain in bulk.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .cover import BoardlinkCurtain
+
+DATA_POSITION_STORE = "position_store"
+
+STORAGE_KEY = f"{DOMAIN}.positions"
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+# 每个窗帘保存为 [位置, 目标位置, 开始时间(墙钟), 起始位置, 运行时长]
+Record = list[Any]
+
+
+class PositionStore:
+    """Snapshot of every curtain's position and in-flight move."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._store: Store[dict[str, Record]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY, private=True
+        )
+        self._records: dict[str, Record] = {}
+        self._entities: dict[str, BoardlinkCurtain] = {}
+        self._load_task: asyncio.Task[None] | None = None
+
+    async def async_load(self) -> None:
+        """Read all saved positions, once, however many entries ask."""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+        await self._load_task
+
+    async def _async_load(self) -> None:
+        """Read the storage file."""
+        self._records = await self._store.async_load() or {}
+
+    @callback
+    def async_get(self, unique_id: str) -> Record | None:
+        """Return the saved record of a curtain."""
+        return self._records.get(unique_id)
+
+    @callback
+    def async_register(self, entity: BoardlinkCurtain) -> None:
+        """Include a curtain in future snapshots."""
+        self._entities[entity.unique_id] = entity
+
+    @callback
+    def async_unregister(self, entity: BoardlinkCurtain) -> None:
+        """Take a final snapshot of a curtain and stop tracking it."""
+        if self._entities.pop(entity.unique_id, None) is not None:
+            self._records[entity.unique_id] = entity.async_snapshot(self._wall_offset())
+            self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write a snapshot once changes have settled."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _wall_offset(self) -> float:
+        """Return the offset that turns loop times into wall clock times."""
+        return time.time() - self.hass.loop.time()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Record]:
+        """Collect the current state of every registered curtain."""
+        offset = self._wall_offset()
+        for unique_id, entity in self._entities.items():
+            self._records[unique_id] = entity.async_snapshot(offset)
+        return self._records
+
+
+async def async_get_position_store(hass: HomeAssistant) -> PositionStore:
+    """Return the shared position store, loading it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (store := domain_data.get(DATA_POSITION_STORE)) is None:
+        store = domain_data[DATA_POSITION_STORE] = PositionStore(hass)
+    await store.async_load()
+    return store
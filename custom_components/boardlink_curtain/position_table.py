@@ -0,0 +1,183 @@
+"""Array-backed table of the position of every curtain.
+
+Each curtain owns one row of a few parallel arrays: position, target, ETA
+and a moving flag. Rows are written from the curtains' state writes, and
+every change stamps the row with the next table version, so "what changed
+since version N" is one pass over a compact array instead of a state
+object fetch per curtain.
+
+The table is read by the ``boardlink_curtain/positions`` websocket
+commands and the ``position_delta`` service. Rows are sent as
+``[row, entity_id, position, target, eta, moving]``; ``target`` and
+``eta`` (a Unix timestamp) are ``None`` unless the curtain is moving, and
+a removed curtain is sent once with ``entity_id`` set to ``None``.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_POSITION_TABLE = "position_table"
+
+COLUMNS = ("row", "entity_id", "position", "target", "eta", "moving")
+
+# 数组中表示“无”的取值
+NO_POSITION = -1
+NO_ETA = 0.0
+
+
+class PositionTable:
+    """Positions, targets, ETAs and moving flags of all curtains."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the table."""
+        self.hass = hass
+        self.version = 0
+        self._rows: dict[str, int] = {}
+        self._entity_ids: list[str | None] = []
+        self._free: list[int] = []
+        self._positions = array("b")
+        self._targets = array("b")
+        self._etas = array("d")
+        self._moving = array("B")
+        self._versions = array("Q")
+        self._listeners: list[Callable[[], None]] = []
+        self._flush_scheduled = False
+
+    def __len__(self) -> int:
+        """Return the number of curtains in the table."""
+        return len(self._rows)
+
+    @callback
+    def async_register(self, unique_id: str, entity_id: str) -> int:
+        """Return the row of a curtain, allocating one on first use."""
+        if (row := self._rows.get(unique_id)) is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._entity_ids)
+                self._entity_ids.append(None)
+                self._positions.append(NO_POSITION)
+                self._targets.append(NO_POSITION)
+                self._etas.append(NO_ETA)
+                self._moving.append(0)
+                self._versions.append(0)
+            self._rows[unique_id] = row
+        self._entity_ids[row] = entity_id
+        self._touch(row)
+        return row
+
+    @callback
+    def async_unregister(self, unique_id: str) -> None:
+        """Free the row of a removed curtain."""
+        if (row := self._rows.pop(unique_id, None)) is None:
+            return
+        self._entity_ids[row] = None
+        self._positions[row] = NO_POSITION
+        self._targets[row] = NO_POSITION
+        self._etas[row] = NO_ETA
+        self._moving[row] = 0
+        self._free.append(row)
+        self._touch(row)
+
+    @callback
+    def async_update(
+        self,
+        row: int,
+        position: int,
+        target: int | None,
+        eta: float | None,
+        moving: bool,
+    ) -> None:
+        """Write the state of a curtain; unchanged rows keep their version."""
+        target = NO_POSITION if target is None else target
+        eta = NO_ETA if eta is None else round(eta, 1)
+        if (
+            self._positions[row] == position
+            and self._targets[row] == target
+            and self._etas[row] == eta
+            and self._moving[row] == moving
+        ):
+            return
+        self._positions[row] = position
+        self._targets[row] = target
+        self._etas[row] = eta
+        self._moving[row] = moving
+        self._touch(row)
+
+    def _touch(self, row: int) -> None:
+        """Stamp a changed row and notify the listeners once per loop pass."""
+        self.version += 1
+        self._versions[row] = self.version
+        if self._listeners and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.hass.loop.call_soon(self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        """Tell the listeners that rows changed."""
+        self._flush_scheduled = False
+        for listener in list(self._listeners):
+            listener()
+
+    @callback
+    def async_subscribe(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call ``listener`` after each batch of changes."""
+        self._listeners.append(listener)
+
+        @callback
+        def _async_unsubscribe() -> None:
+            self._listeners.remove(listener)
+
+        return _async_unsubscribe
+
+    def rows_since(self, version: int) -> list[list[Any]]:
+        """Return the rows changed after ``version``.
+
+        Version 0 asks for a snapshot, which leaves out freed rows.
+        """
+        entity_ids = self._entity_ids
+        positions = self._positions
+        targets = self._targets
+        etas = self._etas
+        moving = self._moving
+        return [
+            [
+                row,
+                entity_ids[row],
+                None if positions[row] == NO_POSITION else positions[row],
+                None if targets[row] == NO_POSITION else targets[row],
+                None if etas[row] == NO_ETA else etas[row],
+                bool(moving[row]),
+            ]
+            for row, row_version in enumerate(self._versions)
+            if row_version > version and (version or entity_ids[row] is not None)
+        ]
+
+    def as_message(self, since: int = 0) -> dict[str, Any]:
+        """Return the rows changed after ``since`` with the current version.
+
+        A version from before a restart gets a fresh snapshot.
+        """
+        if since > self.version:
+            since = 0
+        return {
+            "version": self.version,
+            "snapshot": since == 0,
+            "columns": COLUMNS,
+            "rows": self.rows_since(since),
+        }
+
+
+@callback
+def async_get_position_table(hass: HomeAssistant) -> PositionTable:
+    """Return the shared position table, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (table := domain_data.get(DATA_POSITION_TABLE)) is None:
+        table = domain_data[DATA_POSITION_TABLE] = PositionTable(hass)
+    return table
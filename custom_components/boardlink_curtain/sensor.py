@@ -0,0 +1,134 @@
+"""Metric sensors for Boardlink curtain hubs.
+
+Each hub config entry gets a few sensors summarising its curtains. They
+are disabled by default and read the shared metrics every 30 seconds.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import CONF_CURTAINS, DOMAIN
+from .metrics import async_get_metrics
+from .motion import async_get_motion_engine
+
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+@dataclass
+class HubSensorDescription(SensorEntityDescription):
+    """Describes a hub metric sensor."""
+
+    value_fn: Callable[[dict[str, Any]], Any] = lambda summary: None
+
+
+def _round(value: float | None, digits: int) -> float | None:
+    """Round an optional value."""
+    return None if value is None else round(value, digits)
+
+
+SENSORS: tuple[HubSensorDescription, ...] = (
+    HubSensorDescription(
+        key="commands",
+        name="commands",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda summary: summary["commands"],
+    ),
+    HubSensorDescription(
+        key="state_writes",
+        name="state writes",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda summary: summary["state_writes"],
+    ),
+    HubSensorDescription(
+        key="ir_sends",
+        name="IR sends",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda summary: summary["sends"],
+    ),
+    HubSensorDescription(
+        key="ir_send_failures",
+        name="IR send failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda summary: summary["send_failures"],
+    ),
+    HubSensorDescription(
+        key="send_latency_p95",
+        name="IR send latency p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda summary: _round(summary["send_latency"].quantile(0.95), 3),
+    ),
+    HubSensorDescription(
+        key="stop_error_mean",
+        name="stop error",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda summary: _round(summary["stop_error"].mean, 2),
+    ),
+    HubSensorDescription(
+        key="moving",
+        name="moving curtains",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda summary: summary["moving"],
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up metric sensors for a hub config entry."""
+    if CONF_CURTAINS not in hass.data[DOMAIN][entry.entry_id]:
+        # 单个窗帘的配置项没有统计传感器
+        return
+    async_add_entities(
+        HubMetricSensor(entry, description) for description in SENSORS
+    )
+
+
+class HubMetricSensor(SensorEntity):
+    """A metric summed over the curtains of one hub."""
+
+    entity_description: HubSensorDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, entry: ConfigEntry, description: HubSensorDescription) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry_id = entry.entry_id
+        self._attr_name = f"{entry.title} {description.name}"
+        self._attr_unique_id = f"{entry.entry_id}_metric_{description.key}"
+
+    async def async_update(self) -> None:
+        """Read the current metrics of the hub's curtains."""
+        metrics = async_get_metrics(self.hass)
+        # 集线器中窗帘的 unique_id 以配置项 ID 开头
+        unique_ids = [
+            unique_id
+            for unique_id in metrics.curtains
+            if unique_id.startswith(self._entry_id)
+        ]
+        summary = metrics.summary(unique_ids)
+        summary["moving"] = sum(
+            1
+            for unique_id in async_get_motion_engine(self.hass).active_unique_ids
+            if unique_id.startswith(self._entry_id)
+        )
+        self._attr_native_value = self.entity_description.value_fn(summary)
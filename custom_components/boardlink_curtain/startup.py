@@ -0,0 +1,128 @@
+"""Startup timing report.
+
+Records how long the integration took from being imported to having every
+curtain of every config entry added to Home Assistant:
+
+- ``phases``: milliseconds since the package import at which
+  ``async_setup`` ran (``setup``) and at which the last curtain of all
+  entries was added (``all_ready``);
+- ``entries``: per config entry, when its setup started and when its last
+  curtain was added, and how many curtains it has.
+
+The report is included in the diagnostics of every entry.
+
+Modules of the integration that are only needed later are imported with
+``async_import_modules``, which runs the import in the executor so the
+event loop never blocks on module code or file reads.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+DATA_STARTUP = "startup"
+
+
+class StartupReport:
+    """Milestones of the integration startup."""
+
+    def __init__(self, loaded: float) -> None:
+        """Initialize the report; ``loaded`` is when the package was imported."""
+        self.loaded = loaded
+        self.phases: dict[str, float] = {}
+        self._entries: dict[str, dict[str, Any]] = {}
+
+    def _ms(self) -> float:
+        """Return the milliseconds elapsed since the package import."""
+        return round((time.monotonic() - self.loaded) * 1000, 1)
+
+    @callback
+    def async_mark(self, phase: str) -> None:
+        """Record a setup phase, keeping the first time it was reached."""
+        self.phases.setdefault(phase, self._ms())
+
+    @callback
+    def async_entry_started(self, entry_id: str) -> None:
+        """Record the start of a config entry setup."""
+        self._entries[entry_id] = {
+            "curtains": None,
+            "added": 0,
+            "started_ms": self._ms(),
+            "ready_ms": None,
+        }
+        self.phases.pop("all_ready", None)
+
+    @callback
+    def async_entry_curtains(self, entry_id: str, curtains: int) -> None:
+        """Record how many curtains the cover platform created for an entry."""
+        if (entry := self._entries.get(entry_id)) is not None:
+            entry["curtains"] = curtains
+            self._check_ready(entry)
+
+    @callback
+    def async_curtain_added(self, unique_id: str) -> None:
+        """Count a curtain added to Home Assistant.
+
+        Curtains of a hub have unique IDs starting with the entry ID; a
+        single curtain uses the entry ID itself.
+        """
+        for entry_id, entry in self._entries.items():
+            if unique_id.startswith(entry_id) and entry["ready_ms"] is None:
+                entry["added"] += 1
+                self._check_ready(entry)
+                return
+
+    def _check_ready(self, entry: dict[str, Any]) -> None:
+        """Stamp an entry whose curtains have all been added."""
+        if entry["curtains"] is None or entry["added"] < entry["curtains"]:
+            return
+        entry["ready_ms"] = self._ms()
+        if all(other["ready_ms"] is not None for other in self._entries.values()):
+            self.async_mark("all_ready")
+
+    @callback
+    def async_entry_unloaded(self, entry_id: str) -> None:
+        """Forget an unloaded entry."""
+        self._entries.pop(entry_id, None)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the report."""
+        return {"phases": dict(self.phases), "entries": dict(self._entries)}
+
+
+@callback
+def async_get_startup_report(hass: HomeAssistant, loaded: float | None = None) -> StartupReport:
+    """Return the shared startup report, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (report := domain_data.get(DATA_STARTUP)) is None:
+        report = domain_data[DATA_STARTUP] = StartupReport(
+            time.monotonic() if loaded is None else loaded
+        )
+    return report
+
+
+async def async_import_modules(hass: HomeAssistant, *names: str) -> None:
+    """Import modules of the integration in the executor.
+
+    Modules that are already imported are skipped, so callers can use a
+    plain ``from .module import name`` right after awaiting this.
+    """
+    missing = [
+        module
+        for name in names
+        if (module := f"{__package__}.{name}") not in sys.modules
+    ]
+    if missing:
+        await hass.async_add_executor_job(_import_modules, missing)
+
+
+def _import_modules(modules: list[str]) -> None:
+    """Import modules; runs in the executor."""
+    for module in modules:
+        importlib.import_module(module)
@@ -0,0 +1,82 @@
+"""Timing helpers for accurate intermediate stops.
+
+All times are event loop times (``loop.time()``), which are monotonic and
+unaffected by wall clock steps.
+"""
+from __future__ import annotations
+
+from collections import deque
+from statistics import median
+from typing import Any
+
+# 滚动窗口大小
+LATENCY_WINDOW = 20
+ERROR_WINDOW = 50
+
+# 单次发送延迟估计的上限（秒），避免异常样本让停止过早
+MAX_LATENCY = 2.0
+
+
+class LatencyEstimator:
+    """Rolling estimate of the delay between queuing a code and its emission."""
+
+    def __init__(self, initial: float = 0.0, size: int = LATENCY_WINDOW) -> None:
+        """Initialize the estimator."""
+        self._samples: deque[float] = deque(maxlen=size)
+        self._initial = initial
+        self._value = initial
+
+    @property
+    def value(self) -> float:
+        """Return the current estimate in seconds."""
+        return self._value
+
+    def add(self, sample: float) -> None:
+        """Add a measured latency."""
+        self._samples.append(min(max(sample, 0.0), MAX_LATENCY))
+        # 中位数对偶发的长时间排队不敏感
+        self._value = median(self._samples)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the estimator state."""
+        return {
+            "estimate": round(self._value, 4),
+            "samples": len(self._samples),
+        }
+
+
+class StopErrorLog:
+    """Achieved position error of the most recent intermediate stops."""
+
+    def __init__(self, size: int = ERROR_WINDOW) -> None:
+        """Initialize the log."""
+        self._errors: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    @property
+    def last(self) -> float | None:
+        """Return the error of the last stop, in percent."""
+        return self._errors[-1] if self._errors else None
+
+    @property
+    def mean_abs(self) -> float | None:
+        """Return the mean absolute error over the window, in percent."""
+        if not self._errors:
+            return None
+        return sum(abs(error) for error in self._errors) / len(self._errors)
+
+    def record(self, target: float, achieved: float) -> float:
+        """Record a stop and return its signed error."""
+        error = achieved - target
+        self._errors.append(error)
+        self.count += 1
+        return error
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the error statistics."""
+        return {
+            "stops": self.count,
+            "last": None if self.last is None else round(self.last, 2),
+            "mean_abs": None if self.mean_abs is None else round(self.mean_abs, 2),
+        }
+
@@ -0,0 +1,154 @@
+"""Command trace recorder for Boardlink curtains.
+
+While a trace is running, every cover command (open, close, stop, set
+position) is appended to a JSON Lines file together with the curtain's
+position at that moment. The first command of each curtain is preceded by
+a ``curtain`` line holding the settings needed to rebuild it, so the file
+can be replayed offline by ``benchmarks/replay.py``.
+
+Lines are buffered and written from the executor once per second.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import IO, TYPE_CHECKING, Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .cover import BoardlinkCurtain
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_TRACE_RECORDER = "trace_recorder"
+
+TRACE_VERSION = 1
+FLUSH_DELAY = 1
+
+
+class TraceRecorder:
+    """Append the command stream of every curtain to a trace file."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.path: str | None = None
+        self.commands = 0
+        self._file: IO[str] | None = None
+        self._buffer: list[str] = []
+        self._seen: set[str] = set()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @property
+    def active(self) -> bool:
+        """Return whether a trace is being recorded."""
+        return self._file is not None
+
+    async def async_start(self, path: str) -> None:
+        """Start recording to ``path``, ending any trace in progress."""
+        await self.async_stop()
+        self._file = await self.hass.async_add_executor_job(self._open, path)
+        self.path = path
+        self.commands = 0
+        self._seen.clear()
+        self._append({"trace": TRACE_VERSION, "started": time.time()})
+        _LOGGER.info("Recording curtain command trace to %s", path)
+
+    async def async_stop(self) -> str | None:
+        """Write out the buffered lines and close the trace file."""
+        if self._file is None:
+            return None
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        file, self._file = self._file, None
+        lines, self._buffer = self._buffer, []
+        await self.hass.async_add_executor_job(self._write, file, lines, True)
+        _LOGGER.info(
+            "Stopped curtain command trace %s (%d commands)", self.path, self.commands
+        )
+        return self.path
+
+    @callback
+    def async_record(
+        self,
+        entity: BoardlinkCurtain,
+        command: str,
+        position: int | None = None,
+    ) -> None:
+        """Record one command received by ``entity``."""
+        if self._file is None:
+            return
+        unique_id = entity.unique_id
+        if unique_id not in self._seen:
+            self._seen.add(unique_id)
+            self._append({"curtain": unique_id, "config": entity.trace_config()})
+        self.commands += 1
+        self._append({
+            "t": time.time(),
+            "id": unique_id,
+            "cmd": command,
+            "position": position,
+            "current": entity.current_cover_position,
+        })
+
+    def _append(self, record: dict[str, Any]) -> None:
+        """Buffer a line and schedule a flush."""
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self.hass, FLUSH_DELAY, self._async_flush)
+
+    async def _async_flush(self, _now: object) -> None:
+        """Write the buffered lines."""
+        self._unsub_flush = None
+        if self._file is None or not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        await self.hass.async_add_executor_job(self._write, self._file, lines, False)
+
+    @staticmethod
+    def _open(path: str) -> IO[str]:
+        """Create the trace file."""
+        return open(path, "w", encoding="utf-8")
+
+    @staticmethod
+    def _write(file: IO[str], lines: list[str], close: bool) -> None:
+        """Append lines to the trace file."""
+        if lines:
+            file.write("\n".join(lines) + "\n")
+        file.flush()
+        if close:
+            file.close()
+
+
+@callback
+def async_get_trace_recorder(hass: HomeAssistant) -> TraceRecorder:
+    """Return the shared trace recorder, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (recorder := domain_data.get(DATA_TRACE_RECORDER)) is None:
+        recorder = domain_data[DATA_TRACE_RECORDER] = TraceRecorder(hass)
+
+        async def _async_close(_event: Event) -> None:
+            await recorder.async_stop()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close)
+    return recorder
+
+
+@callback
+def async_record_command(
+    hass: HomeAssistant,
+    entity: BoardlinkCurtain,
+    command: str,
+    position: int | None = None,
+) -> None:
+    """Record a command if a trace is running; a no-op otherwise."""
+    recorder = hass.data.get(DOMAIN, {}).get(DATA_TRACE_RECORDER)
+    if recorder is not None and recorder.active:
+        recorder.async_record(entity, command, position)
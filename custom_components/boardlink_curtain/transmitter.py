@@ -0,0 +1,360 @@
+"""Per-blaster IR send queue for Boardlink curtains.
+
+Every blaster gets one ``Transmitter``. Codes queued on it are handed to its
+transport in batches of at most ``batch_size`` and spaced by the
+transport's airtime, so IR and RF codes go out one at a time and never
+overlap on air while MQTT codes are published as fast as the broker takes
+them. Stop codes carry a deadline and go out before open/close codes,
+earliest deadline first, except that a stop never overtakes an open or
+close code of the same curtain that is still waiting: it is queued after
+that code instead, so the curtain never stops before it starts.
+
+Curtains that share a remote share its codes, so one burst moves all of
+them. A code that is already waiting in the queue is therefore not queued
+again: the new sender simply waits for the pending transmission.
+
+A failed or timed-out send is retried with exponential backoff unless the
+transport is down; the sender's future only resolves once the code is
+delivered or the last attempt failed. Retries go back through the queue,
+and every transmitter takes at most ``MAX_TRANSMITTER_IN_FLIGHT`` codes
+out of a shared budget of ``MAX_IN_FLIGHT``, so a failing blaster cannot
+flood the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .code_store import IRCode
+from .const import DEFAULT_TRANSMITTER, DOMAIN
+from .metrics import async_get_metrics
+from .timing import LatencyEstimator
+
+if TYPE_CHECKING:
+    from .transport import Transport
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_TRANSMITTERS = "transmitters"
+DATA_SEND_LIMIT = "send_limit"
+
+# 发送优先级：停止码按截止时间优先，其余按先来后到
+PRIORITY_STOP = 0
+PRIORITY_MOVE = 1
+
+# 指标的指数滑动平均系数
+EWMA_ALPHA = 0.2
+
+# 每条码最多尝试的次数，以及首次重试前的等待时间（秒，之后逐次翻倍）；
+# 停止码晚一点就多走一段，重试等待更短
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+STOP_RETRY_BACKOFF = 0.05
+
+# 全部发射器与单个发射器同时发送中的码数上限
+MAX_IN_FLIGHT = 32
+MAX_TRANSMITTER_IN_FLIGHT = 8
+
+
+@dataclass(order=True)
+class _QueuedCode:
+    """A code waiting for its turn on a transmitter."""
+
+    priority: int
+    deadline: float
+    seq: int
+    code: IRCode = field(compare=False)
+    enqueued: float = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    # 等待这条码的窗帘
+    senders: set[str] = field(default_factory=set, compare=False)
+
+
+def _pending_key(priority: int, code: IRCode) -> tuple[int, bytes | str]:
+    """Return the key under which identical queued codes are merged."""
+    return priority, code.packet if code.packet is not None else code.source
+
+
+class Transmitter:
+    """Serialise the codes sent through one blaster."""
+
+    def __init__(self, hass: HomeAssistant, key: str, transport: Transport) -> None:
+        """Initialize the transmitter."""
+        self.hass = hass
+        self.key = key
+        self.transport = transport
+        self._min_airtime = transport.airtime
+        self._queue: list[_QueuedCode] = []
+        # 队列中尚未发出的红外码，按 (优先级, 码) 索引，用于合并相同的发送
+        self._pending: dict[tuple[int, bytes | str], _QueuedCode] = {}
+        self._counter = itertools.count()
+        self._worker: asyncio.Task[None] | None = None
+        self._busy_until = 0.0
+        self._limit = async_get_send_limit(hass)
+
+        # 从排队到发出的滚动延迟估计，用于提前触发停止
+        self.latency = LatencyEstimator()
+
+        # 指标
+        self._metrics = async_get_metrics(hass)
+        self.airtime = transport.airtime
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.retrying = 0
+        self.deduplicated = 0
+        self.wait_avg = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of codes waiting to be sent, or to be retried."""
+        return len(self._queue) + self.retrying
+
+    @callback
+    def async_set_transport(self, transport: Transport) -> None:
+        """Send the following batches through a new transport."""
+        _LOGGER.info("Transmitter %s now sends through %s", self.key, transport.name)
+        self.transport = transport
+        self._min_airtime = transport.airtime
+        self.airtime = max(self.airtime, transport.airtime)
+
+    def async_send(
+        self, code: IRCode, deadline: float | None = None, sender: str | None = None
+    ) -> asyncio.Future[None]:
+        """Queue a code and return a future resolved once it is on air.
+
+        Codes with a ``deadline`` (loop time) are stop codes and are sent
+        ahead of everything else, earliest deadline first, unless an open
+        or close code queued by the same ``sender`` is still waiting. Every
+        caller gets its own future, so cancelling one does not affect the
+        others sharing the code.
+        """
+        priority = PRIORITY_MOVE if deadline is None else PRIORITY_STOP
+        if priority == PRIORITY_STOP and sender is not None and self._has_move(sender):
+            # 同一窗帘的开/关码还在排队：停止码排在它后面，否则先停后走
+            priority, deadline = PRIORITY_MOVE, None
+        key = _pending_key(priority, code)
+        if (pending := self._pending.get(key)) is not None:
+            # 相同的码已在排队：一次发射即可覆盖所有共用该码的窗帘
+            self.deduplicated += 1
+            if sender is not None:
+                pending.senders.add(sender)
+            if deadline is not None and deadline < pending.deadline:
+                pending.deadline = deadline
+                heapq.heapify(self._queue)
+            return self._waiter(pending)
+
+        now = self.hass.loop.time()
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        item = _QueuedCode(
+            priority, 0.0 if deadline is None else deadline, next(self._counter), code, now, future
+        )
+        if sender is not None:
+            item.senders.add(sender)
+        self._pending[key] = item
+        self._push(item)
+        return self._waiter(item)
+
+    def _has_move(self, sender: str) -> bool:
+        """Return whether an open or close code of ``sender`` is waiting or retrying."""
+        return any(
+            item.priority == PRIORITY_MOVE and sender in item.senders
+            for item in self._pending.values()
+        )
+
+    def _waiter(self, item: _QueuedCode) -> asyncio.Future[None]:
+        """Return a future of one caller that follows the queued code."""
+        waiter: asyncio.Future[None] = self.hass.loop.create_future()
+        _chain_future(item.future, waiter)
+        return waiter
+
+    def _push(self, item: _QueuedCode) -> None:
+        """Put a code in the queue and make sure it is being drained."""
+        heapq.heappush(self._queue, item)
+        if self._worker is None:
+            self._worker = self.hass.async_create_task(self._async_drain())
+
+    async def _async_drain(self) -> None:
+        """Send queued codes until the queue is empty."""
+        loop = self.hass.loop
+        try:
+            while self._queue:
+                # 每批重新取传输：配置变更可能已替换它
+                transport = self.transport
+                # 等待上一批码在空中发送完毕
+                if (gap := self._busy_until - loop.time()) > 0:
+                    await asyncio.sleep(gap)
+                slots = await self._async_acquire(
+                    min(transport.batch_size, MAX_TRANSMITTER_IN_FLIGHT, len(self._queue))
+                )
+                batch = [heapq.heappop(self._queue) for _ in range(slots)]
+                for item in batch:
+                    self._pending.pop(_pending_key(item.priority, item.code), None)
+                started = loop.time()
+                for item in batch:
+                    self._record_wait(started - item.enqueued)
+                try:
+                    results = await transport.async_send_batch(
+                        [item.code for item in batch]
+                    )
+                finally:
+                    for _ in range(slots):
+                        self._limit.release()
+                finished = loop.time()
+                duration = finished - started
+                for item, error in zip(batch, results):
+                    if error is not None:
+                        self._handle_failure(item, error)
+                        continue
+                    self._metrics.record_send(self.key, item.code.source, duration)
+                    self.sent += 1
+                    if not item.attempts:
+                        # 重试的码包含退避时间，不计入发送延迟估计
+                        self.latency.add(finished - item.enqueued)
+                    if not item.future.done():
+                        item.future.set_result(None)
+                if any(error is None for error in results):
+                    self.airtime += EWMA_ALPHA * (
+                        max(duration, self._min_airtime) - self.airtime
+                    )
+                    self._busy_until = started + max(duration, self._min_airtime)
+        finally:
+            self._worker = None
+
+    async def _async_acquire(self, wanted: int) -> int:
+        """Take up to ``wanted`` slots of the shared in-flight budget.
+
+        Waits for the first slot only and takes the others while they are
+        free, so transmitters never hold part of a batch while waiting.
+        """
+        await self._limit.acquire()
+        slots = 1
+        while slots < wanted and not self._limit.locked():
+            await self._limit.acquire()
+            slots += 1
+        return slots
+
+    def _handle_failure(self, item: _QueuedCode, error: Exception) -> None:
+        """Retry a failed code later, or fail its senders."""
+        item.attempts += 1
+        if item.attempts >= MAX_ATTEMPTS or self.transport.health.down:
+            # 次数用尽，或传输已离线（不再重试，以免拖慢其他码）
+            self.failed += 1
+            if not item.future.done():
+                item.future.set_exception(error)
+            return
+        key = _pending_key(item.priority, item.code)
+        if (pending := self._pending.get(key)) is not None:
+            # 相同的码已重新排队，等待那一次发送即可
+            _chain_future(pending.future, item.future)
+            return
+        self._pending[key] = item
+        self.retried += 1
+        self.retrying += 1
+        _LOGGER.debug(
+            "Retrying %s on %s (attempt %d): %s",
+            item.code.source,
+            self.key,
+            item.attempts + 1,
+            error,
+        )
+        backoff = STOP_RETRY_BACKOFF if item.priority == PRIORITY_STOP else RETRY_BACKOFF
+        self.hass.loop.call_later(backoff * 2 ** (item.attempts - 1), self._retry, item)
+
+    @callback
+    def _retry(self, item: _QueuedCode) -> None:
+        """Queue a failed code again once its backoff has passed."""
+        self.retrying -= 1
+        self._push(item)
+
+    def _record_wait(self, wait: float) -> None:
+        """Update the queue wait statistics."""
+        self.wait_last = wait
+        self.wait_max = max(self.wait_max, wait)
+        self.wait_avg += EWMA_ALPHA * (wait - self.wait_avg)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the queue metrics."""
+        return {
+            "transport": self.transport.as_dict(),
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "deduplicated": self.deduplicated,
+            "airtime": round(self.airtime, 4),
+            "wait_last": round(self.wait_last, 4),
+            "wait_avg": round(self.wait_avg, 4),
+            "wait_max": round(self.wait_max, 4),
+            "latency": self.latency.as_dict(),
+        }
+
+
+def _chain_future(source: asyncio.Future[None], target: asyncio.Future[None]) -> None:
+    """Resolve ``target`` the same way as ``source`` once it is done."""
+
+    def _copy(done: asyncio.Future[None]) -> None:
+        if target.done():
+            return
+        if done.cancelled():
+            target.cancel()
+        elif (error := done.exception()) is not None:
+            target.set_exception(error)
+        else:
+            target.set_result(None)
+
+    source.add_done_callback(_copy)
+
+
+@callback
+def async_get_send_limit(hass: HomeAssistant) -> asyncio.Semaphore:
+    """Return the in-flight budget shared by every transmitter."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (limit := domain_data.get(DATA_SEND_LIMIT)) is None:
+        limit = domain_data[DATA_SEND_LIMIT] = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return limit
+
+
+@callback
+def async_get_transmitter(
+    hass: HomeAssistant,
+    key: str | None = None,
+    host: str | None = None,
+    mac: str | None = None,
+    device_type: str | None = None,
+    transport: str | None = None,
+    topic: str | None = None,
+    rebuild: bool = False,
+) -> Transmitter:
+    """Return the shared transmitter for a blaster, creating it on first use.
+
+    The transport is chosen by the first curtain that uses ``key``; callers
+    put the transport settings in the key so that curtains sending through
+    different hardware never share a transmitter. ``rebuild`` replaces the
+    transport of an existing transmitter after its settings changed.
+    """
+    # 传输模块在配置项设置时已由执行器导入
+    from .transport import async_create_transport
+
+    key = key or DEFAULT_TRANSMITTER
+    transmitters: dict[str, Transmitter] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_TRANSMITTERS, {}
+    )
+    if (transmitter := transmitters.get(key)) is None:
+        transmitter = transmitters[key] = Transmitter(
+            hass, key, async_create_transport(hass, transport, host, mac, device_type, topic)
+        )
+    elif rebuild:
+        transmitter.async_set_transport(
+            async_create_transport(hass, transport, host, mac, device_type, topic)
+        )
+    return transmitter
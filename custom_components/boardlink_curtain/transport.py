@@ -0,0 +1,371 @@
+"""Ways of getting a code out to a curtain motor.
+
+A transport hands codes to one kind of hardware: the IR script service, a
+Broadlink device over UDP (IR or RF433) or an MQTT-bridged motor. Each
+``Transmitter`` queue owns one transport and reads its pacing from it:
+
+- ``airtime``: how long one code occupies the medium, so codes on the same
+  transmitter never overlap. MQTT has none.
+- ``batch_size``: how many queued codes may be handed over in one
+  ``async_send_batch`` call.
+- ``concurrency``: how many batches all transports of the same ``kind``
+  may have in flight together, so one slow backend cannot tie up the
+  others and a fast backend is not paced by the slowest one.
+
+Each send is bounded by ``SEND_TIMEOUT``; a send that does not finish in
+time counts as failed. Every transport keeps a small health record that
+shows up in diagnostics.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .code_store import IRCode
+from .const import (
+    DEFAULT_AIRTIME,
+    DOMAIN,
+    RF_AIRTIME,
+    SEND_TIMEOUT,
+    TRANSPORT_MQTT,
+    TRANSPORT_RF,
+)
+
+if TYPE_CHECKING:
+    from .broadlink_udp import BroadlinkPool, BroadlinkSession
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_BROADLINK_POOL = "broadlink_pool"
+DATA_TRANSPORT_LIMITS = "transport_limits"
+
+# 连续失败达到该次数即视为不健康、视为离线，成功一次即恢复
+UNHEALTHY_FAILURES = 3
+DOWN_FAILURES = 10
+
+# 博联 RF 数据包首字节：RF433、RF315
+RF_PACKET_TYPES = (0xB2, 0xD7)
+
+
+class TransportHealth:
+    """Send counters and the last error of one transport."""
+
+    __slots__ = ("sent", "failed", "consecutive_failures", "last_error", "last_success")
+
+    def __init__(self) -> None:
+        """Initialize the record."""
+        self.sent = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_success: float | None = None
+
+    @property
+    def healthy(self) -> bool:
+        """Return whether recent sends went through."""
+        return self.consecutive_failures < UNHEALTHY_FAILURES
+
+    @property
+    def down(self) -> bool:
+        """Return whether sends have kept failing long enough to stop retrying."""
+        return self.consecutive_failures >= DOWN_FAILURES
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the record as a dictionary."""
+        return {
+            "healthy": self.healthy,
+            "sent": self.sent,
+            "failed": self.failed,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_success": self.last_success,
+        }
+
+
+class Transport:
+    """Base class of the transports."""
+
+    kind = "script"
+    airtime = DEFAULT_AIRTIME
+    batch_size = 1
+    concurrency = 8
+
+    def __init__(self, hass: HomeAssistant, name: str) -> None:
+        """Initialize the transport."""
+        self.hass = hass
+        self.name = name
+        self.health = TransportHealth()
+        self._limit = async_get_transport_limit(hass, self.kind, self.concurrency)
+
+    async def async_send(self, code: IRCode) -> None:
+        """Send one code, raising if it failed."""
+        if (error := (await self.async_send_batch([code]))[0]) is not None:
+            raise error
+
+    async def async_send_batch(self, codes: list[IRCode]) -> list[Exception | None]:
+        """Send codes in queue order and return the error of each, or ``None``."""
+        async with self._limit:
+            if len(codes) == 1:
+                try:
+                    await self._async_send_timed(codes[0])
+                except Exception as err:  # pylint: disable=broad-except
+                    results: list[Exception | None] = [err]
+                else:
+                    results = [None]
+            else:
+                results = await self._async_send_many(codes)
+        for result in results:
+            self._record(result)
+        return results
+
+    async def _async_send_many(self, codes: list[IRCode]) -> list[Exception | None]:
+        """Send several codes; one after the other unless overridden."""
+        results: list[Exception | None] = []
+        for code in codes:
+            try:
+                await self._async_send_timed(code)
+            except Exception as err:  # pylint: disable=broad-except
+                results.append(err)
+            else:
+                results.append(None)
+        return results
+
+    async def _async_send_timed(self, code: IRCode) -> None:
+        """Send one code, giving up after ``SEND_TIMEOUT`` seconds."""
+        try:
+            await asyncio.wait_for(self._async_send(code), SEND_TIMEOUT)
+        except asyncio.TimeoutError as err:
+            raise TimeoutError(f"{code.source} not sent within {SEND_TIMEOUT}s") from err
+
+    async def _async_send(self, code: IRCode) -> None:
+        """Send one code."""
+        raise NotImplementedError
+
+    def _record(self, error: Exception | None) -> None:
+        """Update the health record after a send."""
+        health = self.health
+        if error is None:
+            if not health.healthy:
+                _LOGGER.info("Transport %s recovered", self.name)
+            health.sent += 1
+            health.consecutive_failures = 0
+            health.last_success = time.time()
+            return
+        health.failed += 1
+        health.consecutive_failures += 1
+        health.last_error = str(error) or type(error).__name__
+        if health.consecutive_failures == UNHEALTHY_FAILURES:
+            _LOGGER.warning(
+                "Transport %s failed %d times in a row: %s",
+                self.name,
+                UNHEALTHY_FAILURES,
+                health.last_error,
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the transport settings and health."""
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "airtime": self.airtime,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            **self.health.as_dict(),
+        }
+
+
+class ScriptTransport(Transport):
+    """Send codes through the ``script.mock_send_ir`` service."""
+
+    def __init__(self, hass: HomeAssistant, airtime: float = DEFAULT_AIRTIME) -> None:
+        """Initialize the transport."""
+        super().__init__(hass, "script.mock_send_ir")
+        self.airtime = airtime
+
+    async def _async_send(self, code: IRCode) -> None:
+        """Run the script and wait for it, so failures are reported."""
+        await self.hass.services.async_call(
+            "script",
+            "mock_send_ir",
+            {
+                "code": code.source
+            },
+            blocking=True
+        )
+
+
+class BroadlinkTransport(Transport):
+    """Send codes straight to a Broadlink device over UDP.
+
+    Codes without a packet (script-level code names) go through the
+    fallback transport instead.
+    """
+
+    kind = "broadlink"
+
+    def __init__(self, session: BroadlinkSession, fallback: ScriptTransport) -> None:
+        """Initialize the transport."""
+        super().__init__(fallback.hass, f"broadlink {session.host}")
+        self.session = session
+        self.fallback = fallback
+
+    async def _async_send(self, code: IRCode) -> None:
+        """Send a code through the pooled device session."""
+        if code.packet is None:
+            await self.fallback.async_send(code)
+            return
+        await self.session.async_send_data(code.packet)
+
+
+class BroadlinkRFTransport(BroadlinkTransport):
+    """Send RF433/RF315 packets through a Broadlink RM Pro.
+
+    RF remotes repeat each frame for a while, so codes are spaced further
+    apart than IR codes. Learned IR packets are refused.
+    """
+
+    airtime = RF_AIRTIME
+
+    async def _async_send(self, code: IRCode) -> None:
+        """Send an RF packet through the pooled device session."""
+        if code.packet is not None and code.packet[0] not in RF_PACKET_TYPES:
+            raise ValueError(f"{code.source} is not an RF code")
+        await super()._async_send(code)
+
+
+class MQTTTransport(Transport):
+    """Publish codes as payloads to the command topic of an MQTT motor.
+
+    Publishing goes through the ``mqtt.publish`` service, so the MQTT
+    integration is only needed by curtains that use it and any service
+    registered under that name can stand in for a broker. Separate service
+    calls are not ordered, so the codes of a batch are published one after
+    the other; every topic has its own transmitter, so different topics
+    still publish in parallel.
+    """
+
+    kind = TRANSPORT_MQTT
+    airtime = 0.0
+    batch_size = 8
+    concurrency = 32
+
+    def __init__(self, hass: HomeAssistant, topic: str, qos: int = 0) -> None:
+        """Initialize the transport."""
+        super().__init__(hass, f"mqtt {topic}")
+        self.topic = topic
+        self.qos = qos
+
+    async def _async_send(self, code: IRCode) -> None:
+        """Publish a code and wait until the MQTT client has taken it."""
+        await self.hass.services.async_call(
+            "mqtt",
+            "publish",
+            {"topic": self.topic, "payload": code.source, "qos": self.qos},
+            blocking=True,
+        )
+
+
+@callback
+def async_get_transport_limit(
+    hass: HomeAssistant, kind: str, concurrency: int
+) -> asyncio.Semaphore:
+    """Return the in-flight limit shared by every transport of ``kind``."""
+    limits: dict[str, asyncio.Semaphore] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_TRANSPORT_LIMITS, {}
+    )
+    if (limit := limits.get(kind)) is None:
+        limit = limits[kind] = asyncio.Semaphore(concurrency)
+    return limit
+
+
+@callback
+def async_get_broadlink_pool(hass: HomeAssistant) -> BroadlinkPool:
+    """Return the shared Broadlink session pool, creating it on first use."""
+    # 只有直连博联设备时才需要 UDP 协议和加密模块，配置项设置时已由执行器导入
+    from .broadlink_udp import BroadlinkPool
+
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (pool := domain_data.get(DATA_BROADLINK_POOL)) is None:
+        pool = domain_data[DATA_BROADLINK_POOL] = BroadlinkPool()
+
+        @callback
+        def _async_close(event: Event) -> None:
+            pool.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close)
+    return pool
+
+
+def parse_mac(mac: str | None) -> bytes:
+    """Convert ``aa:bb:cc:dd:ee:ff`` style MAC addresses to bytes.
+
+    Raises ``ValueError`` unless the address is six hex bytes.
+    """
+    if not mac:
+        return bytes(6)
+    data = bytes.fromhex(mac.replace(":", "").replace("-", ""))
+    if len(data) != 6:
+        raise ValueError(f"MAC address must be 6 bytes, got {len(data)}")
+    return data
+
+
+def parse_host(host: str) -> tuple[str, int | None]:
+    """Split ``host[:port]`` into the host and the port, if one is given.
+
+    Raises ``ValueError`` for an empty host or a port outside 1-65535.
+    """
+    host, sep, port = host.strip().partition(":")
+    if not host:
+        raise ValueError("Missing host")
+    if not sep:
+        return host, None
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"Invalid port {port!r}")
+    return host, int(port)
+
+
+@callback
+def async_create_transport(
+    hass: HomeAssistant,
+    kind: str | None = None,
+    host: str | None = None,
+    mac: str | None = None,
+    device_type: str | None = None,
+    topic: str | None = None,
+) -> Transport:
+    """Return the transport for a transmitter.
+
+    MQTT needs a ``topic``. IR and RF go straight to the Broadlink device
+    at ``host``, or through the script service without one or with an
+    invalid address.
+    """
+    if kind == TRANSPORT_MQTT:
+        if not topic:
+            raise ValueError("MQTT transport needs a topic")
+        return MQTTTransport(hass, topic)
+    script = ScriptTransport(hass, RF_AIRTIME if kind == TRANSPORT_RF else DEFAULT_AIRTIME)
+    if not host:
+        return script
+    from .broadlink_udp import DEFAULT_DEVICE_TYPE, DEFAULT_PORT
+
+    try:
+        address, port = parse_host(host)
+        mac_bytes = parse_mac(mac)
+    except ValueError as err:
+        # 配置流程会拦下错误的地址；旧配置项仍可能带着，退回脚本服务而不是让发送报错
+        _LOGGER.error("Invalid Broadlink address %s (%s): %s", host, mac, err)
+        return script
+    session = async_get_broadlink_pool(hass).get(
+        address,
+        mac_bytes,
+        device_type or DEFAULT_DEVICE_TYPE,
+        port or DEFAULT_PORT,
+    )
+    if kind == TRANSPORT_RF:
+        return BroadlinkRFTransport(session, script)
+    return BroadlinkTransport(session, script)
@@ -0,0 +1,64 @@
+"""Websocket commands for the position table.
+
+``boardlink_curtain/positions`` returns the rows changed since a version
+(all rows for version 0). ``boardlink_curtain/positions/subscribe`` sends
+the same message as its first event and then one event with the changed
+rows after each batch of changes, so a dashboard can follow every curtain
+without fetching their state objects.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import ATTR_SINCE, DOMAIN
+from .position_table import async_get_position_table
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_positions)
+    websocket_api.async_register_command(hass, websocket_subscribe_positions)
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): f"{DOMAIN}/positions",
+    vol.Optional(ATTR_SINCE, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+})
+@callback
+def websocket_positions(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Return the curtain rows changed since a version."""
+    connection.send_result(msg["id"], async_get_position_table(hass).as_message(msg[ATTR_SINCE]))
+
+
+@websocket_api.websocket_command({
+    vol.Required("type"): f"{DOMAIN}/positions/subscribe",
+    vol.Optional(ATTR_SINCE, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+})
+@callback
+def websocket_subscribe_positions(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Stream the curtain rows as they change."""
+    table = async_get_position_table(hass)
+    since = msg[ATTR_SINCE]
+
+    @callback
+    def _async_forward() -> None:
+        nonlocal since
+        message = table.as_message(since)
+        if message["rows"] or message["snapshot"]:
+            # 每个订阅者记住自己收到的版本，只发送之后变化的行
+            since = message["version"]
+            connection.send_message(websocket_api.event_message(msg["id"], message))
+
+    connection.subscriptions[msg["id"]] = table.async_subscribe(_async_forward)
+    connection.send_result(msg["id"])
+    _async_forward()
@@ -0,0 +1,132 @@
+"""Local stand-in for a Broadlink blaster.
+
+It answers the authentication handshake and records every packet received
+through ``send_data``, so ``BroadlinkSession`` and the Broadlink transports
+can be exercised over a real UDP socket without hardware.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+
+from custom_components.boardlink_curtain.broadlink_udp import (
+    CMD_AUTH,
+    CMD_AUTH_RESPONSE,
+    CMD_COMMAND,
+    CMD_COMMAND_RESPONSE,
+    DEFAULT_KEY,
+    DEVICE_TYPES,
+    ERROR_AUTH,
+    RM_SEND_DATA,
+    BroadlinkError,
+    build_packet,
+    parse_packet,
+)
+
+
+class FakeBroadlinkDevice(asyncio.DatagramProtocol):
+    """A Broadlink device listening on a local UDP port.
+
+    ``reject_auth`` answers every authentication request with an error,
+    and the first ``drop`` command packets are ignored so the sender times
+    out.
+    """
+
+    def __init__(
+        self,
+        mac: bytes = bytes(6),
+        device_type: str = "RM4",
+        reject_auth: bool = False,
+        drop: int = 0,
+    ) -> None:
+        """Initialize the fake device."""
+        self.mac = mac
+        self.devtype, self.rm4 = DEVICE_TYPES[device_type]
+        self.reject_auth = reject_auth
+        self.drop = drop
+        self.key = os.urandom(16)
+        self.device_id = int.from_bytes(os.urandom(4), "little")
+        self.received: list[bytes] = []
+        self.auth_requests = 0
+        self._authed: set[tuple[str, int]] = set()
+        self._transport: asyncio.DatagramTransport | None = None
+
+    @classmethod
+    async def async_start(
+        cls, host: str = "127.0.0.1", port: int = 0, **kwargs: object
+    ) -> tuple[FakeBroadlinkDevice, int]:
+        """Start listening and return the device and the bound port."""
+        device = cls(**kwargs)  # type: ignore[arg-type]
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: device, local_addr=(host, port)
+        )
+        return device, transport.get_extra_info("sockname")[1]
+
+    def forget_sessions(self) -> None:
+        """Drop every session, as a power-cycled device does."""
+        self._authed.clear()
+        self.key = os.urandom(16)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Store the datagram transport."""
+        self._transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Answer authentication and command packets."""
+        authed = addr in self._authed
+        try:
+            command, count, _, payload = parse_packet(
+                self.key if authed else DEFAULT_KEY, data
+            )
+        except BroadlinkError:
+            return
+        if command == CMD_AUTH:
+            self.auth_requests += 1
+            if self.reject_auth:
+                self._reply(addr, DEFAULT_KEY, CMD_AUTH_RESPONSE, count, b"", error=ERROR_AUTH)
+                return
+            self._authed.add(addr)
+            reply = self.device_id.to_bytes(4, "little") + self.key
+            self._reply(addr, DEFAULT_KEY, CMD_AUTH_RESPONSE, count, reply)
+        elif command == CMD_COMMAND and authed:
+            if self.drop:
+                self.drop -= 1
+                return
+            self.received.append(self._unpack(payload))
+            self._reply(addr, self.key, CMD_COMMAND_RESPONSE, count, bytes(4))
+        else:
+            self._reply(addr, DEFAULT_KEY, command, count, b"", error=ERROR_AUTH)
+
+    def _unpack(self, payload: bytes) -> bytes:
+        """Return the packet carried by a ``send_data`` payload."""
+        if self.rm4:
+            # RM4：2 字节长度前缀 + 4 字节命令
+            length = int.from_bytes(payload[0:2], "little")
+            assert payload[2:6] == RM_SEND_DATA.to_bytes(4, "little")
+            return payload[6 : 2 + length]
+        assert payload[0:4] == RM_SEND_DATA.to_bytes(4, "little")
+        return payload[4:].rstrip(b"\x00")
+
+    def _reply(
+        self,
+        addr: tuple[str, int],
+        key: bytes,
+        command: int,
+        count: int,
+        payload: bytes,
+        error: int = 0,
+    ) -> None:
+        """Send a response packet."""
+        assert self._transport is not None
+        self._transport.sendto(
+            build_packet(
+                key, self.devtype, command, count, self.mac, self.device_id, payload, error
+            ),
+            addr,
+        )
+
+    def close(self) -> None:
+        """Stop listening."""
+        if self._transport is not None:
+            self._transport.close()
+        self._transport = None
@@ -0,0 +1,170 @@
+"""Tests of the Broadlink transports against a fake device over UDP."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import pytest
+
+from custom_components.boardlink_curtain.broadlink_udp import BroadlinkError, BroadlinkSession
+from custom_components.boardlink_curtain.code_store import IRCode, pulses_to_broadlink
+from custom_components.boardlink_curtain.transmitter import Transmitter
+from custom_components.boardlink_curtain.config_flow import _validate_codes
+from custom_components.boardlink_curtain.transport import (
+    BroadlinkRFTransport,
+    BroadlinkTransport,
+    ScriptTransport,
+    async_create_transport,
+    parse_host,
+    parse_mac,
+)
+from fake_broadlink import FakeBroadlinkDevice
+from fake_hass import FakeHass
+
+MAC = bytes.fromhex("0011223344ff")
+OPEN = IRCode("open", pulses_to_broadlink([9000, 4500, 560, 560, 560, 1690]))
+CLOSE = IRCode("close", pulses_to_broadlink([9000, 4500, 560, 1690, 560, 560]))
+
+
+def _run(
+    test: Callable[[FakeHass, FakeBroadlinkDevice, BroadlinkTransport], Awaitable[None]],
+    device_type: str = "RM4",
+    **device: object,
+) -> None:
+    """Run ``test`` with a transport talking to a fake device on localhost."""
+
+    async def _async_run() -> None:
+        hass = FakeHass()
+        fake, port = await FakeBroadlinkDevice.async_start(
+            mac=MAC, device_type=device_type, **device
+        )
+        session = BroadlinkSession("127.0.0.1", MAC, device_type, port, timeout=0.2)
+        try:
+            await test(hass, fake, BroadlinkTransport(session, ScriptTransport(hass)))
+        finally:
+            session.close()
+            fake.close()
+
+    asyncio.run(_async_run())
+
+
+@pytest.mark.parametrize("device_type", ["RM4", "RM2"])
+def test_send_data(device_type: str) -> None:
+    """Codes arrive in order and the session authenticates only once."""
+
+    async def _test(hass, device, transport) -> None:
+        await transport.async_send(OPEN)
+        await transport.async_send(CLOSE)
+        assert device.received == [OPEN.packet, CLOSE.packet]
+        assert device.auth_requests == 1
+        assert transport.health.sent == 2
+        assert transport.health.failed == 0
+
+    _run(_test, device_type)
+
+
+def test_code_without_packet_uses_script() -> None:
+    """Code names the device cannot decode go to the script service."""
+
+    async def _test(hass, device, transport) -> None:
+        await transport.async_send(IRCode("open_living_room", None))
+        assert device.received == []
+        assert [code for _, code in hass.blaster.sent] == ["open_living_room"]
+
+    _run(_test)
+
+
+def test_auth_failure() -> None:
+    """A device refusing the handshake fails the send and nothing is sent."""
+
+    async def _test(hass, device, transport) -> None:
+        with pytest.raises(BroadlinkError):
+            await transport.async_send(OPEN)
+        assert device.received == []
+        assert transport.health.failed == 1
+        assert "-7" in transport.health.last_error
+
+    _run(_test, reject_auth=True)
+
+
+def test_authenticates_again_after_device_restart() -> None:
+    """A command rejected for a lost session is sent again after a new handshake."""
+
+    async def _test(hass, device, transport) -> None:
+        await transport.async_send(OPEN)
+        device.forget_sessions()
+        await transport.async_send(CLOSE)
+        assert device.received == [OPEN.packet, CLOSE.packet]
+        assert device.auth_requests == 2
+        assert transport.health.failed == 0
+
+    _run(_test)
+
+
+def test_timeout_is_retried_by_transmitter() -> None:
+    """A command the device never answers times out and is sent again."""
+
+    async def _test(hass, device, transport) -> None:
+        transmitter = Transmitter(hass, "test", transport)
+        await transmitter.async_send(OPEN)
+        assert device.received == [OPEN.packet]
+        assert transmitter.retried == 1
+        assert transport.health.failed == 1
+        assert transport.health.sent == 1
+        assert transport.health.consecutive_failures == 0
+
+    _run(_test, drop=1)
+
+
+def test_rf_transport_refuses_ir_packet() -> None:
+    """The RF transport does not send learned IR packets."""
+
+    async def _test(hass, device, transport) -> None:
+        rf = BroadlinkRFTransport(transport.session, transport.fallback)
+        with pytest.raises(ValueError):
+            await rf.async_send(OPEN)
+        rf_code = IRCode("rf_open", bytes([0xB2, 0x00, 0x02, 0x00, 0x10, 0x20]))
+        await rf.async_send(rf_code)
+        assert device.received == [rf_code.packet]
+
+    _run(_test)
+
+
+def test_parse_address() -> None:
+    """MACs must be six hex bytes and ports within 1-65535."""
+    assert parse_mac("00:11:22:33:44:FF") == MAC
+    assert parse_mac("00-11-22-33-44-ff") == MAC
+    assert parse_mac("") == bytes(6)
+    assert parse_host("192.168.1.20") == ("192.168.1.20", None)
+    assert parse_host("192.168.1.20:8080") == ("192.168.1.20", 8080)
+    for mac in ("00:11:22:33:44", "00:11:22:33:44:ff:00", "zz:11:22:33:44:ff"):
+        with pytest.raises(ValueError):
+            parse_mac(mac)
+    for host in ("192.168.1.20:", "192.168.1.20:0", "192.168.1.20:70000", "192.168.1.20:x", ":80"):
+        with pytest.raises(ValueError):
+            parse_host(host)
+
+
+def test_invalid_address_falls_back_to_script() -> None:
+    """A stored address the device layer cannot use sends through the script service."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        transport = async_create_transport(hass, host="192.168.1.20:port", mac="00:11")
+        assert isinstance(transport, ScriptTransport)
+
+    asyncio.run(_test())
+
+
+def test_flow_reports_invalid_address() -> None:
+    """The config and options forms flag a bad MAC or port on their own fields."""
+    curtain = {
+        "open_code": "open",
+        "close_code": "close",
+        "pause_code": "stop",
+        "broadlink_host": "192.168.1.20:99999",
+        "broadlink_mac": "00:11:22",
+    }
+    assert set(_validate_codes(curtain)) == {"broadlink_host", "broadlink_mac"}
+    curtain.update(broadlink_host="192.168.1.20:80", broadlink_mac="00:11:22:33:44:ff")
+    assert _validate_codes(curtain) == {}
@@ -0,0 +1,98 @@
+"""Tests of choreography schedule compilation."""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.boardlink_curtain.choreography import (
+    CUE_START,
+    CUE_STOP,
+    PlannedMove,
+    compile_schedule,
+)
+
+AIRTIME = 0.1
+
+
+class Curtain:
+    """Curtain stand-in planning moves at a fixed speed."""
+
+    def __init__(self, unique_id: str, position: int, rate: float = 0.1, transmitter: str = "ir") -> None:
+        """Initialize the stand-in; ``rate`` is seconds per percent."""
+        self.unique_id = unique_id
+        self.current_cover_position = position
+        self.rate = rate
+        self.transmitter = transmitter
+
+    def async_plan_move(self, start: int, target: int) -> PlannedMove | None:
+        """Plan a move like the cover entity does."""
+        if start == target:
+            return None
+        run_time = abs(target - start) * self.rate
+        return PlannedMove(
+            self.transmitter,
+            "open" if target > start else "close",
+            "stop",
+            AIRTIME,
+            run_time,
+            None if target in (0, 100) else run_time,
+        )
+
+
+def _cues(schedule, kind: str) -> dict[str, float]:
+    """Return the time of each curtain's cue of ``kind``."""
+    return {cue.curtain.unique_id: cue.time for cue in schedule.cues if cue.kind == kind}
+
+
+def test_shared_codes_are_merged() -> None:
+    """Curtains sending the same code at the same time share one transmission."""
+    curtains = [Curtain(name, 0) for name in "abc"]
+    schedule = compile_schedule([(curtain, 100, 1.0) for curtain in curtains])
+    assert _cues(schedule, CUE_START) == {"a": 1.0, "b": 1.0, "c": 1.0}
+    assert schedule.merged == 2
+    assert schedule.airtime == pytest.approx(AIRTIME)
+    assert schedule.delayed == 0
+
+
+def test_shared_stops_are_merged() -> None:
+    """Identical stops due at the same time go out once."""
+    schedule = compile_schedule([(Curtain(name, 0), 50, 0.0) for name in "ab"])
+    assert _cues(schedule, CUE_STOP) == {"a": 5.0, "b": 5.0}
+    assert schedule.merged == 2
+    assert len(schedule.cues) == 4
+
+
+def test_codes_do_not_overlap() -> None:
+    """Different codes on one transmitter are spaced by the airtime; other transmitters are not."""
+    schedule = compile_schedule([
+        (Curtain("a", 0), 100, 0.0),
+        (Curtain("b", 100), 0, 0.0),
+        (Curtain("c", 100, transmitter="rf"), 0, 0.0),
+    ])
+    assert _cues(schedule, CUE_START) == pytest.approx({"a": 0.0, "b": AIRTIME, "c": 0.0})
+    assert schedule.delayed == pytest.approx(AIRTIME)
+
+
+def test_move_is_pushed_back_to_keep_stop_time() -> None:
+    """A move whose stop slot is taken starts later instead of stopping late."""
+    a = Curtain("a", 0)
+    b = Curtain("b", 100, rate=0.099)
+    schedule = compile_schedule([(a, 50, 0.0), (b, 50, 0.05)])
+    starts, stops = _cues(schedule, CUE_START), _cues(schedule, CUE_STOP)
+    assert starts == pytest.approx({"a": 0.0, "b": 0.15})
+    assert stops == pytest.approx({"a": 5.0, "b": 5.1})
+    # 顺延后停止码距方向码的时间仍与运动模型一致
+    assert stops["b"] - starts["b"] == pytest.approx(50 * 0.099)
+    assert schedule.delayed == pytest.approx(0.1)
+
+
+def test_steps_of_one_curtain_are_chained() -> None:
+    """A later step starts from the earlier target; a step to the same position is skipped."""
+    curtain = Curtain("a", 0)
+    schedule = compile_schedule([(curtain, 50, 10.0), (curtain, 100, 0.0), (curtain, 50, 20.0)])
+    assert [(cue.kind, cue.time, cue.target) for cue in schedule.cues] == [
+        (CUE_START, 0.0, 100),
+        (CUE_START, 10.0, 50),
+        (CUE_STOP, 15.0, None),
+    ]
+    assert (schedule.moves, schedule.skipped) == (2, 1)
+    assert schedule.duration == 15.0
@@ -0,0 +1,123 @@
+"""Tests of command coalescing and the movement lock."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.boardlink_curtain.coalescer import CommandCoalescer
+from fake_hass import FakeHass
+
+
+class Recorder:
+    """Action recording targets and overlapping runs."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        """Initialize the recorder."""
+        self.delay = delay
+        self.log: list[object] = []
+        self.running = 0
+        self.overlapped = False
+
+    async def __call__(self, target: object) -> None:
+        """Run one movement."""
+        self.running += 1
+        self.overlapped |= self.running > 1
+        try:
+            await asyncio.sleep(self.delay)
+            self.log.append(target)
+        finally:
+            self.running -= 1
+
+
+def test_burst_keeps_last_target() -> None:
+    """Targets submitted within the window collapse into the last one."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        action = Recorder()
+        coalescer = CommandCoalescer(hass, 0.05, action)
+        for target in (10, 20, 30):
+            await coalescer.async_submit(target)
+        assert coalescer.pending == 30
+        await asyncio.sleep(0.1)
+        await hass.async_block_till_done()
+        assert action.log == [30]
+        assert (coalescer.submitted, coalescer.executed) == (3, 1)
+        assert coalescer.pending is None
+
+    asyncio.run(_test())
+
+
+def test_zero_window_executes_right_away() -> None:
+    """Without a window every target is executed in order."""
+
+    async def _test() -> None:
+        action = Recorder()
+        coalescer = CommandCoalescer(FakeHass(), 0, action)
+        await coalescer.async_submit(10)
+        await coalescer.async_submit(20)
+        assert action.log == [10, 20]
+
+    asyncio.run(_test())
+
+
+def test_run_drops_pending_target() -> None:
+    """Another movement cancels the pending target and runs under the lock."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        action = Recorder()
+        coalescer = CommandCoalescer(hass, 0.05, action)
+        await coalescer.async_submit(10)
+
+        async def _open() -> str:
+            action.log.append("open")
+            return "done"
+
+        assert await coalescer.async_run(_open) == "done"
+        await asyncio.sleep(0.1)
+        await hass.async_block_till_done()
+        assert action.log == ["open"]
+        assert coalescer.executed == 1
+
+    asyncio.run(_test())
+
+
+def test_run_locked_keeps_pending_target() -> None:
+    """A planned stop waits for the lock and leaves the pending target alone."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        action = Recorder(delay=0.05)
+        coalescer = CommandCoalescer(hass, 0.2, action)
+
+        async def _stop() -> None:
+            action.log.append("stop")
+
+        moving = hass.async_create_task(coalescer.async_execute(10))
+        await asyncio.sleep(0)
+        await coalescer.async_submit(20)
+        await coalescer.async_run_locked(_stop)
+        assert coalescer.pending == 20
+        await moving
+        await asyncio.sleep(0.3)
+        await hass.async_block_till_done()
+        assert action.log == [10, "stop", 20]
+
+    asyncio.run(_test())
+
+
+def test_movements_never_overlap() -> None:
+    """Executed targets and other movements run one at a time, in arrival order."""
+
+    async def _test() -> None:
+        action = Recorder(delay=0.02)
+        coalescer = CommandCoalescer(FakeHass(), 0.05, action)
+        await asyncio.gather(
+            coalescer.async_execute(10),
+            coalescer.async_run(lambda: action("open")),
+            coalescer.async_execute(30),
+        )
+        assert action.log == [10, "open", 30]
+        assert not action.overlapped
+
+    asyncio.run(_test())
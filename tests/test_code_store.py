@@ -0,0 +1,49 @@
+"""Tests of code parsing."""
+from __future__ import annotations
+
+import base64
+
+import pytest
+
+from custom_components.boardlink_curtain.code_store import (
+    decode_code,
+    pronto_to_broadlink,
+    pulses_to_broadlink,
+)
+
+PACKET = pulses_to_broadlink([9000, 4500, 560, 560, 560, 1690, 560, 560])
+PRONTO = "0000 006D 0002 0000 0156 00AB 0015 0040"
+
+
+@pytest.mark.parametrize(
+    "name", ["open", "close", "stop", "shut", "stay", "1wow", "send_stop", "JgBQ", "sAAAAAAA"]
+)
+def test_code_names_stay_names(name: str) -> None:
+    """Names are kept for the script service, even when they are valid base64."""
+    assert decode_code(name) == (name, None)
+
+
+def test_base64_packet() -> None:
+    """A base64 Broadlink packet is decoded, padding included."""
+    padded = PACKET + bytes(-len(PACKET) % 16)
+    code = base64.b64encode(padded).decode()
+    assert decode_code(code) == (code, padded)
+
+
+def test_pronto_code() -> None:
+    """A raw Pronto code is converted to a Broadlink packet."""
+    assert decode_code(PRONTO).packet == pronto_to_broadlink(PRONTO)
+
+
+def test_truncated_packet() -> None:
+    """A long packet cut short is reported instead of sent as a name."""
+    cut = PACKET[:2] + (len(PACKET) + 40).to_bytes(2, "little") + PACKET[4:]
+    with pytest.raises(ValueError):
+        decode_code(base64.b64encode(cut).decode())
+
+
+@pytest.mark.parametrize("code", ["", "   ", "0000 006D 0002 0000 0156"])
+def test_invalid_codes(code: str) -> None:
+    """Empty codes and Pronto codes with a wrong burst count are rejected."""
+    with pytest.raises(ValueError):
+        decode_code(code)
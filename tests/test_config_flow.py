@@ -0,0 +1,38 @@
+"""Tests of the config and options flow helpers."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from custom_components.boardlink_curtain.config_flow import _clear_open_time, _options_schema
+
+CURTAIN = {
+    "name": "test",
+    "open_code": "open",
+    "close_code": "close",
+    "pause_code": "stop",
+    "close_time": 20,
+}
+
+
+def test_open_time_is_only_saved_when_set() -> None:
+    """An empty opening time is left out, so it keeps following the closing time."""
+    schema = vol.Schema(_options_schema(CURTAIN))
+    options = schema({key: value for key, value in CURTAIN.items() if key != "name"})
+    assert "open_time" not in options
+    assert schema({**options, "open_time": 25})["open_time"] == 25
+
+
+def test_open_time_is_suggested() -> None:
+    """The current opening time is offered as a suggestion, not as a default."""
+    [key] = [key for key in _options_schema({**CURTAIN, "open_time": 25}) if key == "open_time"]
+    assert key.description == {"suggested_value": 25}
+    assert key.default is vol.UNDEFINED
+
+
+def test_emptied_open_time_overrides_data() -> None:
+    """Clearing an opening time stored in the entry data replaces it with ``None``."""
+    assert _clear_open_time({"close_time": 20}, {**CURTAIN, "open_time": 25}) == {
+        "close_time": 20,
+        "open_time": None,
+    }
+    assert _clear_open_time({"close_time": 20}, CURTAIN) == {"close_time": 20}
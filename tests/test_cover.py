@@ -0,0 +1,59 @@
+"""Tests of the order of curtain commands."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from fake_hass import FakeHass, async_create_curtains
+
+CONFIG = {
+    "name": "test",
+    "open_code": "open",
+    "close_code": "close",
+    "pause_code": "stop",
+    "close_time": 1,
+    "coalesce_window": 0,
+}
+
+
+async def _async_curtain(hass: FakeHass, position: int) -> Any:
+    """Return a curtain resting at ``position``."""
+    [curtain] = await async_create_curtains(hass, [dict(CONFIG)])
+    curtain._attr_current_cover_position = position
+    return curtain
+
+
+def test_move_waits_for_open() -> None:
+    """A move received while the open code is being sent starts from the opened curtain."""
+
+    async def _test() -> None:
+        hass = FakeHass(ir_delay=0.2)
+        curtain = await _async_curtain(hass, 0)
+        opening = hass.async_create_task(curtain.async_open_cover())
+        await asyncio.sleep(0.05)
+        await curtain.async_move_now(50)
+        await opening
+        await asyncio.sleep(1.5)
+        assert [code for _, code in hass.blaster.sent] == ["open", "close", "stop"]
+        assert abs(curtain._attr_current_cover_position - 50) <= 5
+        assert not curtain._is_moving
+
+    asyncio.run(_test())
+
+
+def test_stop_waits_for_running_move() -> None:
+    """A stop received while a move is being sent goes out after that move's code."""
+
+    async def _test() -> None:
+        hass = FakeHass(ir_delay=0.2)
+        curtain = await _async_curtain(hass, 0)
+        move = hass.async_create_task(curtain.async_move_now(80))
+        await asyncio.sleep(0.05)
+        await curtain.async_stop_cover()
+        await move
+        assert [code for _, code in hass.blaster.sent] == ["open", "stop"]
+        assert curtain._stop_timer is None
+        assert not curtain._is_moving
+        assert 0 < curtain._attr_current_cover_position < 80
+
+    asyncio.run(_test())
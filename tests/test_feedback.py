@@ -0,0 +1,125 @@
+"""Tests of position corrections from end stop contacts and motor current."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.core import Event, State
+
+from custom_components.boardlink_curtain.feedback import PositionFeedback
+from fake_hass import FakeHass, async_create_curtains
+
+CONFIG = {
+    "name": "test",
+    "open_code": "open",
+    "close_code": "close",
+    "pause_code": "stop",
+    "close_time": 2,
+    "coalesce_window": 0,
+}
+
+
+class Curtain:
+    """Entity stand-in recording the corrections it is asked for."""
+
+    name = "test"
+
+    def __init__(self) -> None:
+        """Initialize the stand-in."""
+        self.calls: list[tuple[Any, ...]] = []
+
+    def async_end_stop(self, opened: bool, source: str) -> None:
+        """Record an end stop."""
+        self.calls.append(("end_stop", opened, source))
+
+    def async_motor_idle(self) -> None:
+        """Record the motor going idle."""
+        self.calls.append(("idle",))
+
+
+def _change(feedback: PositionFeedback, entity_id: str, old: str | None, new: str) -> None:
+    """Deliver a state change of ``entity_id`` to ``feedback``."""
+    feedback._async_state_changed(
+        Event(
+            "state_changed",
+            {
+                "entity_id": entity_id,
+                "old_state": None if old is None else State(entity_id, old),
+                "new_state": State(entity_id, new),
+            },
+        )
+    )
+
+
+def test_state_changes_are_dispatched() -> None:
+    """Contacts report when they close; the current sensor when it drops to idle."""
+    curtain = Curtain()
+    feedback = PositionFeedback(None, curtain)  # type: ignore[arg-type]
+    feedback._sensors = {
+        "binary_sensor.open": "open_sensor",
+        "binary_sensor.closed": "closed_sensor",
+        "sensor.current": "current_sensor",
+    }
+    feedback._threshold = 0.1
+    _change(feedback, "binary_sensor.open", "off", "on")
+    _change(feedback, "binary_sensor.open", "on", "on")
+    _change(feedback, "binary_sensor.closed", None, "on")
+    _change(feedback, "binary_sensor.closed", "on", "off")
+    _change(feedback, "sensor.current", "1.2", "0.05")
+    _change(feedback, "sensor.current", "0.05", "0.02")
+    _change(feedback, "sensor.current", "unavailable", "0.02")
+    _change(feedback, "sensor.other", "off", "on")
+    assert curtain.calls == [
+        ("end_stop", True, "open_sensor"),
+        ("end_stop", False, "closed_sensor"),
+        ("idle",),
+    ]
+
+
+def _run(test: Any) -> None:
+    """Run ``test`` with a curtain on a fake hass."""
+
+    async def _async_run() -> None:
+        hass = FakeHass()
+        [curtain] = await async_create_curtains(hass, [dict(CONFIG)])
+        await test(hass, curtain)
+
+    asyncio.run(_async_run())
+
+
+def test_motor_idle_freezes_intermediate_move() -> None:
+    """A motor stopping short keeps the position reached and sends no stop code."""
+
+    async def _test(hass, curtain) -> None:
+        curtain._attr_current_cover_position = 0
+        await curtain.async_move_now(80)
+        await asyncio.sleep(0.4)
+        curtain.async_motor_idle()
+        assert 10 <= curtain._attr_current_cover_position <= 30
+        assert not curtain._is_moving
+        assert curtain._stop_timer is None
+        assert curtain._metrics.corrections["current"] == 1
+        await asyncio.sleep(1.5)
+        assert [code for _, code in hass.blaster.sent] == ["open"]
+
+    _run(_test)
+
+
+def test_end_stop_snaps_position() -> None:
+    """A contact at the end being approached ends the move; the one being left is ignored."""
+
+    async def _test(hass, curtain) -> None:
+        curtain._attr_current_cover_position = 100
+        await curtain.async_move_now(10)
+        await asyncio.sleep(0.2)
+        # 刚离开全开位置时开启触点还没断开
+        curtain.async_end_stop(True, "open_sensor")
+        assert curtain._is_moving
+        curtain.async_end_stop(False, "closed_sensor")
+        assert curtain._attr_current_cover_position == 0
+        assert curtain._attr_is_closed
+        assert not curtain._is_moving
+        assert curtain._stop_timer is None
+        assert dict(curtain._metrics.corrections) == {"closed_sensor": 1}
+
+    _run(_test)
@@ -0,0 +1,38 @@
+"""Tests of the integration metrics."""
+from __future__ import annotations
+
+import base64
+
+from custom_components.boardlink_curtain.code_store import pulses_to_broadlink
+from custom_components.boardlink_curtain.metrics import (
+    MAX_CODE_KEYS,
+    OTHER_CODES,
+    Metrics,
+    code_key,
+)
+
+PACKET = base64.b64encode(pulses_to_broadlink([9000, 4500, 560, 560, 560, 1690] * 20)).decode()
+PRONTO = "0000 006D 0002 0000 0156 00AB 0015 0040"
+
+
+def test_code_keys_are_short() -> None:
+    """Code names are kept; packets and Pronto codes get a short stable hash."""
+    assert code_key("send_open") == "send_open"
+    assert code_key(PACKET) == code_key(PACKET)
+    assert code_key(PACKET).startswith("#")
+    assert len(code_key(PACKET)) == 9
+    assert code_key(PRONTO) != code_key(PACKET)
+    assert len(code_key(PRONTO)) == 9
+
+
+def test_code_histograms_are_bounded() -> None:
+    """Codes beyond the limit share one histogram; known codes keep theirs."""
+    metrics = Metrics()
+    for index in range(MAX_CODE_KEYS + 10):
+        metrics.record_send("ir", f"{PACKET}{index}", 0.1)
+    metrics.record_send("ir", f"{PACKET}0", 0.1)
+    codes = metrics.as_dict()["codes"]
+    assert len(codes) == MAX_CODE_KEYS + 1
+    assert codes[OTHER_CODES]["count"] == 10
+    assert codes[code_key(f"{PACKET}0")]["count"] == 2
+    assert metrics.as_dict()["transmitters"]["ir"]["count"] == MAX_CODE_KEYS + 11
@@ -0,0 +1,180 @@
+"""Tests of the shared motion engine timers."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.boardlink_curtain.motion import TICK_SLACK, MotionEngine
+from fake_hass import FakeHass
+
+
+class Timer:
+    """Timer handle recorded by ``Loop``."""
+
+    def __init__(self, when: float) -> None:
+        """Initialize the handle."""
+        self.when = when
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel the timer."""
+        self.cancelled = True
+
+
+class Loop:
+    """Event loop stand-in with a clock moved by the test."""
+
+    def __init__(self) -> None:
+        """Initialize the loop."""
+        self.now = 0.0
+        self.timers: list[Timer] = []
+
+    def time(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def call_at(self, when: float, callback: object, *args: object) -> Timer:
+        """Record a timer; the test fires it by calling the engine."""
+        self.timers.append(Timer(when))
+        return self.timers[-1]
+
+
+class Curtain:
+    """Entity stand-in recording the positions written by the engine."""
+
+    def __init__(self, unique_id: str) -> None:
+        """Initialize the stand-in."""
+        self.unique_id = unique_id
+        self.writes: list[tuple[int, bool]] = []
+
+    def async_apply_motion(self, position: int, finished: bool) -> None:
+        """Record a position written by the engine."""
+        self.writes.append((position, finished))
+
+
+def test_every_step_is_written_once() -> None:
+    """A move writes each whole percent at most once, with one wake-up per step."""
+
+    async def _test() -> None:
+        engine = MotionEngine(FakeHass())
+        curtain = Curtain("a")
+        engine.async_start(curtain, 0, 50, 0.5, max_update_rate=1000)
+        await asyncio.sleep(0.6)
+        positions = [position for position, _ in curtain.writes]
+        # 定时器抖动时可能合并相邻两步，但位置只增不重复
+        assert positions == sorted(set(positions))
+        assert len(positions) >= 40
+        assert curtain.writes[-1] == (50, True)
+        # 提前唤醒的定时器也要推进位置，不能原地重排
+        assert engine.ticks <= 51
+        assert engine.active_count == 0
+        assert engine.finished == 1
+
+    asyncio.run(_test())
+
+
+def test_update_rate_limits_writes() -> None:
+    """The update rate caps intermediate writes; the end position is always written."""
+
+    async def _test() -> None:
+        engine = MotionEngine(FakeHass())
+        curtain = Curtain("a")
+        engine.async_start(curtain, 100, 0, 0.5, max_update_rate=10)
+        await asyncio.sleep(0.6)
+        assert len(curtain.writes) <= 7
+        assert curtain.writes[-1] == (0, True)
+        positions = [position for position, _ in curtain.writes]
+        assert positions == sorted(positions, reverse=True)
+
+    asyncio.run(_test())
+
+
+def test_fast_moves_write_once_per_tick() -> None:
+    """Steps shorter than a tick are written once, at the latest position."""
+
+    async def _test() -> None:
+        engine = MotionEngine(FakeHass())
+        curtain = Curtain("a")
+        engine.async_start(curtain, 0, 100, 0.1, max_update_rate=1000)
+        await asyncio.sleep(0.2)
+        positions = [position for position, _ in curtain.writes]
+        assert len(positions) == len(set(positions))
+        assert positions[-1] == 100
+
+    asyncio.run(_test())
+
+
+def test_curtains_share_ticks() -> None:
+    """Curtains moving in step are written in the same wake-ups."""
+
+    async def _test() -> None:
+        engine = MotionEngine(FakeHass())
+        curtains = [Curtain(str(index)) for index in range(20)]
+        start = engine.hass.loop.time()
+        for curtain in curtains:
+            engine.async_start(curtain, 0, 10, 0.2, max_update_rate=1000, start_time=start)
+        await asyncio.sleep(0.3)
+        assert all(len(curtain.writes) == 10 for curtain in curtains)
+        assert engine.ticks <= 11
+
+    asyncio.run(_test())
+
+
+def test_cancel_and_resume() -> None:
+    """A cancelled move stops writing; a move started in the past resumes mid-way."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        engine = MotionEngine(hass)
+        curtain = Curtain("a")
+        engine.async_start(curtain, 0, 100, 1.0, max_update_rate=1000)
+        await asyncio.sleep(0.2)
+        position = engine.async_cancel(curtain)
+        assert 10 <= position <= 30
+        writes = len(curtain.writes)
+        await asyncio.sleep(0.1)
+        assert len(curtain.writes) == writes
+        assert engine.cancelled == 1
+
+        engine.async_start(curtain, 0, 100, 1.0, start_time=hass.loop.time() - 0.5)
+        assert 45 <= engine.position(curtain) <= 55
+
+    asyncio.run(_test())
+
+
+def test_step_offsets() -> None:
+    """Moves with step offsets reach each percent at its own time."""
+
+    async def _test() -> None:
+        hass = FakeHass()
+        engine = MotionEngine(hass)
+        curtain = Curtain("a")
+        start = hass.loop.time()
+        engine.async_start(curtain, 0, 4, 1.0, max_update_rate=1000, offsets=[0.05, 0.1, 0.5, 1.0])
+        assert engine.position(curtain) == 0
+        await asyncio.sleep(0.2)
+        assert engine.position(curtain) == 2
+        await asyncio.sleep(0.9)
+        assert [position for position, _ in curtain.writes] == [1, 2, 3, 4]
+        assert hass.loop.time() - start >= 1.0
+
+    asyncio.run(_test())
+
+
+def test_first_step_is_not_rate_limited() -> None:
+    """The first step is due when reached, not one update interval after the start."""
+    loop = Loop()
+    engine = MotionEngine(FakeHass(loop))  # type: ignore[arg-type]
+    engine.async_start(Curtain("a"), 0, 10, 1.0, max_update_rate=1)
+    assert loop.timers[-1].when == 0.1
+
+
+def test_early_wake_up_makes_progress() -> None:
+    """A wake-up within the tick slack writes the due step and moves on to the next one."""
+    loop = Loop()
+    engine = MotionEngine(FakeHass(loop))  # type: ignore[arg-type]
+    curtain = Curtain("a")
+    engine.async_start(curtain, 0, 10, 1.0, max_update_rate=1000)
+    loop.now = 0.1 - TICK_SLACK / 2
+    engine._tick()
+    assert curtain.writes == [(1, False)]
+    assert loop.timers[-1].when == 0.2
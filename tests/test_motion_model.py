@@ -0,0 +1,105 @@
+"""Tests of the motion model and its calibration."""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.boardlink_curtain.config_flow import calibrate_motion
+from custom_components.boardlink_curtain.motion_model import (
+    MotionModel,
+    format_profile,
+    parse_profile,
+)
+
+PROFILE = "50:70"
+LEGS = (25, 50, 75)
+
+
+def test_parse_profile() -> None:
+    """End points are added, and columns must strictly increase."""
+    assert parse_profile("50:70") == [[0, 0], [50, 70], [100, 100]]
+    assert parse_profile([[0, 0], [40, 30], [100, 100]]) == [[0, 0], [40, 30], [100, 100]]
+    assert parse_profile("") is None
+    assert format_profile(parse_profile("20:10; 60:50")) == "0:0, 20:10, 60:50, 100:100"
+    for value in ("50:70, 40:80", "50:120", "50"):
+        with pytest.raises(ValueError):
+            parse_profile(value)
+
+
+def test_profile_lookup() -> None:
+    """Shares follow the profile and the inverse lookup undoes them."""
+    model = MotionModel(20, 10, profile=parse_profile(PROFILE))
+    assert model.share(50) == pytest.approx(0.7)
+    assert model.share(25) == pytest.approx(0.35)
+    assert model.share(75) == pytest.approx(0.85)
+    for position in (0, 12.5, 50, 83.3, 100):
+        assert model.position_at_share(model.share(position)) == pytest.approx(position)
+    # 每个方向按各自的全程时间计算
+    assert model.run_time(0, 50) == pytest.approx(14)
+    assert model.run_time(50, 0) == pytest.approx(7)
+
+
+def test_latencies() -> None:
+    """The start latency delays the move; the stop latency adds overrun."""
+    model = MotionModel(10, 10, start_latency=1, stop_latency=0.5)
+    assert model.run_time(0, 50) == pytest.approx(6)
+    assert model.position_after(20, 1, 0.5) == 20
+    assert model.position_after(20, 1, 3) == pytest.approx(40)
+    assert model.stopped_position(20, 1, 3) == pytest.approx(45)
+    assert model.position_after(20, -1, 10) == 0
+
+
+def test_step_offsets() -> None:
+    """Step offsets are given for non-linear models only and end at the run time."""
+    assert MotionModel(10, 10).step_offsets(0, 50) is None
+    model = MotionModel(20, 10, 0.5, profile=parse_profile(PROFILE))
+    offsets = model.step_offsets(60, 40)
+    assert len(offsets) == 20
+    assert offsets == sorted(offsets)
+    assert offsets[-1] == pytest.approx(model.run_time(60, 40))
+
+
+def test_open_time_follows_close_time() -> None:
+    """An unset opening time takes the closing time."""
+    assert MotionModel.from_config({"close_time": 25}).open_time == 25
+    assert MotionModel.from_config({"close_time": 25, "open_time": None}).open_time == 25
+    assert MotionModel.from_config({"close_time": 25, "open_time": 30}).open_time == 30
+
+
+def _measure(model: MotionModel) -> tuple[float, float, list[tuple[float, int]], float]:
+    """Return what the calibration flow would time on a curtain following ``model``."""
+    open_total = model.start_latency + model.open_time
+    close_total = model.start_latency + model.close_time
+    legs = []
+    start = 0
+    for position in LEGS:
+        # 停止码提前发出，电机滑行到目标位置
+        legs.append((model.run_time(start, position) - model.stop_latency, position))
+        start = position
+    return open_total, close_total, legs, model.run_time(start, 100)
+
+
+def test_calibration_recovers_model() -> None:
+    """Calibration measurements give back the latencies, times and profile."""
+    model = MotionModel(20, 18, start_latency=0.5, profile=parse_profile(PROFILE))
+    result = calibrate_motion(*_measure(model))
+    assert result["open_time"] == pytest.approx(20)
+    assert result["close_time"] == pytest.approx(18)
+    assert result["start_latency"] == pytest.approx(0.5)
+    assert result["stop_latency"] == 0
+    calibrated = MotionModel.from_config(result)
+    for position in LEGS:
+        assert calibrated.share(position) == pytest.approx(model.share(position), abs=0.002)
+
+
+def test_calibration_stop_latency_and_linear_motor() -> None:
+    """An overrunning motor gets a stop latency, and a linear one no profile."""
+    result = calibrate_motion(*_measure(MotionModel(20, 20, stop_latency=0.4)))
+    assert result["start_latency"] == 0
+    assert result["stop_latency"] == pytest.approx(0.4)
+    assert result["open_time"] == pytest.approx(20)
+    assert result["travel_profile"] == ""
+
+
+def test_calibration_rejects_inconsistent_timing() -> None:
+    """Measurements that leave less than a second of travel are refused."""
+    assert calibrate_motion(2, 2, [(3, 25), (3, 50), (3, 75)], 3) is None
@@ -0,0 +1,150 @@
+"""Tests of MQTT publish order, in-flight limits and transport health."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable
+
+import pytest
+
+from custom_components.boardlink_curtain import transmitter as transmitter_module
+from custom_components.boardlink_curtain.code_store import IRCode
+from custom_components.boardlink_curtain.transmitter import (
+    MAX_IN_FLIGHT,
+    MAX_TRANSMITTER_IN_FLIGHT,
+    Transmitter,
+)
+from custom_components.boardlink_curtain.transport import (
+    DOWN_FAILURES,
+    UNHEALTHY_FAILURES,
+    MQTTTransport,
+)
+from fake_hass import FakeHass, FakeMQTTBroker
+
+
+class CountingBroker(FakeMQTTBroker):
+    """Broker stand-in that tracks how many publishes overlap."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, delay: float) -> None:
+        """Initialize the broker."""
+        super().__init__(loop, delay)
+        self.in_flight: Counter[str] = Counter()
+        self.peak = 0
+        self.peak_by_topic: Counter[str] = Counter()
+        # 个别消息的额外延迟，模拟不保证顺序的服务调用
+        self.extra_delay: dict[str, float] = {}
+
+    async def async_publish(self, topic: str, payload: str) -> None:
+        """Publish a message and record the overlap."""
+        self.in_flight[topic] += 1
+        self.peak = max(self.peak, sum(self.in_flight.values()))
+        self.peak_by_topic[topic] = max(self.peak_by_topic[topic], self.in_flight[topic])
+        try:
+            if delay := self.extra_delay.get(payload):
+                await asyncio.sleep(delay)
+            await super().async_publish(topic, payload)
+        finally:
+            self.in_flight[topic] -= 1
+
+
+def _run(test: Callable[[FakeHass], Awaitable[None]], delay: float = 0.0) -> None:
+    """Run ``test`` with a broker stand-in behind ``mqtt.publish``."""
+
+    async def _async_run() -> None:
+        hass = FakeHass()
+        hass.broker = hass.services.broker = CountingBroker(hass.loop, delay)
+        await test(hass)
+
+    asyncio.run(_async_run())
+
+
+def _transmitter(hass: FakeHass, topic: str) -> Transmitter:
+    """Return a transmitter publishing to ``topic``."""
+    return Transmitter(hass, f"mqtt:{topic}", MQTTTransport(hass, topic))
+
+
+def test_codes_are_published_in_order() -> None:
+    """Codes of one topic are published one after the other, in queue order."""
+
+    async def _test(hass) -> None:
+        transmitter = _transmitter(hass, "curtain/set")
+        # 开启码较慢也不能让停止码先到
+        hass.broker.extra_delay["open"] = 0.05
+        codes = [IRCode("open", None), IRCode("stop", None)] + [
+            IRCode(f"code_{index}", None) for index in range(18)
+        ]
+        await asyncio.gather(*(transmitter.async_send(code) for code in codes))
+        assert [payload for _, payload in hass.broker.sent] == [code.source for code in codes]
+        assert hass.broker.peak == 1
+        assert transmitter.sent == 20
+        assert transmitter.transport.health.sent == 20
+
+    _run(_test, delay=0.01)
+
+
+def test_in_flight_limits() -> None:
+    """Topics publish in parallel within the shared in-flight budget."""
+
+    async def _test(hass) -> None:
+        transmitters = [_transmitter(hass, f"curtain/{index}/set") for index in range(40)]
+        await asyncio.gather(*(
+            transmitter.async_send(IRCode("open", None)) for transmitter in transmitters
+        ))
+        assert hass.broker.peak == MAX_IN_FLIGHT
+        assert len(hass.broker.sent) == 40
+
+    _run(_test, delay=0.01)
+
+
+def test_transmitter_cap() -> None:
+    """One transmitter takes at most its own share of the budget at a time."""
+
+    async def _test(hass) -> None:
+        transmitter = _transmitter(hass, "curtain/set")
+        limit = transmitter_module.async_get_send_limit(hass)
+        sends = [
+            transmitter.async_send(IRCode(f"code_{index}", None))
+            for index in range(MAX_TRANSMITTER_IN_FLIGHT * 2)
+        ]
+        await asyncio.sleep(0.005)
+        assert limit._value == MAX_IN_FLIGHT - MAX_TRANSMITTER_IN_FLIGHT
+        await asyncio.gather(*sends)
+        assert limit._value == MAX_IN_FLIGHT
+
+    _run(_test, delay=0.01)
+
+
+def test_failing_broker_marks_transport_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Failures are retried until the transport is down, and one success recovers it."""
+    monkeypatch.setattr(transmitter_module, "RETRY_BACKOFF", 0.001)
+
+    async def _test(hass) -> None:
+        transmitter = _transmitter(hass, "curtain/set")
+        health = transmitter.transport.health
+        hass.broker.fail_rate = 1.0
+
+        with pytest.raises(RuntimeError):
+            await transmitter.async_send(IRCode("first", None))
+        assert transmitter.retried == transmitter_module.MAX_ATTEMPTS - 1
+        assert health.consecutive_failures == UNHEALTHY_FAILURES
+        assert not health.healthy
+        assert not health.down
+
+        while not health.down:
+            with pytest.raises(RuntimeError):
+                await transmitter.async_send(IRCode("again", None))
+        assert health.consecutive_failures == DOWN_FAILURES
+
+        # 传输离线后失败的码不再重试
+        retried = transmitter.retried
+        with pytest.raises(RuntimeError):
+            await transmitter.async_send(IRCode("down", None))
+        assert transmitter.retried == retried
+
+        hass.broker.fail_rate = 0.0
+        await transmitter.async_send(IRCode("recovered", None))
+        assert health.healthy
+        assert health.consecutive_failures == 0
+        assert [payload for _, payload in hass.broker.sent] == ["recovered"]
+
+    _run(_test)
@@ -0,0 +1,89 @@
+"""Tests of restoring saved positions and interrupted moves."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from fake_hass import FakeHass, async_create_curtains
+
+CONFIG = {
+    "name": "test",
+    "open_code": "open",
+    "close_code": "close",
+    "pause_code": "stop",
+    "close_time": 10,
+    "coalesce_window": 0,
+}
+
+
+def _run(test: Any) -> None:
+    """Run ``test`` with two curtains on a fake hass."""
+
+    async def _async_run() -> None:
+        hass = FakeHass()
+        curtains = await async_create_curtains(hass, [dict(CONFIG), dict(CONFIG)])
+        await test(hass, *curtains)
+
+    asyncio.run(_async_run())
+
+
+def test_resting_position() -> None:
+    """A curtain saved at rest comes back at that position without moving."""
+
+    async def _test(hass, curtain, _) -> None:
+        curtain._async_restore([30, None, None, None, None])
+        assert curtain._attr_current_cover_position == 30
+        assert not curtain._is_moving
+        assert not hass.blaster.sent
+
+    _run(_test)
+
+
+def test_move_finished_while_down() -> None:
+    """A move whose run time passed during the restart ends at its target."""
+
+    async def _test(hass, curtain, _) -> None:
+        curtain._async_restore([20, 100, time.time() - 30, 0, 10.0])
+        assert curtain._attr_current_cover_position == 100
+        assert not curtain._is_moving
+
+    _run(_test)
+
+
+def test_missed_stop_runs_to_end() -> None:
+    """A move to an intermediate target whose stop was due runs on to the end stop."""
+
+    async def _test(hass, curtain, _) -> None:
+        curtain._async_restore([40, 50, time.time() - 6, 0, 5.0])
+        assert curtain._target_position == 100
+        assert curtain._is_moving
+        assert curtain._stop_timer is None
+        assert 55 <= curtain._attr_current_cover_position <= 65
+        assert not hass.blaster.sent
+
+    _run(_test)
+
+
+def test_resume_in_flight_move() -> None:
+    """A snapshot of a moving curtain resumes on restart, stop timer included."""
+
+    async def _test(hass, curtain, restored) -> None:
+        curtain._attr_current_cover_position = 0
+        await curtain.async_move_now(80)
+        await asyncio.sleep(0.2)
+        record = curtain.async_snapshot(time.time() - hass.loop.time())
+        assert record[1:2] == [80]
+
+        restored._async_restore(record)
+        assert restored._target_position == 80
+        assert restored._is_moving
+        assert restored._stop_timer is not None
+        assert abs(restored._expected_end_time - curtain._expected_end_time) < 0.05
+        assert abs(restored._attr_current_cover_position - 2) <= 1
+        # 恢复时不重新发送方向码
+        assert [code for _, code in hass.blaster.sent] == ["open"]
+        restored._cancel_stop_timer()
+        curtain._cancel_stop_timer()
+
+    _run(_test)
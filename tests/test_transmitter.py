@@ -0,0 +1,67 @@
+"""Tests of the transmitter queue order."""
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.boardlink_curtain.code_store import IRCode
+from custom_components.boardlink_curtain.transmitter import Transmitter
+from custom_components.boardlink_curtain.transport import ScriptTransport
+from fake_hass import FakeHass
+
+
+def test_stop_does_not_overtake_own_move() -> None:
+    """Stops jump ahead of other curtains' codes but not their own curtain's move."""
+
+    async def _test() -> None:
+        hass = FakeHass(ir_delay=0.3)
+        transmitter = Transmitter(hass, "test", ScriptTransport(hass))
+        sends = [transmitter.async_send(IRCode("b_open", None), sender="b")]
+        # b 的开启码发送中，a 的开启码在排队
+        await asyncio.sleep(0.05)
+        now = hass.loop.time()
+        sends += [
+            transmitter.async_send(IRCode("a_open", None), sender="a"),
+            transmitter.async_send(IRCode("a_stop", None), now + 0.1, sender="a"),
+            transmitter.async_send(IRCode("c_stop", None), now + 0.1, sender="c"),
+        ]
+        await asyncio.gather(*sends)
+        assert [code for _, code in hass.blaster.sent] == [
+            "b_open",
+            "c_stop",
+            "a_open",
+            "a_stop",
+        ]
+
+    asyncio.run(_test())
+
+
+def test_shared_codes_are_sent_once() -> None:
+    """Curtains queuing the same code share one transmission."""
+
+    async def _test() -> None:
+        hass = FakeHass(ir_delay=0.05)
+        transmitter = Transmitter(hass, "test", ScriptTransport(hass))
+        busy = transmitter.async_send(IRCode("other", None))
+        shared = [
+            transmitter.async_send(IRCode("open", None), sender=sender) for sender in "abc"
+        ]
+        shared[0].cancel()
+        await asyncio.gather(busy, *shared[1:])
+        assert [code for _, code in hass.blaster.sent] == ["other", "open"]
+        assert transmitter.deduplicated == 2
+
+    asyncio.run(_test())
+
+
+def test_latency_estimate_starts_at_zero() -> None:
+    """Stops are not fired early before any send was measured."""
+
+    async def _test() -> None:
+        hass = FakeHass(ir_delay=0.05)
+        transmitter = Transmitter(hass, "test", ScriptTransport(hass))
+        assert transmitter.airtime > 0
+        assert transmitter.latency.value == 0
+        await transmitter.async_send(IRCode("open", None))
+        assert 0.05 <= transmitter.latency.value < 0.1
+
+    asyncio.run(_test())